@@ -1,11 +1,42 @@
-"""Top-level imports for the Visual Coding - Optical Physiology data conversion."""
+"""
+Top-level imports for the Visual Coding - Optical Physiology data conversion.
 
-from ._visual_coding_ophys_nwbconverter import VisualCodingOphysNWBConverter
-from .convert_processed_session import convert_processed_session
-from .safe_download_convert_and_upload_raw_session import (
-    safe_download_convert_and_upload_raw_session,
+Each exposed object is only imported from its submodule upon first access. This keeps importing the package cheap in
+every spawned worker; in particular, boto3 and the DANDI transfer tools are only loaded by the raw session pipeline.
+"""
+
+import importlib
+from typing import TYPE_CHECKING
+
+_LAZY_IMPORTS = dict(
+    VisualCodingOphysNWBConverter="._visual_coding_ophys_nwbconverter",
+    convert_processed_session="._convert_processed_session",
+    safe_download_convert_and_upload_raw_session="._safe_download_convert_and_upload_raw_session",
 )
 
+if TYPE_CHECKING:
+    from ._convert_processed_session import convert_processed_session
+    from ._safe_download_convert_and_upload_raw_session import (
+        safe_download_convert_and_upload_raw_session,
+    )
+    from ._visual_coding_ophys_nwbconverter import VisualCodingOphysNWBConverter
+
+
+def __getattr__(name: str):
+    if name not in _LAZY_IMPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+    # The submodules are private and named apart from what they expose, since importing a submodule binds it as an
+    # attribute of this package, which would otherwise shadow its function of the same name
+    value = getattr(importlib.import_module(name=_LAZY_IMPORTS[name], package=__name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
+
+
 __all__ = [
     "VisualCodingOphysNWBConverter",
     "convert_processed_session",
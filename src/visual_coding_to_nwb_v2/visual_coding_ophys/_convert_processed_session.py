@@ -0,0 +1,336 @@
+"""Primary script for converting a single processed-only session of the Visual Coding - Optical Physiology dataset."""
+
+import json
+import os
+import pathlib
+import typing
+
+import h5py
+import neuroconv
+from hdmf.common import DynamicTable
+from pynwb import NWBHDF5IO, NWBFile
+
+from visual_coding_to_nwb_v2.visual_coding_ophys import VisualCodingOphysNWBConverter
+from visual_coding_to_nwb_v2.visual_coding_ophys.tools import (
+    apply_compression_policy,
+    get_container_storage,
+    get_stale_containers,
+    load_compression_policy,
+    load_dependency_manifest,
+    record_container_storage,
+    record_containers,
+    save_dependency_manifest,
+    verify_nwbfile,
+)
+
+# The containers that can be replaced in an existing v2 file on their own, and their possible locations within it
+UPDATABLE_CONTAINER_LOCATIONS = dict(
+    DfOverFEvents=("processing/ophys/DfOverF/DfOverFEvents", "processing/ophys/DfOverFEvents"),  # Dense or sparse
+    epochs=("intervals/epochs",),
+)
+
+
+def _remove_containers(nwbfile: NWBFile, container_names: typing.List[str]) -> None:
+    """Remove the containers from an NWB file read from disk, so that they are left out when it is exported."""
+    if "DfOverFEvents" in container_names and "ophys" in nwbfile.processing:
+        ophys_module = nwbfile.processing["ophys"]
+        if "DfOverFEvents" in ophys_module.data_interfaces:  # Sparse
+            ophys_module.data_interfaces.pop("DfOverFEvents")
+        if "DfOverF" in ophys_module.data_interfaces and "DfOverFEvents" in ophys_module["DfOverF"].roi_response_series:
+            ophys_module["DfOverF"].roi_response_series.pop("DfOverFEvents")
+    if "epochs" in container_names and nwbfile.epochs is not None:
+        # The epochs are a field of their own, but once read they are also collected among the other intervals
+        if "epochs" in nwbfile.intervals:
+            nwbfile.intervals.pop("epochs")
+        else:
+            nwbfile.epochs.reset_parent()
+        nwbfile.fields.pop("epochs")
+
+
+def _update_containers(
+    v2_nwbfile_path: pathlib.Path,
+    container_names: typing.List[str],
+    v1_nwbfile_path: typing.Union[str, pathlib.Path],
+    epoch_table_file_path: typing.Optional[pathlib.Path] = None,
+    df_over_f_events_file_path: typing.Optional[pathlib.Path] = None,
+    df_over_f_events_storage: typing.Literal["dense", "sparse"] = "dense",
+    compression_policy_file_path: typing.Union[str, pathlib.Path, None] = None,
+) -> None:
+    """
+    Replace the containers of the existing v2 file with those built from their source artifacts, or leave them out if
+    their artifacts no longer exist.
+
+    The added datasets are compressed as in a fresh conversion, including by the compression policy if specified.
+    The condition response tables are not touched, since they are computed from the v1 NWB file alone.
+    """
+    source_data = dict()
+    if "DfOverFEvents" in container_names and df_over_f_events_file_path is not None:
+        source_data.update(
+            ProcessedOphys=dict(
+                v1_nwbfile_path=str(v1_nwbfile_path), df_over_f_events_file_path=str(df_over_f_events_file_path)
+            )
+        )
+    if "epochs" in container_names and epoch_table_file_path is not None:
+        source_data.update(
+            Epochs=dict(v1_nwbfile_path=str(v1_nwbfile_path), epoch_table_file_path=str(epoch_table_file_path))
+        )
+
+    # The v2 file is only read; the update is exported to a temporary file that replaces it once complete, so that a
+    # failure never leaves it without its containers, and the space of the replaced containers is not kept
+    partial_v2_nwbfile_path = v2_nwbfile_path.with_name(f"{v2_nwbfile_path.name}.partial")
+    converter = VisualCodingOphysNWBConverter(source_data=source_data)
+    try:
+        with NWBHDF5IO(path=v2_nwbfile_path, mode="r") as io:
+            nwbfile = io.read()
+            _remove_containers(nwbfile=nwbfile, container_names=container_names)
+            added_containers = list()
+            if "ProcessedOphys" in source_data:
+                converter.data_interface_objects["ProcessedOphys"].add_df_over_f_events_to_nwbfile(
+                    nwbfile=nwbfile, df_over_f_events_storage=df_over_f_events_storage
+                )
+                if df_over_f_events_storage == "sparse":
+                    added_containers.append(nwbfile.processing["ophys"]["DfOverFEvents"])
+                else:
+                    added_containers.append(nwbfile.processing["ophys"]["DfOverF"]["DfOverFEvents"])
+            if "Epochs" in source_data:
+                converter.data_interface_objects["Epochs"].add_to_nwbfile(nwbfile=nwbfile, metadata=dict())
+                added_containers.append(nwbfile.epochs)
+
+            # The default backend configuration cannot be inferred from every dataset of a file that is already
+            # written, so it is built from the datasets of the added containers alone
+            dataset_configurations = [
+                neuroconv.tools.nwb_helpers.HDF5DatasetIOConfiguration.from_neurodata_object(
+                    neurodata_object=neurodata_object, dataset_name="data"
+                )
+                for container in added_containers
+                for neurodata_object in (container.columns if isinstance(container, DynamicTable) else [container])
+            ]
+            backend_configuration = neuroconv.tools.nwb_helpers.HDF5BackendConfiguration(
+                dataset_configurations={
+                    dataset_configuration.location_in_file: dataset_configuration
+                    for dataset_configuration in dataset_configurations
+                }
+            )
+            if compression_policy_file_path is not None:
+                apply_compression_policy(
+                    backend_configuration=backend_configuration,
+                    compression_policy=load_compression_policy(file_path=compression_policy_file_path),
+                )
+            neuroconv.tools.nwb_helpers.configure_backend(nwbfile=nwbfile, backend_configuration=backend_configuration)
+
+            with NWBHDF5IO(path=partial_v2_nwbfile_path, mode="w") as export_io:
+                export_io.export(src_io=io, nwbfile=nwbfile)
+        os.replace(src=partial_v2_nwbfile_path, dst=v2_nwbfile_path)
+    finally:
+        converter.close_source_files()
+        partial_v2_nwbfile_path.unlink(missing_ok=True)
+
+
+def convert_processed_session(
+    session_id: str,
+    data_folder_path: typing.Union[str, pathlib.Path],
+    output_folder_path: typing.Union[str, pathlib.Path],
+    stub_test: bool = False,
+    timestamps_jitter_tolerance: typing.Optional[float] = None,
+    compression_policy_file_path: typing.Union[str, pathlib.Path, None] = None,
+    v1_nwbfile_url: typing.Optional[str] = None,
+    verify_output: bool = False,
+    update: bool = False,
+    df_over_f_events_storage: typing.Optional[typing.Literal["dense", "sparse"]] = None,
+    add_condition_responses: bool = False,
+    natural_movie_presentation_storage: typing.Literal["frames", "runs", "both"] = "frames",
+) -> None:
+    """
+    Convert a single session of the visual coding ophys dataset.
+
+    If `timestamps_jitter_tolerance` (in seconds) is specified, every series whose timestamps are regular within that
+    tolerance is stored with a starting time and rate instead of explicit timestamps.
+
+    If `compression_policy_file_path` is specified, the codecs of each class of dataset are set from that JSON file
+    instead of using the neuroconv default for everything.
+
+    If `v1_nwbfile_url` is specified, the v1 NWB file is streamed from that HTTP(S) URL instead of being read from the
+    `data_folder_path`, which then only needs to hold the epoch tables and events alongside it.
+
+    If `verify_output` is True, every dataset copied into the v2 file is compared against the v1 file by hashes of
+    blocks of chunks after writing. The report is saved to 'verification/{session_id}.json' in the output folder, and
+    on a mismatch an error is raised without writing the v2 file.
+
+    Existing v2 files are skipped, unless `update` is True. The source artifacts of each container are recorded in a
+    dependency manifest, 'manifests/ses-{session_id}.json' in the output folder. When updating, the containers that
+    can be replaced on their own (the 'DfOverFEvents' and the 'epochs') are replaced in place if their artifact was
+    added, changed, or removed since it was recorded, and only a change of the v1 NWB file reconverts the whole file.
+    Files from before the manifests are taken as up to date with their v1 NWB file.
+
+    If `df_over_f_events_storage` is 'sparse', the dF/F events are stored as the frames and amplitudes of the events
+    of each ROI instead of a dense (time, roi) series; see `densify_df_over_f_events` for reading them back. If it is
+    not specified, new files are dense and updates keep the layout recorded in the manifest; specifying another layout
+    than the recorded one replaces the 'DfOverFEvents' in that layout.
+
+    If `add_condition_responses` is True, the mean and standard error of the response of each ROI to each condition
+    of the gratings and natural scenes are computed from the dF/F and stored in tables of the 'ophys' module. These
+    tables are only added by a full conversion; updates in place neither add, remove, nor recompute them.
+
+    If `natural_movie_presentation_storage` is 'runs', the presentations of the natural movies are stored as runs of
+    consecutive frames instead of one index and timestamp per displayed frame, or as both if it is 'both'; see
+    `expand_natural_movie_presentation` for reading them back frame by frame.
+    """
+    data_folder_path = pathlib.Path(data_folder_path)
+    output_folder_path = pathlib.Path(output_folder_path)
+
+    if stub_test:
+        output_folder_path = output_folder_path / "nwb_stub"
+    output_folder_path.mkdir(parents=True, exist_ok=True)
+
+    v1_nwbfile_path = v1_nwbfile_url or data_folder_path / f"{session_id}.nwb"
+    v2_nwbfile_path = output_folder_path / f"ses-{session_id}.nwb"
+
+    epoch_table_file_path = data_folder_path.parent / "epoch_tables" / f"{session_id}.json"
+    df_over_f_events_file_path = data_folder_path.parent / "df_over_f_events" / f"{session_id}.npy"
+
+    # Every other container is converted from the v1 NWB file alone
+    container_sources = dict(
+        nwbfile=dict(v1_nwbfile_path=v1_nwbfile_path),
+        DfOverFEvents=dict(df_over_f_events_file_path=df_over_f_events_file_path),
+        epochs=dict(epoch_table_file_path=epoch_table_file_path),
+    )
+    manifest_file_path = output_folder_path / "manifests" / f"ses-{session_id}.json"
+    manifest = load_dependency_manifest(manifest_file_path=manifest_file_path)
+
+    if v2_nwbfile_path.exists():
+        if not update:
+            return
+
+        if "nwbfile" not in manifest["containers"]:
+            record_containers(manifest=manifest, container_sources=container_sources, container_names=["nwbfile"])
+        stale_container_names = get_stale_containers(manifest=manifest, container_sources=container_sources)
+
+        recorded_df_over_f_events_storage = get_container_storage(manifest=manifest, container_name="DfOverFEvents")
+        if recorded_df_over_f_events_storage is None:  # Files from before the storage was recorded
+            with h5py.File(name=v2_nwbfile_path, mode="r") as v2_nwbfile:
+                is_sparse = UPDATABLE_CONTAINER_LOCATIONS["DfOverFEvents"][1] in v2_nwbfile
+            recorded_df_over_f_events_storage = "sparse" if is_sparse else "dense"
+        df_over_f_events_storage = df_over_f_events_storage or recorded_df_over_f_events_storage
+        if (  # Only when another layout is asked for explicitly
+            df_over_f_events_storage != recorded_df_over_f_events_storage
+            and "DfOverFEvents" not in stale_container_names
+        ):
+            stale_container_names.append("DfOverFEvents")
+
+        if len(stale_container_names) == 0:
+            return
+
+        if "nwbfile" not in stale_container_names:
+            _update_containers(
+                v2_nwbfile_path=v2_nwbfile_path,
+                container_names=stale_container_names,
+                v1_nwbfile_path=v1_nwbfile_path,
+                epoch_table_file_path=epoch_table_file_path if epoch_table_file_path.exists() else None,
+                df_over_f_events_file_path=(
+                    df_over_f_events_file_path if df_over_f_events_file_path.exists() else None
+                ),
+                df_over_f_events_storage=df_over_f_events_storage,
+                compression_policy_file_path=compression_policy_file_path,
+            )
+            record_containers(
+                manifest=manifest, container_sources=container_sources, container_names=stale_container_names
+            )
+            record_container_storage(
+                manifest=manifest, container_name="DfOverFEvents", storage=df_over_f_events_storage
+            )
+            save_dependency_manifest(manifest_file_path=manifest_file_path, manifest=manifest)
+            return
+
+    df_over_f_events_storage = df_over_f_events_storage or "dense"
+
+    # All interfaces take the same common input for this conversion
+    source_data = {
+        key: dict(v1_nwbfile_path=str(v1_nwbfile_path))
+        for key in set(VisualCodingOphysNWBConverter.data_interface_classes) - set(["TwoPhotonSeries"])
+    }
+
+    if epoch_table_file_path.exists():
+        source_data["Epochs"].update(epoch_table_file_path=str(epoch_table_file_path))
+    else:
+        del source_data["Epochs"]
+
+    if df_over_f_events_file_path.exists():
+        source_data["ProcessedOphys"].update(df_over_f_events_file_path=str(df_over_f_events_file_path))
+
+    converter = VisualCodingOphysNWBConverter(source_data=source_data)
+    metadata = converter.get_metadata()
+
+    conversion_options = {
+        interface_name: dict(jitter_tolerance=timestamps_jitter_tolerance)
+        for interface_name in VisualCodingOphysNWBConverter.timed_interface_names
+        if interface_name in source_data
+    }
+    conversion_options["ProcessedOphys"].update(
+        df_over_f_events_storage=df_over_f_events_storage, add_condition_responses=add_condition_responses
+    )
+    conversion_options["NaturalMovies"].update(presentation_storage=natural_movie_presentation_storage)
+
+    # Written to a temporary file that only replaces the output once complete (and verified), so that an interrupted
+    # or failed write never leaves a truncated file behind that would be skipped as already converted
+    partial_v2_nwbfile_path = output_folder_path / f"ses-{session_id}.nwb.partial"
+    try:
+        try:
+            with neuroconv.tools.nwb_helpers.make_or_load_nwbfile(
+                nwbfile_path=partial_v2_nwbfile_path,
+                metadata=metadata,
+                overwrite=True,
+                verbose=True,
+            ) as nwbfile:
+                converter.add_to_nwbfile(nwbfile=nwbfile, metadata=metadata, conversion_options=conversion_options)
+                default_backend_configuration = neuroconv.tools.nwb_helpers.get_default_backend_configuration(
+                    nwbfile=nwbfile, backend="hdf5"
+                )
+                if compression_policy_file_path is not None:
+                    apply_compression_policy(
+                        backend_configuration=default_backend_configuration,
+                        compression_policy=load_compression_policy(file_path=compression_policy_file_path),
+                    )
+
+                neuroconv.tools.nwb_helpers.configure_backend(
+                    nwbfile=nwbfile, backend_configuration=default_backend_configuration
+                )
+        finally:
+            converter.close_source_files()
+
+        if verify_output:
+            verification_report = verify_nwbfile(
+                v2_nwbfile_path=partial_v2_nwbfile_path, v1_nwbfile_path=v1_nwbfile_path
+            )
+            verification_folder_path = output_folder_path / "verification"
+            verification_folder_path.mkdir(exist_ok=True)
+            with open(file=verification_folder_path / f"{session_id}.json", mode="w") as io:
+                json.dump(obj=verification_report, fp=io, indent=4)
+            if not verification_report["is_verified"]:
+                raise IOError(f"The output of session {session_id} does not match its source file!")
+
+        os.replace(src=partial_v2_nwbfile_path, dst=v2_nwbfile_path)
+    finally:
+        partial_v2_nwbfile_path.unlink(missing_ok=True)
+
+    record_containers(manifest=manifest, container_sources=container_sources, container_names=list(container_sources))
+    record_container_storage(manifest=manifest, container_name="DfOverFEvents", storage=df_over_f_events_storage)
+    save_dependency_manifest(manifest_file_path=manifest_file_path, manifest=manifest)
+
+
+if __name__ == "__main__":
+    data_folder_path = pathlib.Path("F:/visual_coding/cache/ophys_experiment_data")
+    output_folder_path = pathlib.Path("F:/visual_coding/v2_nwbfiles")
+    stub_test = False
+
+    # session_id = "496908818"  # Example of natural scenes
+    # session_id = "679697901"  # Example of locally sparse
+    # session_id = "682051855"  # Example of drifting grating and spontaneous
+    # session_id = "501004031"  # With EyeTracking
+    session_id = "507691476"  # Investigate missing demixed source
+
+    convert_processed_session(
+        session_id=session_id,
+        data_folder_path=data_folder_path,
+        output_folder_path=output_folder_path,
+        stub_test=stub_test,
+    )
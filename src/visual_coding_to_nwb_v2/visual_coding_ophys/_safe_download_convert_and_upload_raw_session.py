@@ -0,0 +1,353 @@
+"""Primary script for converting a single processed-only session of the Visual Coding - Optical Physiology dataset."""
+
+import contextlib
+import functools
+import json
+import os
+import pathlib
+import shutil
+import sys
+import time
+import traceback
+from typing import List, Tuple, Union
+
+import neuroconv
+from neuroconv.tools.data_transfers import automatic_dandi_upload
+
+from visual_coding_to_nwb_v2.visual_coding_ophys import VisualCodingOphysNWBConverter
+from visual_coding_to_nwb_v2.visual_coding_ophys.tools import (
+    BandwidthLimiter,
+    PermanentStageError,
+    RuntimeControl,
+    SourceCache,
+    apply_compression_policy,
+    download_object,
+    get_unsigned_s3_client,
+    is_quarantined,
+    load_compression_policy,
+    measure_transfer,
+    quarantine_session,
+    run_stage,
+    throttle_dandi_uploads,
+    verify_nwbfile,
+)
+
+
+def _check_for_pause(
+    pause_file_path: Union[pathlib.Path, None] = None, runtime_control: Union[RuntimeControl, None] = None
+) -> None:
+    if runtime_control is not None:
+        runtime_control.wait_while_paused()
+        runtime_control.apply_io_priority()
+
+    if pause_file_path is None:
+        return
+
+    while pause_file_path.exists():
+        time.sleep(60)
+
+
+def _fetch_source_file(
+    key: str,
+    source_cache: SourceCache,
+    bandwidth_limiter: Union[BandwidthLimiter, None] = None,
+    transfer_log_file_path: Union[pathlib.Path, None] = None,
+    s3_endpoint_url: Union[str, None] = None,
+) -> pathlib.Path:
+    def _download(file_path: pathlib.Path, partial_folder_path: pathlib.Path) -> None:
+        with measure_transfer(name=key, direction="download", log_file_path=transfer_log_file_path) as transfer_record:
+            transfer_record["number_of_bytes"] = download_object(
+                bucket_name="allen-brain-observatory",
+                key=key,
+                file_path=file_path,
+                partial_folder_path=partial_folder_path,
+                bandwidth_limiter=bandwidth_limiter,
+                endpoint_url=s3_endpoint_url,
+            )
+
+    expected_size = 0
+    if not source_cache.get_file_path(key=key).exists():
+        s3_client = get_unsigned_s3_client(endpoint_url=s3_endpoint_url)
+        expected_size = s3_client.head_object(Bucket="allen-brain-observatory", Key=key)["ContentLength"]
+
+    return source_cache.fetch(key=key, download_function=_download, expected_size=expected_size)
+
+
+def _get_source_url(key: str, s3_endpoint_url: Union[str, None] = None) -> str:
+    if s3_endpoint_url is None:
+        return f"https://allen-brain-observatory.s3.us-west-2.amazonaws.com/{key}"
+    return f"{s3_endpoint_url.rstrip('/')}/allen-brain-observatory/{key}"
+
+
+def _upload_session(
+    nwb_folder_path: pathlib.Path,
+    bandwidth_limiter: Union[BandwidthLimiter, None] = None,
+    transfer_log_file_path: Union[pathlib.Path, None] = None,
+) -> None:
+    with measure_transfer(
+        name=nwb_folder_path.parent.name, direction="upload", log_file_path=transfer_log_file_path
+    ) as transfer_record:
+        transfer_record["number_of_bytes"] = sum(
+            file_path.stat().st_size for file_path in nwb_folder_path.rglob("*.nwb")
+        )
+        with throttle_dandi_uploads(bandwidth_limiter=bandwidth_limiter):
+            automatic_dandi_upload(dandiset_id="000728", nwb_folder_path=nwb_folder_path)
+
+
+def safe_download_convert_and_upload_raw_session(
+    session_id: str,
+    base_folder_path: Union[str, pathlib.Path],
+    log: bool = True,
+    pause_file_path: Union[pathlib.Path, None] = None,
+    control_file_path: Union[str, pathlib.Path, None] = None,
+    timestamps_jitter_tolerance: Union[float, None] = None,
+    compression_policy_file_path: Union[str, pathlib.Path, None] = None,
+    download_bandwidth: Union[float, None] = None,
+    upload_bandwidth: Union[float, None] = None,
+    s3_endpoint_url: Union[str, None] = None,
+    source_cache_size: int = 200 * 1024**3,
+    retry_policy: Union[dict, None] = None,
+    stream_sources: bool = False,
+    verify_output: bool = False,
+    preview_factors: Union[List[Tuple[int, int]], None] = None,
+    add_summary_images: bool = False,
+    read_profile: Union[dict, None] = None,
+) -> None:
+    """
+    Convert a single session of the visual coding ophys dataset.
+
+    If `control_file_path` is specified, the 'paused' and 'io_priority' settings of that runtime control file are
+    applied between each stage, in addition to the presence of the `pause_file_path`.
+
+    If `timestamps_jitter_tolerance` (in seconds) is specified, the imaging timestamps are stored with a starting time
+    and rate whenever they are regular within that tolerance.
+
+    If `compression_policy_file_path` is specified, the codecs of each class of dataset are set from that JSON file
+    instead of using the neuroconv default for everything.
+
+    The `download_bandwidth` and `upload_bandwidth` (in bytes per second) are shared by every process converting
+    sessions into the same `base_folder_path`; the settings of the same names in the runtime control file take
+    precedence over them. The achieved throughput of every transfer is appended to 'logs/transfers.jsonl'.
+
+    The source files are downloaded as concurrent byte ranges into the 'source_cache' shared by every process using
+    the same `base_folder_path`, and are kept there after the session, whether it succeeds or not, so that retries and
+    reruns do not download them again. A download interrupted by an error resumes from the ranges already fetched.
+    The least recently used files that no session in progress needs are evicted beyond `source_cache_size` bytes.
+    The `s3_endpoint_url` replaces the public AWS endpoint, such as for a local mirror of the source bucket.
+
+    If `stream_sources` is True, the source files are instead read directly from the bucket through a block cache with
+    read-ahead matched to the chunks of the movie, so that the download overlaps with the conversion and the sources
+    take no space on disk. Streamed reads are not subject to the `download_bandwidth`.
+
+    If `verify_output` is True, every dataset copied into the v2 file is compared against its source by hashes of
+    blocks of chunks before the upload, with the movie hashed as it is written so that it is not read again. The report
+    is saved to 'logs/verification_{session_id}.json', and a mismatch fails the write stage so that it is retried.
+
+    Each (temporal, spatial) factor of the `preview_factors`, such as (10, 2), adds a preview of the movie binned by
+    those factors for browsing, computed from the same buffers of the movie as it is written.
+
+    If `add_summary_images` is True, the mean, maximum, standard deviation, and local correlation images of the movie
+    are accumulated over those same buffers and stored in the 'SummaryImages'.
+
+    The `read_profile` overrides settings of the `DEFAULT_READ_PROFILE`, which sizes the chunk cache of the source
+    movie to the chunks shared by its consecutive buffers.
+
+    Each stage (transfer, read, write, upload) is retried on its own after transient errors, with the number of
+    attempts and backoff delays of the `retry_policy` overriding those of `DEFAULT_RETRY_POLICY`; every failed attempt
+    is appended to 'logs/retries.jsonl'. Sessions failing with a permanent error, such as a missing demixed signal,
+    are recorded with the reason under 'quarantine' and skipped by later runs until that record is removed.
+    """
+    assert "DANDI_API_KEY" in os.environ
+    import dandi  # noqa: To ensure installation before upload attempt
+
+    converter = None
+    session_subfolder = None
+    session_completed = False
+    runtime_control = RuntimeControl(control_file_path=control_file_path) if control_file_path is not None else None
+    try:
+        base_folder_path = pathlib.Path(base_folder_path)
+
+        log_folder_path = base_folder_path / "logs"
+        log_folder_path.mkdir(exist_ok=True, parents=True)
+        transfer_log_file_path = log_folder_path / "transfers.jsonl"
+        source_cache = SourceCache(cache_folder_path=base_folder_path / "source_cache", maximum_size=source_cache_size)
+        download_limiter = BandwidthLimiter(
+            state_file_path=base_folder_path / ".download_bandwidth",
+            direction="download",
+            rate=download_bandwidth,
+            runtime_control=runtime_control,
+        )
+        upload_limiter = BandwidthLimiter(
+            state_file_path=base_folder_path / ".upload_bandwidth",
+            direction="upload",
+            rate=upload_bandwidth,
+            runtime_control=runtime_control,
+        )
+
+        retry_log_file_path = log_folder_path / "retries.jsonl"
+        quarantine_folder_path = base_folder_path / "quarantine"
+        if is_quarantined(quarantine_folder_path=quarantine_folder_path, session_id=session_id):
+            return
+
+        session_subfolder = base_folder_path / session_id
+        write_completed_file_path = session_subfolder / "write_completed.txt"
+
+        output_subfolder = session_subfolder / "v2_nwbfile"
+        output_subfolder.mkdir(exist_ok=True, parents=True)
+        v2_nwbfile_path = output_subfolder / f"ses-{session_id}_desc-raw.nwb"
+
+        _check_for_pause(pause_file_path=pause_file_path, runtime_control=runtime_control)
+
+        if not (v2_nwbfile_path.exists() and write_completed_file_path.exists()):
+            v1_nwbfile_key = f"visual-coding-2p/ophys_experiment_data/{session_id}.nwb"
+            ophys_movie_key = f"visual-coding-2p/ophys_movies/ophys_experiment_{session_id}.h5"
+            source_keys = [v1_nwbfile_key, ophys_movie_key]
+            with contextlib.nullcontext() if stream_sources else source_cache.pin(keys=source_keys):
+                if stream_sources:
+                    v1_nwbfile_path, ophys_movie_file_path = [
+                        _get_source_url(key=key, s3_endpoint_url=s3_endpoint_url) for key in source_keys
+                    ]
+                else:
+                    v1_nwbfile_path, ophys_movie_file_path = [
+                        run_stage(
+                            stage="transfer",
+                            function=functools.partial(
+                                _fetch_source_file,
+                                key=key,
+                                source_cache=source_cache,
+                                bandwidth_limiter=download_limiter,
+                                transfer_log_file_path=transfer_log_file_path,
+                                s3_endpoint_url=s3_endpoint_url,
+                            ),
+                            retry_policy=retry_policy,
+                            name=session_id,
+                            retry_log_file_path=retry_log_file_path,
+                        )
+                        for key in source_keys
+                    ]
+
+                _check_for_pause(pause_file_path=pause_file_path, runtime_control=runtime_control)
+
+                source_data = dict(
+                    TwoPhotonSeries=dict(
+                        v1_nwbfile_path=str(v1_nwbfile_path), ophys_movie_file_path=str(ophys_movie_file_path)
+                    ),
+                    Metadata=dict(v1_nwbfile_path=str(v1_nwbfile_path)),
+                )
+
+                def _read_source_files():
+                    nonlocal converter
+                    if converter is not None:  # Reopen the source files from scratch on a retry
+                        converter.close_source_files()
+                    converter = VisualCodingOphysNWBConverter(source_data=source_data, verbose=False)
+                    return converter.get_metadata()
+
+                metadata = run_stage(
+                    stage="read",
+                    function=_read_source_files,
+                    retry_policy=retry_policy,
+                    name=session_id,
+                    retry_log_file_path=retry_log_file_path,
+                )
+
+                conversion_options = dict(
+                    TwoPhotonSeries=dict(
+                        jitter_tolerance=timestamps_jitter_tolerance,
+                        record_chunk_hashes=verify_output,
+                        preview_factors=preview_factors,
+                        add_summary_images=add_summary_images,
+                        read_profile=read_profile,
+                    )
+                )
+
+                def _write_nwbfile():
+                    with neuroconv.tools.nwb_helpers.make_or_load_nwbfile(
+                        nwbfile_path=v2_nwbfile_path, metadata=metadata, overwrite=True, verbose=False
+                    ) as nwbfile:
+                        converter.add_to_nwbfile(
+                            nwbfile=nwbfile, metadata=metadata, conversion_options=conversion_options
+                        )
+                        default_backend_configuration = neuroconv.tools.nwb_helpers.get_default_backend_configuration(
+                            nwbfile=nwbfile, backend="hdf5"
+                        )
+                        if compression_policy_file_path is not None:
+                            apply_compression_policy(
+                                backend_configuration=default_backend_configuration,
+                                compression_policy=load_compression_policy(file_path=compression_policy_file_path),
+                            )
+
+                        neuroconv.tools.nwb_helpers.configure_backend(
+                            nwbfile=nwbfile, backend_configuration=default_backend_configuration
+                        )
+
+                    if verify_output:
+                        verification_report = verify_nwbfile(
+                            v2_nwbfile_path=v2_nwbfile_path,
+                            v1_nwbfile_path=v1_nwbfile_path,
+                            recorded_hashes=converter.data_interface_objects["TwoPhotonSeries"].chunk_hashes,
+                        )
+                        with open(file=log_folder_path / f"verification_{session_id}.json", mode="w") as io:
+                            json.dump(obj=verification_report, fp=io, indent=4)
+                        if not verification_report["is_verified"]:
+                            v2_nwbfile_path.unlink()
+                            raise IOError(f"The output of session {session_id} does not match its source files!")
+
+                run_stage(
+                    stage="write",
+                    function=_write_nwbfile,
+                    retry_policy=retry_policy,
+                    name=session_id,
+                    retry_log_file_path=retry_log_file_path,
+                )
+                write_completed_file_path.touch()
+
+                converter.close_source_files()
+
+            _check_for_pause(pause_file_path=pause_file_path, runtime_control=runtime_control)
+
+        run_stage(
+            stage="upload",
+            function=functools.partial(
+                _upload_session,
+                nwb_folder_path=output_subfolder,
+                bandwidth_limiter=upload_limiter,
+                transfer_log_file_path=transfer_log_file_path,
+            ),
+            retry_policy=retry_policy,
+            name=session_id,
+            retry_log_file_path=retry_log_file_path,
+        )
+        session_completed = True
+    except Exception as exception:
+        if isinstance(exception, PermanentStageError):
+            quarantine_session(quarantine_folder_path=quarantine_folder_path, session_id=session_id, error=exception)
+        if log:
+            log_folder_path = base_folder_path / "logs"
+            log_folder_path.mkdir(exist_ok=True)
+            with open(file=log_folder_path / f"logs_{session_id}.txt", mode="w") as io:
+                io.write(f"{type(exception)}: {str(exception)}\n{traceback.format_exc()}")
+        else:
+            raise exception
+    finally:
+        if converter is not None:  # Release the handles on the source files so they can be evicted
+            converter.close_source_files()
+
+        # A completed output that failed to upload is kept, so that the next attempt only repeats the upload
+        if session_subfolder is not None and (session_completed or not write_completed_file_path.exists()):
+            shutil.rmtree(path=session_subfolder, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    session_id = "712919679"
+    # base_folder_path = pathlib.Path("F:/visual_coding/test")
+    base_folder_path = pathlib.Path("/home/jovyan/visual_coding/")
+
+    if len(sys.argv) > 1:  # CLI usage
+        session_id = sys.argv[1]
+        base_folder_path = sys.argv[2]
+
+    safe_download_convert_and_upload_raw_session(
+        session_id=session_id,
+        base_folder_path=base_folder_path,
+        log=False,
+    )
@@ -1,6 +1,10 @@
 """Primary NWBConverter class for the Visual Coding - Optical Physiology dataset."""
 
+from typing import List, Optional
+
+import h5py
 from neuroconv import NWBConverter
+from pynwb import NWBFile
 
 from .interfaces import (  # VisualCodingTwoPhotonSeriesInterface,
     DriftingGratingStimulusInterface,
@@ -17,6 +21,7 @@ from .interfaces import (  # VisualCodingTwoPhotonSeriesInterface,
     VisualCodingProcessedOphysInterface,
     VisualCodingTwoPhotonSeriesInterface,
 )
+from .tools import prefetch_source_datasets
 
 
 class VisualCodingOphysNWBConverter(NWBConverter):
@@ -37,3 +42,64 @@ class VisualCodingOphysNWBConverter(NWBConverter):
         ProcessedOphys=VisualCodingProcessedOphysInterface,
         Epochs=EpochsInterface,
     )
+
+    # Interfaces that write time series and so accept a 'jitter_tolerance' for regular timing
+    timed_interface_names = (
+        "TwoPhotonSeries",
+        "EyeTracking",
+        "PupilTracking",
+        "RunningSpeed",
+        "NaturalMovies",
+        "NaturalScenes",
+        "LocallySparseStimuli",
+        "ProcessedOphys",
+    )
+
+    def close_source_files(self) -> None:
+        """
+        Close every HDF5 source file held open by the interfaces.
+
+        These are otherwise only released by garbage collection, which is not enough when the same process goes on to
+        convert other sessions or needs to remove the source files.
+        """
+        for data_interface in self.data_interface_objects.values():
+            for value in vars(data_interface).values():
+                if isinstance(value, h5py.File) and value.id.valid:
+                    value.close()
+
+    def get_source_datasets(self) -> List[h5py.Dataset]:
+        """The datasets of the source files that the interfaces read in full, in the order they will be read."""
+        source_datasets = list()
+        for data_interface in self.data_interface_objects.values():
+            source_file = getattr(data_interface, "v1_nwbfile", None)
+            if source_file is None:
+                continue
+            source_datasets.extend(
+                source_file[source_dataset_path]
+                for source_dataset_path in getattr(data_interface, "source_dataset_paths", ())
+                if source_dataset_path in source_file
+            )
+        return source_datasets
+
+    def add_to_nwbfile(
+        self,
+        nwbfile: NWBFile,
+        metadata: dict,
+        conversion_options: Optional[dict] = None,
+        number_of_prefetch_threads: int = 8,
+        number_of_prefetch_processes: int = 0,
+    ) -> None:
+        """
+        Add each interface in turn, while the source datasets of all of them are read concurrently in the background.
+
+        The containers are still built one interface at a time in a fixed order, so the file is the same as without
+        prefetching; each interface only waits for the reads of its own datasets that have not finished. See
+        `prefetch_source_datasets` for the `number_of_prefetch_threads` (0 disables prefetching) and
+        `number_of_prefetch_processes`.
+        """
+        with prefetch_source_datasets(
+            datasets=self.get_source_datasets(),
+            number_of_threads=number_of_prefetch_threads,
+            number_of_processes=number_of_prefetch_processes,
+        ):
+            super().add_to_nwbfile(nwbfile=nwbfile, metadata=metadata, conversion_options=conversion_options)
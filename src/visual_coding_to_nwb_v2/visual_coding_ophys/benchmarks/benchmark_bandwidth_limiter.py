@@ -0,0 +1,139 @@
+"""
+Check that the shared bandwidth limit holds for concurrent downloads and uploads against a local S3 stand-in.
+
+Several processes transfer at once through limiters sharing one state file; the combined throughput should approach
+the limit without exceeding it by more than the initial burst (one second worth of transfer) allows.
+"""
+
+import http.client
+import json
+import os
+import pathlib
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import List
+
+from visual_coding_to_nwb_v2.visual_coding_ophys.benchmarks.local_s3_server import (
+    LocalS3Server,
+)
+from visual_coding_to_nwb_v2.visual_coding_ophys.tools import (
+    BandwidthLimiter,
+    ThrottledBytes,
+    measure_transfer,
+)
+
+BUCKET_NAME = "allen-brain-observatory"
+
+
+def _download(endpoint_url: str, key: str, file_path: str, state_file_path: str, bandwidth: float) -> dict:
+    import boto3
+    from botocore import UNSIGNED
+    from botocore.client import Config
+
+    s3 = boto3.resource(
+        "s3", region_name="us-west-2", endpoint_url=endpoint_url, config=Config(signature_version=UNSIGNED)
+    )
+    bandwidth_limiter = BandwidthLimiter(state_file_path=state_file_path, direction="download", rate=bandwidth)
+    with measure_transfer(name=key, direction="download") as transfer_record:
+        s3.Bucket(name=BUCKET_NAME).download_file(Key=key, Filename=file_path, Callback=bandwidth_limiter)
+        transfer_record["number_of_bytes"] = pathlib.Path(file_path).stat().st_size
+    return transfer_record
+
+
+def _upload(endpoint_url: str, key: str, number_of_bytes: int, state_file_path: str, bandwidth: float) -> dict:
+    host, port = endpoint_url.removeprefix("http://").split(":")
+    bandwidth_limiter = BandwidthLimiter(state_file_path=state_file_path, direction="upload", rate=bandwidth)
+    body = ThrottledBytes(data=os.urandom(number_of_bytes), bandwidth_limiter=bandwidth_limiter)
+    with measure_transfer(name=key, direction="upload") as transfer_record:
+        connection = http.client.HTTPConnection(host=host, port=int(port))
+        connection.request(
+            method="PUT", url=f"/{BUCKET_NAME}/{key}", body=body, headers={"Content-Length": str(len(body))}
+        )
+        response = connection.getresponse()
+        response.read()
+        assert response.status == 200, f"Upload of '{key}' failed with status {response.status}!"
+        connection.close()
+        transfer_record["number_of_bytes"] = number_of_bytes
+    return transfer_record
+
+
+def benchmark_bandwidth_limiter(
+    number_of_processes: int = 4, megabytes_per_transfer: int = 32, bandwidth: float = 40e6
+) -> List[dict]:
+    """Run concurrent downloads then uploads, returning the combined throughput of each direction."""
+    results = list()
+    with tempfile.TemporaryDirectory() as temporary_folder:
+        temporary_folder_path = pathlib.Path(temporary_folder)
+        bucket_folder_path = temporary_folder_path / "bucket"
+        bucket_folder_path.mkdir()
+        keys = [f"visual-coding-2p/ophys_movies/file_{index}.h5" for index in range(number_of_processes)]
+        for key in keys:
+            file_path = bucket_folder_path / key
+            file_path.parent.mkdir(parents=True, exist_ok=True)
+            file_path.write_bytes(os.urandom(megabytes_per_transfer * 1024 * 1024))
+
+        with LocalS3Server(folder_path=bucket_folder_path) as server:
+            for direction in ("download", "upload"):
+                state_file_path = str(temporary_folder_path / f".{direction}_bandwidth")
+                start_time = time.perf_counter()
+                with ProcessPoolExecutor(max_workers=number_of_processes) as executor:
+                    if direction == "download":
+                        futures = [
+                            executor.submit(
+                                _download,
+                                server.endpoint_url,
+                                key,
+                                str(temporary_folder_path / pathlib.Path(key).name),
+                                state_file_path,
+                                bandwidth,
+                            )
+                            for key in keys
+                        ]
+                    else:
+                        futures = [
+                            executor.submit(
+                                _upload,
+                                server.endpoint_url,
+                                key,
+                                megabytes_per_transfer * 1024 * 1024,
+                                state_file_path,
+                                bandwidth,
+                            )
+                            for key in keys
+                        ]
+                    transfer_records = [future.result() for future in futures]
+                duration = time.perf_counter() - start_time
+
+                total_bytes = sum(transfer_record["number_of_bytes"] for transfer_record in transfer_records)
+                burst_bytes = (
+                    bandwidth * BandwidthLimiter(state_file_path=state_file_path, direction=direction).burst_duration
+                )
+                results.append(
+                    dict(
+                        direction=direction,
+                        limit_megabytes_per_second=bandwidth / 1e6,
+                        maximum_megabytes_per_second=total_bytes
+                        / 1e6
+                        / max((total_bytes - burst_bytes) / bandwidth, 1e-9),
+                        combined_megabytes_per_second=total_bytes / 1e6 / duration,
+                        per_transfer_megabytes_per_second=[
+                            transfer_record["megabytes_per_second"] for transfer_record in transfer_records
+                        ],
+                    )
+                )
+
+    return results
+
+
+if __name__ == "__main__":
+    bandwidth = float(sys.argv[1]) if len(sys.argv) > 1 else 40e6
+
+    results = benchmark_bandwidth_limiter(bandwidth=bandwidth)
+    print(json.dumps(results, indent=4))
+
+    exceeded = [
+        result for result in results if result["combined_megabytes_per_second"] > result["maximum_megabytes_per_second"]
+    ]
+    sys.exit(1 if exceeded else 0)
@@ -0,0 +1,177 @@
+"""
+Benchmark compression codecs on synthetic data resembling each class of dataset in the Visual Coding conversion.
+
+Reports the compression ratio, compression speed, and decompression speed of GZIP, LZF, and (if `hdf5plugin` is
+installed) Blosc/Zstd variants. The best codec per class under the chosen criterion is saved as a compression policy
+JSON file, which can be passed as the `compression_policy_file_path` of either conversion entry point.
+"""
+
+import io
+import json
+import pathlib
+import sys
+import time
+from typing import Dict, List
+
+import h5py
+import numpy
+
+from visual_coding_to_nwb_v2.visual_coding_ophys.tools import (
+    DEFAULT_COMPRESSION_POLICY,
+    save_compression_policy,
+)
+
+
+def _generate_synthetic_datasets(seed: int = 0) -> Dict[str, numpy.ndarray]:
+    random_number_generator = numpy.random.default_rng(seed=seed)
+
+    # Spatially smooth baseline plus shot noise, similar in range to the 512 x 512 int16 motion corrected movies
+    baseline = numpy.cumsum(numpy.cumsum(random_number_generator.normal(size=(256, 256)), axis=0), axis=1)
+    baseline = 1_000 + 500 * (baseline - baseline.min()) / numpy.ptp(baseline)
+    movie = random_number_generator.poisson(lam=numpy.broadcast_to(baseline, (200, 256, 256))).astype("int16")
+
+    # Slowly drifting fluorescence of a few hundred ROIs
+    traces = numpy.cumsum(random_number_generator.normal(scale=0.01, size=(20_000, 200)), axis=0).astype("float32")
+
+    # L0 events are zero for all but a small fraction of frames
+    events = numpy.zeros(shape=(20_000, 200), dtype="float32")
+    event_mask = random_number_generator.random(size=events.shape) < 0.01
+    events[event_mask] = random_number_generator.exponential(scale=0.3, size=event_mask.sum())
+
+    # Natural movie templates are smooth grayscale frames
+    template_frames = numpy.cumsum(random_number_generator.normal(size=(90, 304, 608)), axis=2)
+    templates = (255 * (template_frames - template_frames.min()) / numpy.ptp(template_frames)).astype("uint8")
+
+    # Nearly regular 30 Hz timestamps with small jitter
+    timestamps = numpy.arange(100_000) / 30.0 + random_number_generator.normal(scale=1e-4, size=100_000)
+
+    return dict(movie=movie, traces=traces, events=events, templates=templates, timestamps=timestamps)
+
+
+def _get_codecs() -> Dict[str, dict]:
+    codecs = {
+        "gzip-1": dict(compression_method="gzip", compression_options=dict(level=1)),
+        "gzip-4": dict(compression_method="gzip", compression_options=dict(level=4)),
+        "gzip-9": dict(compression_method="gzip", compression_options=dict(level=9)),
+        "lzf": dict(compression_method="lzf", compression_options=None),
+    }
+
+    try:
+        import hdf5plugin  # noqa: F401
+    except ImportError:
+        print("Skipping Blosc and Zstd codecs since `hdf5plugin` is not installed.")
+        return codecs
+
+    codecs.update(
+        {
+            "blosc-zstd-3": dict(compression_method="Blosc", compression_options=dict(cname="zstd", clevel=3)),
+            "blosc-zstd-9": dict(compression_method="Blosc", compression_options=dict(cname="zstd", clevel=9)),
+            "blosc-lz4-5": dict(compression_method="Blosc", compression_options=dict(cname="lz4", clevel=5)),
+            "zstd-3": dict(compression_method="Zstd", compression_options=dict(clevel=3)),
+            "zstd-9": dict(compression_method="Zstd", compression_options=dict(clevel=9)),
+        }
+    )
+    return codecs
+
+
+def _get_h5py_kwargs(codec: dict) -> dict:
+    compression_method = codec["compression_method"]
+    compression_options = codec["compression_options"] or dict()
+
+    if compression_method in ("gzip", "lzf"):
+        compression_opts = compression_options.get("level")
+        return dict(compression=compression_method, compression_opts=compression_opts)
+
+    import hdf5plugin
+
+    return dict(**getattr(hdf5plugin, compression_method)(**compression_options))
+
+
+def _get_chunk_shape(data: numpy.ndarray, chunk_mb: float = 10.0) -> tuple:
+    """Frame-aligned chunks of roughly `chunk_mb`, matching the chunking used when writing the movie."""
+    bytes_per_frame = data[0].nbytes if data.ndim > 1 else data.itemsize
+    number_of_frames = max(min(int(chunk_mb * 1e6 / bytes_per_frame), data.shape[0]), 1)
+    return (number_of_frames,) + data.shape[1:]
+
+
+def benchmark_codec(data: numpy.ndarray, codec: dict, number_of_repeats: int = 3) -> dict:
+    """Measure the compression ratio and the best-of-N write and read speeds (in MB/s) of a codec on the data."""
+    write_times = list()
+    read_times = list()
+    for _ in range(number_of_repeats):
+        with h5py.File(name=io.BytesIO(), mode="w") as file:
+            start_time = time.perf_counter()
+            dataset = file.create_dataset(
+                name="data", data=data, chunks=_get_chunk_shape(data=data), **_get_h5py_kwargs(codec=codec)
+            )
+            file.flush()
+            write_times.append(time.perf_counter() - start_time)
+
+            storage_size = dataset.id.get_storage_size()
+
+            start_time = time.perf_counter()
+            dataset[...]
+            read_times.append(time.perf_counter() - start_time)
+
+    size_in_mb = data.nbytes / 1e6
+    return dict(
+        ratio=data.nbytes / storage_size,
+        compression_mb_per_second=size_in_mb / min(write_times),
+        decompression_mb_per_second=size_in_mb / min(read_times),
+    )
+
+
+def benchmark_compression_codecs(number_of_repeats: int = 3) -> Dict[str, Dict[str, dict]]:
+    """Benchmark every available codec on every class of synthetic dataset."""
+    synthetic_datasets = _generate_synthetic_datasets()
+    codecs = _get_codecs()
+
+    results = dict()
+    for dataset_class, data in synthetic_datasets.items():
+        results[dataset_class] = {
+            codec_name: benchmark_codec(data=data, codec=codec, number_of_repeats=number_of_repeats)
+            for codec_name, codec in codecs.items()
+        }
+    return results
+
+
+def select_compression_policy(
+    results: Dict[str, Dict[str, dict]],
+    minimum_compression_mb_per_second: float = 20.0,
+    minimum_decompression_mb_per_second: float = 100.0,
+) -> dict:
+    """Choose the codec with the highest ratio per class among those that compress and decompress fast enough."""
+    codecs = _get_codecs()
+
+    compression_policy = dict(DEFAULT_COMPRESSION_POLICY)
+    for dataset_class, results_per_codec in results.items():
+        fast_enough: List[str] = [
+            codec_name
+            for codec_name, result in results_per_codec.items()
+            if result["compression_mb_per_second"] >= minimum_compression_mb_per_second
+            and result["decompression_mb_per_second"] >= minimum_decompression_mb_per_second
+        ]
+        candidates = fast_enough or list(results_per_codec)
+        best_codec_name = max(candidates, key=lambda codec_name: results_per_codec[codec_name]["ratio"])
+        compression_policy[dataset_class] = codecs[best_codec_name]
+
+    return compression_policy
+
+
+if __name__ == "__main__":
+    policy_file_path = pathlib.Path(sys.argv[1]) if len(sys.argv) > 1 else None
+
+    results = benchmark_compression_codecs()
+
+    print(f"{'class':<12}{'codec':<15}{'ratio':>8}{'write MB/s':>14}{'read MB/s':>14}")
+    for dataset_class, results_per_codec in results.items():
+        for codec_name, result in results_per_codec.items():
+            print(
+                f"{dataset_class:<12}{codec_name:<15}{result['ratio']:>8.2f}"
+                f"{result['compression_mb_per_second']:>14.1f}{result['decompression_mb_per_second']:>14.1f}"
+            )
+
+    compression_policy = select_compression_policy(results=results)
+    print(json.dumps(compression_policy, indent=4))
+    if policy_file_path is not None:
+        save_compression_policy(compression_policy=compression_policy, file_path=policy_file_path)
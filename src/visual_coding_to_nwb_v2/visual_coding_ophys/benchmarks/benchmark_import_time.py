@@ -0,0 +1,100 @@
+"""
+Benchmark the import time of the package entry points and guard against regressions in lazy loading.
+
+Each import statement is timed in a fresh interpreter, since that is what every spawned worker pays. The script exits
+with a non-zero status if any statement loads a module it should not need, or exceeds its time budget.
+"""
+
+import json
+import subprocess
+import sys
+from typing import Dict, List
+
+# Statement to time -> modules that must not be loaded as a side effect
+IMPORT_CASES: Dict[str, List[str]] = {
+    "import visual_coding_to_nwb_v2.visual_coding_ophys": [
+        "boto3",
+        "botocore",
+        "neuroconv",
+        "pynwb",
+        "h5py",
+    ],
+    "from visual_coding_to_nwb_v2.visual_coding_ophys import VisualCodingOphysNWBConverter": [
+        "boto3",
+        "botocore",
+        "neuroconv.tools.data_transfers",
+    ],
+    "from visual_coding_to_nwb_v2.visual_coding_ophys import convert_processed_session": [
+        "boto3",
+        "botocore",
+        "neuroconv.tools.data_transfers",
+    ],
+    "from visual_coding_to_nwb_v2.visual_coding_ophys.interfaces import RunningSpeedInterface": [
+        "boto3",
+        "botocore",
+        "neuroconv.tools.data_transfers",
+        "visual_coding_to_nwb_v2.visual_coding_ophys._visual_coding_ophys_nwbconverter",
+        "visual_coding_to_nwb_v2.visual_coding_ophys.interfaces._two_photon_series",
+        "visual_coding_to_nwb_v2.visual_coding_ophys.interfaces._processed_ophys",
+    ],
+}
+
+# Seconds allowed per statement on top of the time it takes to import its unavoidable dependencies
+TIME_BUDGET_OVERHEAD = 0.5
+
+_TIMING_TEMPLATE = """
+import json, sys, time
+start_time = time.perf_counter()
+{statement}
+import_time = time.perf_counter() - start_time
+print(json.dumps(dict(import_time=import_time, modules=sorted(sys.modules))))
+"""
+
+
+def time_import(statement: str, number_of_repeats: int = 5) -> dict:
+    """Best-of-N import time of the statement in a fresh interpreter, along with all modules it loaded."""
+    import_times = list()
+    for _ in range(number_of_repeats):
+        completed_process = subprocess.run(
+            [sys.executable, "-c", _TIMING_TEMPLATE.format(statement=statement)],
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+        result = json.loads(completed_process.stdout.strip().splitlines()[-1])
+        import_times.append(result["import_time"])
+
+    return dict(import_time=min(import_times), modules=result["modules"])
+
+
+def check_import_regressions(number_of_repeats: int = 5) -> List[str]:
+    """Time every import case and return the list of regressions found."""
+    # Baseline for the unavoidable cost of the NWB stack, against which the budget of each statement is measured
+    baseline_time = time_import(statement="import neuroconv.tools.nwb_helpers", number_of_repeats=number_of_repeats)[
+        "import_time"
+    ]
+    print(f"{'baseline (neuroconv + pynwb)':<95}{baseline_time:>8.3f} s")
+
+    regressions = list()
+    for statement, forbidden_modules in IMPORT_CASES.items():
+        result = time_import(statement=statement, number_of_repeats=number_of_repeats)
+        print(f"{statement:<95}{result['import_time']:>8.3f} s")
+
+        loaded_forbidden_modules = [module for module in forbidden_modules if module in result["modules"]]
+        if loaded_forbidden_modules:
+            regressions.append(f"'{statement}' loaded {loaded_forbidden_modules}")
+        if result["import_time"] > baseline_time + TIME_BUDGET_OVERHEAD:
+            regressions.append(
+                f"'{statement}' took {result['import_time']:.3f} s; budget is {baseline_time + TIME_BUDGET_OVERHEAD:.3f} s"
+            )
+
+    return regressions
+
+
+if __name__ == "__main__":
+    regressions = check_import_regressions()
+
+    if regressions:
+        print("\nImport time regressions found:\n" + "\n".join(regressions))
+        sys.exit(1)
+    print("\nNo import time regressions found.")
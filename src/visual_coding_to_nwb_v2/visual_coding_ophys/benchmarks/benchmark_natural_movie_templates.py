@@ -0,0 +1,144 @@
+"""
+Compare the peak memory of writing a natural movie template, and the latency of reading single frames of it back.
+
+The template is either read whole from the source and written in the chunks of about 10 MB chosen by neuroconv, as
+the conversion used to, or streamed from the source by the `NaturalMovieStimulusInterface` in buffers of frames and
+written in chunks of a single frame; both are compressed with the default gzip. The peak memory is that of the
+allocations traced by `tracemalloc` while the template is added and written, which include the arrays read by h5py and
+numpy but not the buffers internal to the HDF5 library. Frames are read back one at a time in a random order, from a
+freshly opened file with the default chunk cache, as a viewer would.
+"""
+
+import json
+import pathlib
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from typing import List
+
+import h5py
+import numpy
+from neuroconv.tools.nwb_helpers import (
+    configure_backend,
+    get_default_backend_configuration,
+)
+from pynwb import NWBHDF5IO, NWBFile
+from pynwb.image import ImageSeries
+
+from visual_coding_to_nwb_v2.visual_coding_ophys.interfaces import (
+    NaturalMovieStimulusInterface,
+)
+
+
+def _create_source_file(file_path: pathlib.Path, number_of_frames: int, frame_shape: tuple) -> None:
+    """A v1 NWB file holding only a template of smooth grayscale frames and its presentation, as the interface reads."""
+    random_number_generator = numpy.random.default_rng(seed=0)
+    with h5py.File(name=file_path, mode="w") as file:
+        template = file.create_dataset(
+            name="stimulus/templates/natural_movie_one_image_stack/data",
+            shape=(number_of_frames, *frame_shape),
+            dtype="uint8",
+        )
+        for start in range(0, number_of_frames, 100):
+            frames = numpy.cumsum(
+                random_number_generator.normal(size=(min(100, number_of_frames - start), *frame_shape)), axis=2
+            )
+            template[start : start + frames.shape[0]] = numpy.clip(128 + 4 * frames, 0, 255).astype("uint8")
+
+        presentation = file.create_group(name="stimulus/presentation/natural_movie_one_stimulus")
+        presentation.create_dataset(name="data", data=numpy.arange(number_of_frames))
+        presentation.create_dataset(name="timestamps", data=numpy.arange(number_of_frames) / 30.0)
+
+
+def _write_template(source_file_path: pathlib.Path, output_file_path: pathlib.Path, template_storage: str) -> dict:
+    nwbfile = NWBFile(
+        session_description="Benchmark of the natural movie templates.",
+        identifier=template_storage,
+        session_start_time=datetime.now(tz=timezone.utc),
+    )
+
+    tracemalloc.start()
+    start_time = time.perf_counter()
+    if template_storage == "streamed":
+        interface = NaturalMovieStimulusInterface(v1_nwbfile_path=str(source_file_path))
+        interface.add_to_nwbfile(nwbfile=nwbfile, metadata=dict())
+    else:
+        with h5py.File(name=source_file_path, mode="r") as source_file:
+            template = source_file["stimulus/templates/natural_movie_one_image_stack/data"][:]
+        image_series = ImageSeries(
+            name="natural_movie_one", data=template, unit="n.a.", starting_time=numpy.nan, rate=numpy.nan
+        )
+        nwbfile.add_stimulus_template(timeseries=image_series)
+
+    backend_configuration = get_default_backend_configuration(nwbfile=nwbfile, backend="hdf5")
+    configure_backend(nwbfile=nwbfile, backend_configuration=backend_configuration)
+    with NWBHDF5IO(path=output_file_path, mode="w") as io:
+        io.write(nwbfile)
+    duration = time.perf_counter() - start_time
+    peak_memory = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    if template_storage == "streamed":
+        interface.v1_nwbfile.close()
+    return dict(write_seconds=duration, peak_megabytes=peak_memory / 1e6)
+
+
+def _read_single_frames(output_file_path: pathlib.Path, frame_indices: numpy.ndarray) -> dict:
+    durations = list()
+    checksum = 0
+    with h5py.File(name=output_file_path, mode="r") as file:
+        dataset = file["stimulus/templates/natural_movie_one/data"]
+        chunk_shape = dataset.chunks
+        for frame_index in frame_indices:
+            start_time = time.perf_counter()
+            checksum += int(dataset[frame_index].sum(dtype="int64"))
+            durations.append(time.perf_counter() - start_time)
+
+    durations = numpy.array(durations) * 1e3
+    return dict(
+        chunk_shape=chunk_shape,
+        median_frame_milliseconds=float(numpy.median(durations)),
+        percentile_95_frame_milliseconds=float(numpy.percentile(durations, 95)),
+        checksum=checksum,
+    )
+
+
+def benchmark_natural_movie_templates(number_of_frames: int = 900, frames_read_one_by_one: int = 200) -> List[dict]:
+    frame_shape = (304, 608)  # The size of the natural movies as stored in the v1 NWB files
+
+    results = list()
+    with tempfile.TemporaryDirectory() as temporary_folder:
+        source_file_path = pathlib.Path(temporary_folder) / "source.nwb"
+        _create_source_file(file_path=source_file_path, number_of_frames=number_of_frames, frame_shape=frame_shape)
+        frame_indices = numpy.random.default_rng(seed=0).integers(
+            low=0, high=number_of_frames, size=frames_read_one_by_one
+        )
+
+        checksums = list()
+        for template_storage in ("loaded", "streamed"):
+            output_file_path = pathlib.Path(temporary_folder) / f"{template_storage}.nwb"
+            result = dict(
+                template_storage=template_storage, template_megabytes=number_of_frames * numpy.prod(frame_shape) / 1e6
+            )
+            result.update(
+                _write_template(
+                    source_file_path=source_file_path,
+                    output_file_path=output_file_path,
+                    template_storage=template_storage,
+                )
+            )
+            result.update(_read_single_frames(output_file_path=output_file_path, frame_indices=frame_indices))
+            result.update(file_megabytes=output_file_path.stat().st_size / 1e6)
+            checksums.append(result.pop("checksum"))
+            results.append(result)
+        assert checksums[0] == checksums[1], "The streamed template differs from the loaded one!"
+
+    return results
+
+
+if __name__ == "__main__":
+    number_of_frames = int(sys.argv[1]) if len(sys.argv) > 1 else 900
+
+    print(json.dumps(benchmark_natural_movie_templates(number_of_frames=number_of_frames), indent=4))
@@ -0,0 +1,123 @@
+"""
+Compare ranged downloads with different numbers of threads against a local S3 stand-in, and check that they resume.
+
+The stand-in limits the bandwidth of each connection, as S3 effectively does, so that concurrent ranges pay off the
+same way they do against the real bucket.
+"""
+
+import filecmp
+import json
+import os
+import pathlib
+import sys
+import tempfile
+import time
+from typing import List
+
+from visual_coding_to_nwb_v2.visual_coding_ophys.benchmarks.local_s3_server import (
+    LocalS3Server,
+)
+from visual_coding_to_nwb_v2.visual_coding_ophys.tools import (
+    _ranged_download,
+    download_object,
+)
+
+BUCKET_NAME = "allen-brain-observatory"
+KEY = "visual-coding-2p/ophys_movies/ophys_experiment_0.h5"
+PART_SIZE = 16 * 1024 * 1024
+
+
+def benchmark_ranged_download(
+    megabytes: int = 256, connection_bandwidth: float = 50e6, thread_counts: tuple = (1, 2, 4, 8)
+) -> List[dict]:
+    results = list()
+    with tempfile.TemporaryDirectory() as temporary_folder:
+        temporary_folder_path = pathlib.Path(temporary_folder)
+        source_file_path = temporary_folder_path / "bucket" / KEY
+        source_file_path.parent.mkdir(parents=True)
+        source_file_path.write_bytes(os.urandom(megabytes * 1024 * 1024))
+
+        with LocalS3Server(folder_path=temporary_folder_path / "bucket", bandwidth=connection_bandwidth) as server:
+            for number_of_threads in thread_counts:
+                file_path = temporary_folder_path / f"downloaded_with_{number_of_threads}_threads.h5"
+                start_time = time.perf_counter()
+                download_object(
+                    bucket_name=BUCKET_NAME,
+                    key=KEY,
+                    file_path=file_path,
+                    part_size=PART_SIZE,
+                    number_of_threads=number_of_threads,
+                    endpoint_url=server.endpoint_url,
+                )
+                duration = time.perf_counter() - start_time
+                assert filecmp.cmp(file_path, source_file_path, shallow=False), "The download is corrupted!"
+                file_path.unlink()
+
+                results.append(
+                    dict(number_of_threads=number_of_threads, megabytes_per_second=megabytes * 1.048576 / duration)
+                )
+
+            # Fail one of the ranges of a download, then resume it
+            fetched_ranges = list()
+            original_download_part = _ranged_download._download_part
+
+            def _record_range(**kwargs):
+                fetched_ranges.append(kwargs["start"])
+                return original_download_part(**kwargs)
+
+            def _fail_on_fourth_range(**kwargs):
+                if len(fetched_ranges) == 3:
+                    fetched_ranges.append(kwargs["start"])
+                    raise ConnectionError("Simulated interruption.")
+                return _record_range(**kwargs)
+
+            file_path = temporary_folder_path / "resumed.h5"
+            _ranged_download._download_part = _fail_on_fourth_range
+            try:
+                download_object(
+                    bucket_name=BUCKET_NAME,
+                    key=KEY,
+                    file_path=file_path,
+                    part_size=PART_SIZE,
+                    number_of_threads=1,
+                    endpoint_url=server.endpoint_url,
+                )
+            except ConnectionError:
+                pass
+            finally:
+                _ranged_download._download_part = original_download_part
+            attempted_range_count = len(fetched_ranges)
+
+            fetched_ranges.clear()
+            _ranged_download._download_part = _record_range
+            try:
+                download_object(
+                    bucket_name=BUCKET_NAME,
+                    key=KEY,
+                    file_path=file_path,
+                    part_size=PART_SIZE,
+                    number_of_threads=4,
+                    endpoint_url=server.endpoint_url,
+                )
+            finally:
+                _ranged_download._download_part = original_download_part
+            assert filecmp.cmp(file_path, source_file_path, shallow=False), "The resumed download is corrupted!"
+
+            total_range_count = -(-megabytes * 1024 * 1024 // PART_SIZE)
+            results.append(
+                dict(
+                    resumed=True,
+                    ranges_attempted_before_failure=attempted_range_count,
+                    ranges_fetched_on_resume=len(fetched_ranges),
+                    total_ranges=total_range_count,
+                )
+            )
+            assert len(fetched_ranges) == total_range_count - attempted_range_count + 1, "Resumed too many ranges!"
+
+    return results
+
+
+if __name__ == "__main__":
+    megabytes = int(sys.argv[1]) if len(sys.argv) > 1 else 256
+
+    print(json.dumps(benchmark_ranged_download(megabytes=megabytes), indent=4))
@@ -0,0 +1,100 @@
+"""
+Compare the throughput of reading a compressed, chunked movie with the default chunk cache and with a read profile.
+
+The movie is read in buffers of frames as the conversion does, whose length is not a multiple of the chunks of the
+source, and frame by frame as a viewer would. With the default cache (1 MiB before HDF5 2.0, 8 MiB since), every chunk
+that the cache cannot hold is decompressed again by each read that touches it: twice for the chunks shared by
+consecutive buffers, which costs a few percent, and once per frame when reading frame by frame, which costs a factor of
+the number of frames per chunk. The read profile sizes the cache to hold the chunks shared by consecutive reads.
+"""
+
+import json
+import pathlib
+import sys
+import tempfile
+import time
+from typing import List, Tuple
+
+import h5py
+import numpy
+
+from visual_coding_to_nwb_v2.visual_coding_ophys.tools import open_source_dataset
+
+# The layouts of the source movie to compare: whole frames per chunk, and tiles of frames
+CHUNK_SHAPES = ((32, 512, 512), (32, 128, 128))
+
+
+def _read_in_buffers(dataset: h5py.Dataset, frames_per_buffer: int, number_of_frames: int) -> Tuple[float, float]:
+    checksum = 0.0
+    start_time = time.perf_counter()
+    for start in range(0, number_of_frames, frames_per_buffer):
+        checksum += float(dataset[start : min(start + frames_per_buffer, number_of_frames)].sum(dtype="float64"))
+    return time.perf_counter() - start_time, checksum
+
+
+def benchmark_read_profile(
+    megabytes: int = 1024,
+    frames_per_buffer: int = 950,
+    frames_read_one_by_one: int = 256,
+) -> List[dict]:
+    frame_shape = (512, 512)
+    frame_size = numpy.prod(frame_shape) * 2
+    number_of_frames = megabytes * 1024 * 1024 // frame_size
+
+    results = list()
+    with tempfile.TemporaryDirectory() as temporary_folder:
+        for chunk_shape in CHUNK_SHAPES:
+            file_path = pathlib.Path(temporary_folder) / f"movie_{'_'.join(map(str, chunk_shape))}.h5"
+            with h5py.File(name=file_path, mode="w") as file:
+                dataset = file.create_dataset(
+                    name="data",
+                    shape=(number_of_frames, *frame_shape),
+                    dtype="int16",
+                    chunks=chunk_shape,
+                    compression="gzip",
+                    compression_opts=4,
+                )
+                random_number_generator = numpy.random.default_rng(seed=0)
+                for start in range(0, number_of_frames, frames_per_buffer):
+                    frames = min(frames_per_buffer, number_of_frames - start)
+                    dataset[start : start + frames] = random_number_generator.integers(
+                        low=0, high=64, size=(frames, *frame_shape), dtype="int16"
+                    )
+
+            for read_pattern, buffer_length, frames_to_read in (
+                ("buffers", frames_per_buffer, number_of_frames),
+                ("single_frames", 1, frames_read_one_by_one),
+            ):
+                checksums = list()
+                for cache in ("default", "read_profile"):
+                    with h5py.File(name=file_path, mode="r") as file:
+                        if cache == "default":
+                            dataset = file["data"]
+                        else:
+                            dataset = open_source_dataset(
+                                file=file, name="data", buffer_shape=(buffer_length, *frame_shape)
+                            )
+                        chunk_cache_size = dataset.id.get_access_plist().get_chunk_cache()[1]
+                        duration, checksum = _read_in_buffers(
+                            dataset=dataset, frames_per_buffer=buffer_length, number_of_frames=frames_to_read
+                        )
+                    checksums.append(checksum)
+                    results.append(
+                        dict(
+                            chunk_shape=chunk_shape,
+                            read_pattern=read_pattern,
+                            cache=cache,
+                            chunk_cache_size=chunk_cache_size,
+                            seconds=duration,
+                            megabytes_per_second=frames_to_read * frame_size / 1e6 / duration,
+                        )
+                    )
+                assert checksums[0] == checksums[1], "The movie read with the read profile differs!"
+
+    return results
+
+
+if __name__ == "__main__":
+    megabytes = int(sys.argv[1]) if len(sys.argv) > 1 else 1024
+
+    print(json.dumps(benchmark_read_profile(megabytes=megabytes), indent=4))
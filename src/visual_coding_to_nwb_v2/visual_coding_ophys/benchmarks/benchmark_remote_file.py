@@ -0,0 +1,110 @@
+"""
+Compare reading a movie streamed through a `RemoteFile` with downloading it first, against a local S3 stand-in.
+
+The movie is read in buffers of frames, as the conversion does, with a fixed amount of processing time per buffer to
+stand in for the compression and writing of the output. Streaming should take about as long as the larger of the two,
+while downloading first takes their sum.
+"""
+
+import json
+import pathlib
+import sys
+import tempfile
+import time
+from typing import List
+
+import h5py
+import numpy
+
+from visual_coding_to_nwb_v2.visual_coding_ophys.benchmarks.local_s3_server import (
+    LocalS3Server,
+)
+from visual_coding_to_nwb_v2.visual_coding_ophys.tools import (
+    RemoteHDF5File,
+    download_object,
+)
+
+BUCKET_NAME = "allen-brain-observatory"
+KEY = "visual-coding-2p/ophys_movies/ophys_experiment_0.h5"
+
+
+def _read_in_buffers(dataset: h5py.Dataset, frames_per_buffer: int, seconds_per_buffer: float) -> float:
+    checksum = 0.0
+    for start in range(0, dataset.shape[0], frames_per_buffer):
+        checksum += float(dataset[start : start + frames_per_buffer].sum(dtype="float64"))
+        time.sleep(seconds_per_buffer)
+    return checksum
+
+
+def benchmark_remote_file(
+    megabytes: int = 256,
+    connection_bandwidth: float = 50e6,
+    frames_per_buffer: int = 500,
+    seconds_per_buffer: float = 0.2,
+) -> List[dict]:
+    frame_shape = (128, 128)
+    number_of_frames = megabytes * 1024 * 1024 // (numpy.prod(frame_shape) * 2)
+    frames_per_chunk = 100
+
+    results = list()
+    with tempfile.TemporaryDirectory() as temporary_folder:
+        temporary_folder_path = pathlib.Path(temporary_folder)
+        source_file_path = temporary_folder_path / "bucket" / KEY
+        source_file_path.parent.mkdir(parents=True)
+        with h5py.File(name=source_file_path, mode="w") as file:
+            dataset = file.create_dataset(
+                name="data",
+                shape=(number_of_frames, *frame_shape),
+                dtype="int16",
+                chunks=(frames_per_chunk, *frame_shape),
+            )
+            random_number_generator = numpy.random.default_rng(seed=0)
+            for start in range(0, number_of_frames, frames_per_buffer):
+                frames = min(frames_per_buffer, number_of_frames - start)
+                dataset[start : start + frames] = random_number_generator.integers(
+                    low=0, high=4096, size=(frames, *frame_shape), dtype="int16"
+                )
+
+        with LocalS3Server(folder_path=temporary_folder_path / "bucket", bandwidth=connection_bandwidth) as server:
+            start_time = time.perf_counter()
+            downloaded_file_path = temporary_folder_path / "downloaded.h5"
+            download_object(
+                bucket_name=BUCKET_NAME, key=KEY, file_path=downloaded_file_path, endpoint_url=server.endpoint_url
+            )
+            download_duration = time.perf_counter() - start_time
+            with h5py.File(name=downloaded_file_path, mode="r") as file:
+                expected_checksum = _read_in_buffers(
+                    dataset=file["data"], frames_per_buffer=frames_per_buffer, seconds_per_buffer=seconds_per_buffer
+                )
+            results.append(
+                dict(
+                    mode="download_then_read",
+                    download_seconds=download_duration,
+                    total_seconds=time.perf_counter() - start_time,
+                )
+            )
+
+            start_time = time.perf_counter()
+            with RemoteHDF5File(url=f"{server.endpoint_url}/{BUCKET_NAME}/{KEY}") as file:
+                file.remote_file.tune_to_dataset(dataset=file["data"])
+                checksum = _read_in_buffers(
+                    dataset=file["data"], frames_per_buffer=frames_per_buffer, seconds_per_buffer=seconds_per_buffer
+                )
+                results.append(
+                    dict(
+                        mode="streamed",
+                        block_size=file.remote_file.block_size,
+                        read_ahead=file.remote_file.read_ahead,
+                        number_of_requests=file.remote_file.number_of_requests,
+                        total_seconds=time.perf_counter() - start_time,
+                    )
+                )
+            assert checksum == expected_checksum, "The streamed movie differs from the downloaded one!"
+
+    return results
+
+
+if __name__ == "__main__":
+    megabytes = int(sys.argv[1]) if len(sys.argv) > 1 else 256
+
+    print(json.dumps(benchmark_remote_file(megabytes=megabytes), indent=4))
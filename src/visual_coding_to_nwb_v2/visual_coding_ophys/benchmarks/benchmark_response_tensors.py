@@ -0,0 +1,96 @@
+"""
+Compare extracting trial-aligned responses with a single vectorized gather against slicing each trial in turn.
+
+The dF/F is simulated with the shape of a typical session, chunked in time and compressed as neuroconv would, and the
+trials are spread over the middle third of the session as a block of static gratings would be. The per-trial approach
+masks the timestamps and reads each window from the dataset, as is usually done in an analysis notebook; with the default chunk cache every trial decompresses a whole chunk,
+so that approach takes minutes for thousands of trials.
+"""
+
+import json
+import pathlib
+import sys
+import tempfile
+import time
+from typing import List
+
+import h5py
+import numpy
+
+from visual_coding_to_nwb_v2.visual_coding_ophys.tools import extract_response_tensor
+
+
+def _extract_per_trial(dataset: h5py.Dataset, timestamps: numpy.ndarray, event_times: numpy.ndarray, window: tuple):
+    number_of_window_frames = int(round((window[1] - window[0]) / numpy.median(numpy.diff(timestamps))))
+    trials = list()
+    for event_time in event_times:
+        start_frame = int(numpy.nonzero(timestamps >= event_time + window[0])[0][0])
+        trials.append(dataset[start_frame : start_frame + number_of_window_frames].T)
+    return numpy.stack(trials)
+
+
+def benchmark_response_tensors(
+    number_of_frames: int = 115_000,
+    number_of_rois: int = 200,
+    numbers_of_trials: tuple = (1_000, 6_000),
+    window: tuple = (-0.5, 1.0),
+) -> List[dict]:
+    results = list()
+    random_number_generator = numpy.random.default_rng(seed=0)
+    timestamps = numpy.arange(number_of_frames) / 30.0 + random_number_generator.normal(
+        scale=1e-4, size=number_of_frames
+    )
+
+    with tempfile.TemporaryDirectory() as temporary_folder:
+        file_path = pathlib.Path(temporary_folder) / "df_over_f.h5"
+        with h5py.File(name=file_path, mode="w") as file:
+            file.create_dataset(
+                name="data",
+                data=random_number_generator.normal(size=(number_of_frames, number_of_rois)).astype("float32"),
+                chunks=(max(10_000_000 // (number_of_rois * 4), 1), number_of_rois),
+                compression="gzip",
+            )
+
+        session_duration = timestamps[-1] - timestamps[0]
+        for number_of_trials in numbers_of_trials:
+            event_times = numpy.sort(
+                random_number_generator.uniform(
+                    low=timestamps[0] + session_duration / 3,
+                    high=timestamps[0] + 2 * session_duration / 3,
+                    size=number_of_trials,
+                )
+            )
+
+            with h5py.File(name=file_path, mode="r") as file:
+                start_time = time.perf_counter()
+                per_trial_tensor = _extract_per_trial(
+                    dataset=file["data"], timestamps=timestamps, event_times=event_times, window=window
+                )
+                per_trial_seconds = time.perf_counter() - start_time
+
+            with h5py.File(name=file_path, mode="r") as file:
+                start_time = time.perf_counter()
+                tensor = extract_response_tensor(
+                    data=file["data"], timestamps=timestamps, event_times=event_times, window=window
+                )
+                vectorized_seconds = time.perf_counter() - start_time
+
+            assert numpy.array_equal(
+                per_trial_tensor, tensor
+            ), "The vectorized responses differ from the per-trial ones!"
+            results.append(
+                dict(
+                    number_of_trials=number_of_trials,
+                    tensor_shape=list(tensor.shape),
+                    per_trial_seconds=per_trial_seconds,
+                    vectorized_seconds=vectorized_seconds,
+                )
+            )
+
+    return results
+
+
+if __name__ == "__main__":
+    number_of_frames = int(sys.argv[1]) if len(sys.argv) > 1 else 115_000
+
+    print(json.dumps(benchmark_response_tensors(number_of_frames=number_of_frames), indent=4))
@@ -0,0 +1,109 @@
+"""
+Compare the size and read speed of the dense and sparse layouts of the dF/F events.
+
+The events are simulated with the shape of a typical session and a given fraction of frames with an event. Both layouts
+are written with the default gzip compression, in chunks of about 10 MB as neuroconv would; reading the sparse layout
+includes expanding it back to a dense array.
+"""
+
+import json
+import pathlib
+import sys
+import tempfile
+import time
+from typing import List
+
+import h5py
+import numpy
+
+from visual_coding_to_nwb_v2.visual_coding_ophys.tools import (
+    densify_events,
+    sparsify_events,
+)
+
+
+def _time(function, repeats: int = 5) -> float:
+    durations = list()
+    for _ in range(repeats):
+        start_time = time.perf_counter()
+        function()
+        durations.append(time.perf_counter() - start_time)
+    return min(durations)
+
+
+def benchmark_sparse_events(
+    number_of_frames: int = 115_000, number_of_rois: int = 200, event_densities: tuple = (0.002, 0.01, 0.05)
+) -> List[dict]:
+    results = list()
+    random_number_generator = numpy.random.default_rng(seed=0)
+    with tempfile.TemporaryDirectory() as temporary_folder:
+        for event_density in event_densities:
+            has_event = random_number_generator.random(size=(number_of_frames, number_of_rois)) < event_density
+            amplitudes = random_number_generator.exponential(size=(number_of_frames, number_of_rois))
+            data = numpy.where(has_event, amplitudes, 0).astype("float32")
+
+            dense_file_path = pathlib.Path(temporary_folder) / f"dense_{event_density}.h5"
+            with h5py.File(name=dense_file_path, mode="w") as file:
+                frames_per_chunk = max(10_000_000 // (number_of_rois * 4), 1)
+                file.create_dataset(
+                    name="data",
+                    data=data,
+                    chunks=(min(frames_per_chunk, number_of_frames), number_of_rois),
+                    compression="gzip",
+                )
+
+            sparse_file_path = pathlib.Path(temporary_folder) / f"sparse_{event_density}.h5"
+            sparse_events = sparsify_events(data=data)
+            with h5py.File(name=sparse_file_path, mode="w") as file:
+                for name, values in sparse_events.items():
+                    file.create_dataset(name=name, data=values, chunks=True, compression="gzip")
+
+            def _read_dense():
+                with h5py.File(name=dense_file_path, mode="r") as file:
+                    return file["data"][:]
+
+            def _read_sparse():
+                with h5py.File(name=sparse_file_path, mode="r") as file:
+                    return densify_events(
+                        frame_indices=file["frame_indices"][:],
+                        amplitudes=file["amplitudes"][:],
+                        index=file["index"][:],
+                        number_of_frames=number_of_frames,
+                    )
+
+            def _read_dense_roi():
+                with h5py.File(name=dense_file_path, mode="r") as file:
+                    return file["data"][:, number_of_rois // 2]
+
+            def _read_sparse_roi():
+                with h5py.File(name=sparse_file_path, mode="r") as file:
+                    index = file["index"][:]
+                    start, stop = index[number_of_rois // 2 - 1], index[number_of_rois // 2]
+                    roi_data = numpy.zeros(shape=number_of_frames, dtype="float32")
+                    roi_data[file["frame_indices"][start:stop]] = file["amplitudes"][start:stop]
+                    return roi_data
+
+            assert numpy.array_equal(_read_dense(), _read_sparse()), "The sparse events differ from the dense ones!"
+            assert numpy.array_equal(
+                _read_dense_roi(), _read_sparse_roi()
+            ), "The sparse ROI differs from the dense one!"
+
+            results.append(
+                dict(
+                    event_density=event_density,
+                    dense_megabytes=dense_file_path.stat().st_size / 1e6,
+                    sparse_megabytes=sparse_file_path.stat().st_size / 1e6,
+                    dense_read_seconds=_time(function=_read_dense),
+                    sparse_read_seconds=_time(function=_read_sparse),
+                    dense_roi_read_seconds=_time(function=_read_dense_roi),
+                    sparse_roi_read_seconds=_time(function=_read_sparse_roi),
+                )
+            )
+
+    return results
+
+
+if __name__ == "__main__":
+    number_of_frames = int(sys.argv[1]) if len(sys.argv) > 1 else 115_000
+
+    print(json.dumps(benchmark_sparse_events(number_of_frames=number_of_frames), indent=4))
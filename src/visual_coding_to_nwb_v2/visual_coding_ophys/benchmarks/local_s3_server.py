@@ -0,0 +1,188 @@
+"""
+A minimal local stand-in for the parts of S3 used by the conversion, for benchmarks and offline testing.
+
+Serves the files of a folder at `http://{host}:{port}/{bucket}/{key}` (path-style addressing), answering HEAD and GET
+requests with byte ranges, content lengths, and quoted MD5 ETags, the same as S3 does for objects uploaded in one part.
+PUT requests are read and discarded. Pass its URL as the `s3_endpoint_url` of the conversion to download from it
+instead of the public bucket.
+"""
+
+import email.utils
+import hashlib
+import pathlib
+import re
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Tuple, Union
+
+_RANGE_PATTERN = re.compile(r"bytes=(\d*)-(\d*)$")
+
+
+class _LocalS3RequestHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server: "LocalS3Server"
+
+    def log_message(self, format, *args) -> None:  # noqa: A002
+        pass  # Keep benchmark output readable
+
+    def _get_file_path(self) -> Union[pathlib.Path, None]:
+        path = self.path.split("?", 1)[0].lstrip("/")
+        _, _, key = path.partition("/")  # All buckets are served from the same folder
+        file_path = (self.server.folder_path / key).resolve()
+        if self.server.folder_path.resolve() not in file_path.parents or not file_path.is_file():
+            return None
+        return file_path
+
+    def _send_not_found(self) -> None:
+        body = b"<Error><Code>NoSuchKey</Code></Error>"
+        self.send_response(404)
+        self.send_header("Content-Type", "application/xml")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if self.command != "HEAD":
+            self.wfile.write(body)
+
+    def _parse_range(self, file_size: int) -> Union[Tuple[int, int], None]:
+        range_header = self.headers.get("Range")
+        if range_header is None:
+            return None
+        match = _RANGE_PATTERN.match(range_header.strip())
+        if match is None:
+            return None
+
+        first, last = match.groups()
+        if first == "":  # Suffix range, such as 'bytes=-500' for the last 500 bytes
+            return max(0, file_size - int(last)), file_size - 1
+        return int(first), min(int(last), file_size - 1) if last != "" else file_size - 1
+
+    def _send_object(self, include_body: bool) -> None:
+        file_path = self._get_file_path()
+        if file_path is None:
+            self._send_not_found()
+            return
+
+        file_size = file_path.stat().st_size
+        byte_range = self._parse_range(file_size=file_size)
+        if byte_range is None:
+            start, end = 0, file_size - 1
+            self.send_response(200)
+        else:
+            start, end = byte_range
+            self.send_response(206)
+            self.send_header("Content-Range", f"bytes {start}-{end}/{file_size}")
+
+        content_length = max(0, end - start + 1)
+        self.send_header("Content-Type", "binary/octet-stream")
+        self.send_header("Content-Length", str(content_length))
+        self.send_header("Accept-Ranges", "bytes")
+        self.send_header("ETag", f'"{self.server.get_etag(file_path=file_path)}"')
+        self.send_header("Last-Modified", email.utils.formatdate(file_path.stat().st_mtime, usegmt=True))
+        self.end_headers()
+        if not include_body:
+            return
+
+        with open(file=file_path, mode="rb") as io:
+            io.seek(start)
+            remaining_bytes = content_length
+            while remaining_bytes > 0:
+                block = io.read(min(remaining_bytes, 1024 * 1024))
+                if not block:
+                    break
+                self.server.throttle(number_of_bytes=len(block))
+                self.wfile.write(block)
+                remaining_bytes -= len(block)
+
+    def do_HEAD(self) -> None:  # noqa: N802
+        self._send_object(include_body=False)
+
+    def do_GET(self) -> None:  # noqa: N802
+        self._send_object(include_body=True)
+
+    def do_PUT(self) -> None:  # noqa: N802
+        """Accept uploaded parts without storing them, replying with their ETag, to measure upload throughput."""
+        md5 = hashlib.md5()
+        remaining_bytes = int(self.headers.get("Content-Length", 0))
+        while remaining_bytes > 0:
+            block = self.rfile.read(min(remaining_bytes, 1024 * 1024))
+            if not block:
+                break
+            md5.update(block)
+            remaining_bytes -= len(block)
+
+        self.send_response(200)
+        self.send_header("ETag", f'"{md5.hexdigest()}"')
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+
+class LocalS3Server(ThreadingHTTPServer):
+    """
+    Serve a folder as an S3 bucket from a background thread.
+
+    A `bandwidth` (in bytes per second, per request) can be imposed to imitate a slow remote connection.
+    """
+
+    daemon_threads = True
+
+    def __init__(
+        self,
+        folder_path: Union[str, pathlib.Path],
+        host: str = "127.0.0.1",
+        port: int = 0,
+        bandwidth: Union[float, None] = None,
+    ):
+        super().__init__((host, port), _LocalS3RequestHandler)
+        self.folder_path = pathlib.Path(folder_path)
+        self.bandwidth = bandwidth
+
+        self._etags = dict()
+        self._etags_lock = threading.Lock()
+        self._thread = None
+
+    @property
+    def endpoint_url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def get_etag(self, file_path: pathlib.Path) -> str:
+        file_stat = file_path.stat()
+        cache_key = (str(file_path), file_stat.st_size, file_stat.st_mtime_ns)
+        with self._etags_lock:
+            if cache_key not in self._etags:
+                md5 = hashlib.md5()
+                with open(file=file_path, mode="rb") as io:
+                    for block in iter(lambda: io.read(8 * 1024 * 1024), b""):
+                        md5.update(block)
+                self._etags[cache_key] = md5.hexdigest()
+            return self._etags[cache_key]
+
+    def throttle(self, number_of_bytes: int) -> None:
+        if self.bandwidth is not None:
+            time.sleep(number_of_bytes / self.bandwidth)
+
+    def __enter__(self) -> "LocalS3Server":
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.shutdown()
+        self._thread.join()
+        self.server_close()
+
+
+if __name__ == "__main__":
+    # Example: python local_s3_server.py F:/visual_coding/mirror 9000
+    # Objects in "F:/visual_coding/mirror/visual-coding-2p/" are then read with s3_endpoint_url="http://127.0.0.1:9000"
+    folder_path = pathlib.Path(sys.argv[1])
+    port = int(sys.argv[2]) if len(sys.argv) > 2 else 9000
+
+    with LocalS3Server(folder_path=folder_path, port=port) as server:
+        print(f"Serving '{folder_path}' at {server.endpoint_url}; press Ctrl+C to stop.")
+        try:
+            while True:
+                time.sleep(1)
+        except KeyboardInterrupt:
+            pass
@@ -8,6 +8,13 @@ from concurrent.futures import ProcessPoolExecutor, as_completed
 import tqdm
 
 from visual_coding_to_nwb_v2.visual_coding_ophys import convert_processed_session
+from visual_coding_to_nwb_v2.visual_coding_ophys.tools import (
+    GlobalRoiIndex,
+    PermanentStageError,
+    is_quarantined,
+    quarantine_session,
+    run_stage,
+)
 
 
 def safe_convert_processed_session(
@@ -15,16 +22,44 @@ def safe_convert_processed_session(
     data_folder_path: typing.Union[str, pathlib.Path],
     output_folder_path: typing.Union[str, pathlib.Path],
     stub_test: bool = False,
+    verify_output: bool = False,
+    update: bool = False,
+    global_roi_index_folder_path: typing.Union[str, pathlib.Path, None] = None,
 ) -> None:
-    """When running in parallel, traceback to stderr per worker is not captured."""
+    """
+    When running in parallel, traceback to stderr per worker is not captured.
+
+    Transient errors are retried; sessions failing with a permanent error are quarantined and skipped by later runs.
+
+    If `global_roi_index_folder_path` is specified, the ROIs of the converted session are added to the global ROI index
+    in that folder as soon as it finishes; the index only needs to be compacted once all sessions are done.
+    """
+    quarantine_folder_path = pathlib.Path(output_folder_path) / "quarantine"
+    if is_quarantined(quarantine_folder_path=quarantine_folder_path, session_id=session_id):
+        return
+
     try:
-        convert_processed_session(
-            session_id=session_id,
-            data_folder_path=data_folder_path,
-            output_folder_path=output_folder_path,
-            stub_test=stub_test,
+        run_stage(
+            stage="write",
+            function=lambda: convert_processed_session(
+                session_id=session_id,
+                data_folder_path=data_folder_path,
+                output_folder_path=output_folder_path,
+                stub_test=stub_test,
+                verify_output=verify_output,
+                update=update,
+            ),
+            name=session_id,
         )
+
+        if global_roi_index_folder_path is not None:
+            v2_nwbfile_folder_path = pathlib.Path(output_folder_path) / "nwb_stub" if stub_test else output_folder_path
+            v2_nwbfile_path = pathlib.Path(v2_nwbfile_folder_path) / f"ses-{session_id}.nwb"
+            GlobalRoiIndex(index_folder_path=global_roi_index_folder_path).add_nwbfile(nwbfile_path=v2_nwbfile_path)
     except Exception as exception:
+        if isinstance(exception, PermanentStageError):
+            quarantine_session(quarantine_folder_path=quarantine_folder_path, session_id=session_id, error=exception)
+
         log_folder_path = output_folder_path / "logs"
         log_folder_path.mkdir(exist_ok=True)
 
@@ -37,6 +72,7 @@ if __name__ == "__main__":
 
     data_folder_path = pathlib.Path("F:/visual_coding/cache/ophys_experiment_data")
     output_folder_path = pathlib.Path("F:/visual_coding/v2_nwbfiles")
+    global_roi_index_folder_path = output_folder_path / "global_roi_index"
     stub_test = False
 
     futures = list()
@@ -51,6 +87,7 @@ if __name__ == "__main__":
                     data_folder_path=data_folder_path,
                     output_folder_path=output_folder_path,
                     stub_test=stub_test,
+                    global_roi_index_folder_path=global_roi_index_folder_path,
                 )
             )
 
@@ -58,3 +95,5 @@ if __name__ == "__main__":
             iterable=as_completed(futures), total=len(futures), desc="Converting processed visual coding dataset..."
         ):
             pass
+
+    GlobalRoiIndex(index_folder_path=global_roi_index_folder_path).compact()
@@ -3,6 +3,7 @@
 import os
 import pathlib
 import shutil
+import sys
 from typing import List, Union
 
 import natsort
@@ -12,6 +13,10 @@ from dandi.dandiapi import DandiAPIClient
 from visual_coding_to_nwb_v2.visual_coding_ophys import (
     safe_download_convert_and_upload_raw_session,
 )
+from visual_coding_to_nwb_v2.visual_coding_ophys.tools import (
+    SessionLeaseQueue,
+    run_leased_sessions,
+)
 
 
 def _get_completed_session_ids(base_folder_path: Union[str, pathlib.Path]) -> List[str]:
@@ -41,10 +46,32 @@ def _clean_past_sessions(base_folder_path: Union[str, pathlib.Path]):
             shutil.rmtree(path=folder_path, ignore_errors=True)
 
 
+def _convert_leased_session(
+    session_id: str,
+    base_folder_path: pathlib.Path,
+    pause_file_path: Union[pathlib.Path, None] = None,
+    control_file_path: Union[pathlib.Path, None] = None,
+) -> None:
+    _clean_past_sessions(base_folder_path=base_folder_path)
+    safe_download_convert_and_upload_raw_session(
+        session_id=session_id,
+        base_folder_path=base_folder_path,
+        log=False,  # Errors are recorded by the shared queue instead
+        pause_file_path=pause_file_path,
+        control_file_path=control_file_path,
+    )
+
+
 if __name__ == "__main__":
     assert "DANDI_API_KEY" in os.environ
 
-    if "jovyan" in str(pathlib.Path.cwd()):
+    pause_file_path = None
+    queue_folder_path = None
+    if len(sys.argv) > 2:  # CLI usage; any number of hosts share the work through the queue folder
+        base_folder_path = pathlib.Path(sys.argv[1])
+        queue_folder_path = pathlib.Path(sys.argv[2])
+        pause_file_path = queue_folder_path / "pause.txt"
+    elif "jovyan" in str(pathlib.Path.cwd()):
         base_folder_path = pathlib.Path("/home/jovyan/visual_coding")
         slice_range = slice(759, None)
     else:
@@ -72,6 +99,20 @@ if __name__ == "__main__":
     ]
 
     completed_session_ids = _get_completed_session_ids(base_folder_path=base_folder_path)
+
+    if queue_folder_path is not None:
+        session_queue = SessionLeaseQueue(queue_folder_path=queue_folder_path)
+        session_queue.add_sessions(session_ids=set(all_session_ids) - set(completed_session_ids))
+        control_file_path = base_folder_path / "control.json"  # Settings of this host only
+        run_leased_sessions(
+            session_queue=session_queue,
+            session_function=_convert_leased_session,
+            control_file_path=control_file_path,
+            base_folder_path=base_folder_path,
+            pause_file_path=pause_file_path,
+        )
+        sys.exit(0)
+
     uncompleted_session_ids = natsort.natsorted(list(set(all_session_ids) - set(completed_session_ids)))[slice_range]
     for uncompleted_session_id in tqdm.tqdm(
         iterable=uncompleted_session_ids,
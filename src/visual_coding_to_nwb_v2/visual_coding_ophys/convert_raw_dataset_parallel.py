@@ -4,17 +4,14 @@ import json
 import os
 import pathlib
 import shutil
-import subprocess
-from concurrent.futures import ProcessPoolExecutor, as_completed
 from typing import List, Union
 
 import natsort
-import tqdm
-from neuroconv.tools.processes import deploy_process
 
 from visual_coding_to_nwb_v2.visual_coding_ophys import (
     safe_download_convert_and_upload_raw_session,
 )
+from visual_coding_to_nwb_v2.visual_coding_ophys.tools import run_worker_pool
 
 
 def _get_completed_session_ids(base_folder_path: Union[str, pathlib.Path]) -> List[str]:
@@ -41,13 +38,18 @@ def _safe_convert_raw_session(session_id: str, base_folder_path: Union[str, path
     """
     When running in parallel, traceback to stderr per worker is not captured.
 
-    Also, deploying using subprocesses as a way to more easily release file handles for cleanup.
+    Each worker process converts many sessions in sequence; the source files of each session are explicitly closed
+    before cleanup, and the worker pool checks that no file handle survives into the next session.
     """
     base_folder_path = pathlib.Path(base_folder_path)
 
     _clean_past_sessions(base_folder_path=base_folder_path)
 
-    safe_download_convert_and_upload_raw_session(session_id=session_id, base_folder_path=base_folder_path)
+    safe_download_convert_and_upload_raw_session(
+        session_id=session_id,
+        base_folder_path=base_folder_path,
+        control_file_path=base_folder_path / "control.json",
+    )
 
 
 if __name__ == "__main__":
@@ -67,16 +69,16 @@ if __name__ == "__main__":
     with open(file=session_ids_file_path, mode="r") as fp:
         all_session_ids = json.load(fp=fp)
 
-    futures = list()
     completed_session_ids = _get_completed_session_ids(base_folder_path=base_folder_path)
     uncompleted_session_ids = natsort.natsorted(list(set(all_session_ids) - set(completed_session_ids)))[slice_range]
-    with ProcessPoolExecutor(max_workers=number_of_jobs) as executor:
-        for session_id in uncompleted_session_ids:
-            futures.append(
-                executor.submit(_safe_convert_raw_session, session_id=session_id, base_folder_path=base_folder_path)
-            )
-
-        for _ in tqdm.tqdm(
-            iterable=as_completed(futures), total=len(futures), desc="Converting raw visual coding dataset..."
-        ):
-            pass
+
+    # Edit while running to change the number of workers, bandwidth, or I/O priority, or to pause or drain the batch
+    control_file_path = base_folder_path / "control.json"
+
+    run_worker_pool(
+        session_ids=uncompleted_session_ids,
+        session_function=_safe_convert_raw_session,
+        number_of_workers=number_of_jobs,
+        control_file_path=control_file_path,
+        base_folder_path=base_folder_path,
+    )
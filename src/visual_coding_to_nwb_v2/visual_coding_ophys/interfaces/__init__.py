@@ -1,18 +1,57 @@
-"""Exposed imports for visual_coding_ophys.interfaces submodule."""
-
-from ._drifting_grating_stimulus import DriftingGratingStimulusInterface
-from ._epochs import EpochsInterface
-from ._eye_tracking import EyeTrackingInterface
-from ._general_metadata import VisualCodingMetadataInterface
-from ._locally_sparse_noise_stimulus import LocallySparseNoiseStimulusInterface
-from ._natural_movie_stimulus import NaturalMovieStimulusInterface
-from ._natural_scenes_stimulus import NaturalSceneStimulusInterface
-from ._processed_ophys import VisualCodingProcessedOphysInterface
-from ._pupil_tracking import PupilTrackingInterface
-from ._running_speed import RunningSpeedInterface
-from ._spontaneous_stimulus import SpontaneousStimulusInterface
-from ._static_grating_stimulus import StaticGratingStimulusInterface
-from ._two_photon_series import VisualCodingTwoPhotonSeriesInterface
+"""
+Exposed imports for visual_coding_ophys.interfaces submodule.
+
+Each interface is only imported from its private module upon first access, so using a single interface does not
+load every other one.
+"""
+
+import importlib
+from typing import TYPE_CHECKING
+
+_LAZY_IMPORTS = dict(
+    DriftingGratingStimulusInterface="._drifting_grating_stimulus",
+    EpochsInterface="._epochs",
+    EyeTrackingInterface="._eye_tracking",
+    VisualCodingMetadataInterface="._general_metadata",
+    LocallySparseNoiseStimulusInterface="._locally_sparse_noise_stimulus",
+    NaturalMovieStimulusInterface="._natural_movie_stimulus",
+    NaturalSceneStimulusInterface="._natural_scenes_stimulus",
+    VisualCodingProcessedOphysInterface="._processed_ophys",
+    PupilTrackingInterface="._pupil_tracking",
+    RunningSpeedInterface="._running_speed",
+    SpontaneousStimulusInterface="._spontaneous_stimulus",
+    StaticGratingStimulusInterface="._static_grating_stimulus",
+    VisualCodingTwoPhotonSeriesInterface="._two_photon_series",
+)
+
+if TYPE_CHECKING:
+    from ._drifting_grating_stimulus import DriftingGratingStimulusInterface
+    from ._epochs import EpochsInterface
+    from ._eye_tracking import EyeTrackingInterface
+    from ._general_metadata import VisualCodingMetadataInterface
+    from ._locally_sparse_noise_stimulus import LocallySparseNoiseStimulusInterface
+    from ._natural_movie_stimulus import NaturalMovieStimulusInterface
+    from ._natural_scenes_stimulus import NaturalSceneStimulusInterface
+    from ._processed_ophys import VisualCodingProcessedOphysInterface
+    from ._pupil_tracking import PupilTrackingInterface
+    from ._running_speed import RunningSpeedInterface
+    from ._spontaneous_stimulus import SpontaneousStimulusInterface
+    from ._static_grating_stimulus import StaticGratingStimulusInterface
+    from ._two_photon_series import VisualCodingTwoPhotonSeriesInterface
+
+
+def __getattr__(name: str):
+    if name not in _LAZY_IMPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+    value = getattr(importlib.import_module(name=_LAZY_IMPORTS[name], package=__name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
+
 
 __all__ = [
     "VisualCodingMetadataInterface",
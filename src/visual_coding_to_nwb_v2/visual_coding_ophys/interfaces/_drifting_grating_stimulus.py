@@ -1,16 +1,24 @@
 """Primary class for stimulus data specific to drifting gratings."""
 
-import h5py
 from neuroconv.basedatainterface import BaseDataInterface
 from pynwb.file import NWBFile, TimeIntervals
 
+from ..tools import open_source_file, read_source_dataset
+
 
 class DriftingGratingStimulusInterface(BaseDataInterface):
     """Stimulus interface specific to the natural scenes for visual coding ophys conversion."""
 
+    # The datasets of the v1 NWB file read in full by `add_to_nwbfile`, if present, so that they can be prefetched
+    source_dataset_paths = (
+        "stimulus/presentation/drifting_gratings_stimulus/timestamps",
+        "stimulus/presentation/drifting_gratings_stimulus/frame_duration",
+        "stimulus/presentation/drifting_gratings_stimulus/data",
+    )
+
     def __init__(self, v1_nwbfile_path: str):
         super().__init__(v1_nwbfile_path=v1_nwbfile_path)
-        self.v1_nwbfile = h5py.File(name=self.source_data["v1_nwbfile_path"], mode="r")
+        self.v1_nwbfile = open_source_file(file_path=self.source_data["v1_nwbfile_path"])
 
     def add_to_nwbfile(self, nwbfile: NWBFile, metadata: dict):
         if "drifting_gratings_stimulus" not in self.v1_nwbfile["stimulus"]["presentation"]:
@@ -46,9 +54,9 @@ class DriftingGratingStimulusInterface(BaseDataInterface):
             (frame_start, frame_stop),
             (temporal_frequency_in_hz, orientation_in_degrees, is_blank_sweep),
         ) in zip(
-            drifting_gratings_source["timestamps"][:],
-            drifting_gratings_source["frame_duration"][:],
-            drifting_gratings_source["data"][:],
+            read_source_dataset(dataset=drifting_gratings_source["timestamps"]),
+            read_source_dataset(dataset=drifting_gratings_source["frame_duration"]),
+            read_source_dataset(dataset=drifting_gratings_source["data"]),
         ):
             drifting_gratings.add_interval(
                 start_time=timestamp,
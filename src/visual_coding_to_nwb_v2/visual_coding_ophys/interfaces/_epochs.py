@@ -2,17 +2,21 @@
 
 import json
 
-import h5py
 from neuroconv.basedatainterface import BaseDataInterface
 from pynwb.file import NWBFile, TimeIntervals
 
+from ..tools import open_source_file, read_source_dataset
+
 
 class EpochsInterface(BaseDataInterface):
     """Stimulus interface specific to the natural scenes for visual coding ophys conversion."""
 
+    # The datasets of the v1 NWB file read in full by `add_to_nwbfile`, if present, so that they can be prefetched
+    source_dataset_paths = ("processing/brain_observatory_pipeline/DfOverF/imaging_plane_1/timestamps",)
+
     def __init__(self, v1_nwbfile_path: str, epoch_table_file_path: str):
         super().__init__(v1_nwbfile_path=v1_nwbfile_path, epoch_table_file_path=epoch_table_file_path)
-        self.v1_nwbfile = h5py.File(name=self.source_data["v1_nwbfile_path"], mode="r")
+        self.v1_nwbfile = open_source_file(file_path=self.source_data["v1_nwbfile_path"])
 
     def add_to_nwbfile(self, nwbfile: NWBFile, metadata: dict):
         with open(file=self.source_data["epoch_table_file_path"], mode="r") as io:
@@ -21,7 +25,7 @@ class EpochsInterface(BaseDataInterface):
         # The 'start' and 'end' values in this JSON file are the frame indices aligned to the ophys
         # So without loss of generality, choose them to come from the DfOverF
         source_ophys_module = self.v1_nwbfile["processing"]["brain_observatory_pipeline"]
-        ophys_timestamps = source_ophys_module["DfOverF"]["imaging_plane_1"]["timestamps"][:]
+        ophys_timestamps = read_source_dataset(dataset=source_ophys_module["DfOverF"]["imaging_plane_1"]["timestamps"])
 
         epoch_table = TimeIntervals(
             name="epochs",
@@ -1,22 +1,32 @@
 """Primary class for eye tracking data."""
 
-import h5py
+from typing import Optional
+
 from neuroconv.basedatainterface import BaseDataInterface
 from neuroconv.tools.nwb_helpers import get_module
 from pynwb.behavior import CompassDirection, EyeTracking, SpatialSeries
 from pynwb.file import NWBFile
 
-from .shared_methods import add_eye_tracking_device
+from .shared_methods import add_eye_tracking_device, get_timing_kwargs
+from ..tools import open_source_file, read_source_dataset
 
 
 class EyeTrackingInterface(BaseDataInterface):
     """Eye tracking interface for visual coding ophys conversion."""
 
+    # The datasets of the v1 NWB file read in full by `add_to_nwbfile`, if present, so that they can be prefetched
+    source_dataset_paths = (
+        "processing/brain_observatory_pipeline/EyeTracking/pupil_location/data",
+        "processing/brain_observatory_pipeline/EyeTracking/pupil_location/timestamps",
+        "processing/brain_observatory_pipeline/EyeTracking/pupil_location_spherical/data",
+        "processing/brain_observatory_pipeline/EyeTracking/pupil_location_spherical/timestamps",
+    )
+
     def __init__(self, v1_nwbfile_path: str):
         super().__init__(v1_nwbfile_path=v1_nwbfile_path)
-        self.v1_nwbfile = h5py.File(name=self.source_data["v1_nwbfile_path"], mode="r")
+        self.v1_nwbfile = open_source_file(file_path=self.source_data["v1_nwbfile_path"])
 
-    def add_to_nwbfile(self, nwbfile: NWBFile, metadata: dict):
+    def add_to_nwbfile(self, nwbfile: NWBFile, metadata: dict, jitter_tolerance: Optional[float] = None):
         if "Camera" not in nwbfile.devices:
             add_eye_tracking_device(nwbfile=nwbfile)
 
@@ -26,14 +36,21 @@ class EyeTrackingInterface(BaseDataInterface):
         eye_tracking_source_data = processing_source["EyeTracking"]
 
         # x, y grid
-        pupil_location_data = eye_tracking_source_data["pupil_location"]["data"][:]
-        pupil_location_timestamps = eye_tracking_source_data["pupil_location"]["timestamps"][:]
+        pupil_location_data = read_source_dataset(dataset=eye_tracking_source_data["pupil_location"]["data"])
+        pupil_location_timestamps = read_source_dataset(
+            dataset=eye_tracking_source_data["pupil_location"]["timestamps"]
+        )
 
         eye_tracking_spatial_series = SpatialSeries(
             name="pupil_location",
             description="Location of pupil focus on the visual grid.",
             data=pupil_location_data,
-            timestamps=pupil_location_timestamps,
+            **get_timing_kwargs(
+                nwbfile=nwbfile,
+                series_name="pupil_location",
+                timestamps=pupil_location_timestamps,
+                jitter_tolerance=jitter_tolerance,
+            ),
             unit="m",
             reference_frame="(0,0) is the center of the monitor.",
         )
@@ -43,14 +60,23 @@ class EyeTrackingInterface(BaseDataInterface):
         behavior_module.add_data_interface(eye_tracking)
 
         # Angular space
-        pupil_location_data_spherical = eye_tracking_source_data["pupil_location_spherical"]["data"][:]
-        pupil_location_timestamps_spherical = eye_tracking_source_data["pupil_location_spherical"]["timestamps"][:]
+        pupil_location_data_spherical = read_source_dataset(
+            dataset=eye_tracking_source_data["pupil_location_spherical"]["data"]
+        )
+        pupil_location_timestamps_spherical = read_source_dataset(
+            dataset=eye_tracking_source_data["pupil_location_spherical"]["timestamps"]
+        )
 
         eye_tracking_spatial_series_spherical = SpatialSeries(
             name="pupil_location_spherical",
             description="Angle of pupil focus on the visual grid.",
             data=pupil_location_data_spherical,
-            timestamps=pupil_location_timestamps_spherical,
+            **get_timing_kwargs(
+                nwbfile=nwbfile,
+                series_name="pupil_location_spherical",
+                timestamps=pupil_location_timestamps_spherical,
+                jitter_tolerance=jitter_tolerance,
+            ),
             unit="degrees",
             reference_frame=(
                 "(0,0) is the center of the monitor; angle of incidence is calculated with respect to a "
@@ -2,12 +2,13 @@
 
 from datetime import datetime
 
-import h5py
 from dateutil import tz
 from neuroconv.basedatainterface import BaseDataInterface
 from neuroconv.utils import DeepDict
 from pynwb.file import NWBFile
 
+from ..tools import open_source_file
+
 SESSION_TYPE_MAPPING = dict(three_session_A=3)
 
 
@@ -20,7 +21,7 @@ class VisualCodingMetadataInterface(BaseDataInterface):
     def get_metadata(self) -> DeepDict:
         metadata = super().get_metadata()
 
-        with h5py.File(name=self.source_data["v1_nwbfile_path"], mode="r") as v1_nwbfile:
+        with open_source_file(file_path=self.source_data["v1_nwbfile_path"]) as v1_nwbfile:
             session_start_time = datetime.strptime(
                 v1_nwbfile["session_start_time"][()].decode("utf-8"), "%a %b %d %H:%M:%S %Y"
             )
@@ -1,20 +1,37 @@
 """Primary class for stimulus data specific to locally sparse images."""
 
-import h5py
+from typing import Optional
+
 import numpy
 from neuroconv.basedatainterface import BaseDataInterface
 from pynwb.file import NWBFile
 from pynwb.image import Image, Images, IndexSeries
 
+from .shared_methods import get_timing_kwargs
+from ..tools import open_source_file, read_source_dataset
+
 
 class LocallySparseNoiseStimulusInterface(BaseDataInterface):
     """Stimulus interface specific to the locally sparse scenes for visual coding ophys conversion."""
 
+    # The datasets of the v1 NWB file read in full by `add_to_nwbfile`, if present, so that they can be prefetched
+    source_dataset_paths = (
+        "stimulus/templates/locally_sparse_noise_image_stack/data",
+        "stimulus/presentation/locally_sparse_noise_stimulus/data",
+        "stimulus/presentation/locally_sparse_noise_stimulus/timestamps",
+        "stimulus/templates/locally_sparse_noise_4deg_image_stack/data",
+        "stimulus/presentation/locally_sparse_noise_4deg_stimulus/data",
+        "stimulus/presentation/locally_sparse_noise_4deg_stimulus/timestamps",
+        "stimulus/templates/locally_sparse_noise_8deg_image_stack/data",
+        "stimulus/presentation/locally_sparse_noise_8deg_stimulus/data",
+        "stimulus/presentation/locally_sparse_noise_8deg_stimulus/timestamps",
+    )
+
     def __init__(self, v1_nwbfile_path: str):
         super().__init__(v1_nwbfile_path=v1_nwbfile_path)
-        self.v1_nwbfile = h5py.File(name=self.source_data["v1_nwbfile_path"], mode="r")
+        self.v1_nwbfile = open_source_file(file_path=self.source_data["v1_nwbfile_path"])
 
-    def add_to_nwbfile(self, nwbfile: NWBFile, metadata: dict):
+    def add_to_nwbfile(self, nwbfile: NWBFile, metadata: dict, jitter_tolerance: Optional[float] = None):
         name_variations = ["", "_4deg", "_8deg"]
 
         for name_variation in name_variations:
@@ -28,7 +45,7 @@ class LocallySparseNoiseStimulusInterface(BaseDataInterface):
             template_source = self.v1_nwbfile["stimulus"]["templates"][template_source_name]
 
             # Data should always be able to fit into RAM
-            source_images = template_source["data"][:]
+            source_images = read_source_dataset(dataset=template_source["data"])
 
             images = [
                 Image(
@@ -51,8 +68,10 @@ class LocallySparseNoiseStimulusInterface(BaseDataInterface):
             # Original dtype was int64, but there will never be negative values
             # and the were only be at most hundreds of templates
             # Would go with uint16, but HDMF coerces to uint32 anyway
-            natural_scenes_presentation_data = numpy.array(presentation_source["data"], dtype="uint32")
-            natural_scenes_presentation_timestamps = presentation_source["timestamps"][:]
+            natural_scenes_presentation_data = numpy.array(
+                read_source_dataset(dataset=presentation_source["data"]), dtype="uint32"
+            )
+            natural_scenes_presentation_timestamps = read_source_dataset(dataset=presentation_source["timestamps"])
 
             index_series = IndexSeries(
                 name=presentation_name,
@@ -60,6 +79,11 @@ class LocallySparseNoiseStimulusInterface(BaseDataInterface):
                 data=natural_scenes_presentation_data,
                 indexed_images=all_images,
                 unit="n.a.",
-                timestamps=natural_scenes_presentation_timestamps,
+                **get_timing_kwargs(
+                    nwbfile=nwbfile,
+                    series_name=presentation_name,
+                    timestamps=natural_scenes_presentation_timestamps,
+                    jitter_tolerance=jitter_tolerance,
+                ),
             )
             nwbfile.add_stimulus(timeseries=index_series)
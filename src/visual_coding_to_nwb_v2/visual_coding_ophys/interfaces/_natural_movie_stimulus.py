@@ -1,22 +1,60 @@
 """Primary class for stimulus data specific to natural movies."""
 
-import h5py
+import math
+from typing import Literal, Optional
+
 import numpy
 from neuroconv.basedatainterface import BaseDataInterface
+from neuroconv.tools.hdmf import SliceableDataChunkIterator
 from pynwb.file import NWBFile
 from pynwb.image import ImageSeries, IndexSeries
 
-from .shared_methods import add_stimulus_device
+from .shared_methods import add_stimulus_device, get_timing_kwargs
+from ..tools import (
+    create_presentation_run_table,
+    encode_presentation_runs,
+    open_source_dataset,
+    open_source_file,
+    read_source_dataset,
+)
 
 
 class NaturalMovieStimulusInterface(BaseDataInterface):
     """Stimulus interface specific to the natural movies for visual coding ophys conversion."""
 
+    # The datasets of the v1 NWB file read in full by `add_to_nwbfile`, if present, so that they can be prefetched
+    source_dataset_paths = (
+        "stimulus/presentation/natural_movie_one_stimulus/data",
+        "stimulus/presentation/natural_movie_one_stimulus/timestamps",
+        "stimulus/presentation/natural_movie_two_stimulus/data",
+        "stimulus/presentation/natural_movie_two_stimulus/timestamps",
+        "stimulus/presentation/natural_movie_three_stimulus/data",
+        "stimulus/presentation/natural_movie_three_stimulus/timestamps",
+    )
+
     def __init__(self, v1_nwbfile_path: str):
         super().__init__(v1_nwbfile_path=v1_nwbfile_path)
-        self.v1_nwbfile = h5py.File(name=self.source_data["v1_nwbfile_path"], mode="r")
+        self.v1_nwbfile = open_source_file(file_path=self.source_data["v1_nwbfile_path"])
+
+    def add_to_nwbfile(
+        self,
+        nwbfile: NWBFile,
+        metadata: dict,
+        jitter_tolerance: Optional[float] = None,
+        presentation_storage: Literal["frames", "runs", "both"] = "frames",
+    ):
+        """
+        Each presentation is stored as an `IndexSeries` with the frame and timestamp of every displayed frame, or if
+        `presentation_storage` is 'runs', as a '{presentation_name}_runs' table of the stimuli instead, with one row per
+        run of consecutive frames shown at a steady rate (such as each trial of the movie), or as both. The runs are
+        expanded back into every frame with `expand_natural_movie_presentation`, which recovers the timestamps to
+        within the `jitter_tolerance` if specified, or else exactly.
+
+        The templates are streamed from the source in buffers of whole frames rather than read into memory at once, and
+        written in chunks of a single frame, so that any frame can be read on its own.
+        """
+        assert presentation_storage in ("frames", "runs", "both"), "Unknown 'presentation_storage'!"
 
-    def add_to_nwbfile(self, nwbfile: NWBFile, metadata: dict):
         if "StimulusDisplay" not in nwbfile.devices:
             add_stimulus_device(nwbfile=nwbfile)
         stimulus_device = nwbfile.devices["StimulusDisplay"]
@@ -32,6 +70,7 @@ class NaturalMovieStimulusInterface(BaseDataInterface):
             "natural_movie_three_stimulus",
         ]
 
+        buffer_mb = 50.0
         for (source_name, image_series_name), presentation_name in zip(
             possible_template_name_map.items(), possible_presentation_names
         ):
@@ -39,13 +78,24 @@ class NaturalMovieStimulusInterface(BaseDataInterface):
                 continue
 
             # Template
-            natural_movie_template_source = self.v1_nwbfile["stimulus"]["templates"][source_name]
-            natural_movie_data = natural_movie_template_source["data"][:]
+            template_path = f"stimulus/templates/{source_name}/data"
+            template_shape = self.v1_nwbfile[template_path].shape
+            frame_size_bytes = math.prod(template_shape[1:]) * self.v1_nwbfile[template_path].dtype.itemsize
+            num_frames_per_buffer = int(buffer_mb * 1e6 / frame_size_bytes)
+
+            chunk_shape = (1, *template_shape[1:])
+            buffer_shape = (max(min(num_frames_per_buffer, template_shape[0]), 1), *template_shape[1:])
 
+            # Opened only once the buffers are known, since the first open handle of a dataset sets its chunk cache
+            natural_movie_data = open_source_dataset(
+                file=self.v1_nwbfile, name=template_path, buffer_shape=buffer_shape
+            )
             image_series = ImageSeries(
                 name=image_series_name,
                 description="A natural movie presented to the subject.",
-                data=natural_movie_data,
+                data=SliceableDataChunkIterator(
+                    data=natural_movie_data, chunk_shape=chunk_shape, buffer_shape=buffer_shape
+                ),
                 unit="n.a.",
                 # Closest core approximation to their ImageStack that allows efficient packaging of movie
                 starting_time=numpy.nan,
@@ -60,15 +110,41 @@ class NaturalMovieStimulusInterface(BaseDataInterface):
             # Original dtype was int64, but there will never be negative values
             # and the were only be at most thousands of frames in the template movies...
             # However, minimal data type for IndexSeries data is uint32, otherwise PyNWB throws warning
-            natural_movie_presentation_data = numpy.array(natural_movie_presentation_source["data"][:], dtype="uint32")
-            natural_movie_presentation_timestamps = natural_movie_presentation_source["timestamps"][:]
-
-            index_series = IndexSeries(
-                name=presentation_name,
-                description="The order and timing for presentation of frames from the the natural movie templates.",
-                data=natural_movie_presentation_data,
-                indexed_timeseries=image_series,
-                unit="n.a.",
-                timestamps=natural_movie_presentation_timestamps,
+            natural_movie_presentation_data = numpy.array(
+                read_source_dataset(dataset=natural_movie_presentation_source["data"]), dtype="uint32"
+            )
+            natural_movie_presentation_timestamps = read_source_dataset(
+                dataset=natural_movie_presentation_source["timestamps"]
             )
-            nwbfile.add_stimulus(timeseries=index_series)
+
+            if presentation_storage in ("frames", "both"):
+                index_series = IndexSeries(
+                    name=presentation_name,
+                    description="The order and timing for presentation of frames from the the natural movie templates.",
+                    data=natural_movie_presentation_data,
+                    indexed_timeseries=image_series,
+                    unit="n.a.",
+                    **get_timing_kwargs(
+                        nwbfile=nwbfile,
+                        series_name=presentation_name,
+                        timestamps=natural_movie_presentation_timestamps,
+                        jitter_tolerance=jitter_tolerance,
+                    ),
+                )
+                nwbfile.add_stimulus(timeseries=index_series)
+
+            if presentation_storage in ("runs", "both"):
+                presentation_run_table = create_presentation_run_table(
+                    name=f"{presentation_name}_runs",
+                    description=(
+                        f"The presentation of frames from the natural movie template '{image_series_name}', as runs of "
+                        "consecutive frames shown at a steady rate; a new run starts wherever a frame is repeated or "
+                        "skipped, or the display pauses between trials."
+                    ),
+                    presentation_runs=encode_presentation_runs(
+                        frame_indices=natural_movie_presentation_data,
+                        timestamps=natural_movie_presentation_timestamps,
+                        jitter_tolerance=jitter_tolerance,
+                    ),
+                )
+                nwbfile.add_stimulus(stimulus=presentation_run_table)
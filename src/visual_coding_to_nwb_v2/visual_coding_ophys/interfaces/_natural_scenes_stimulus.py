@@ -1,20 +1,32 @@
 """Primary class for stimulus data specific to natural scenes."""
 
-import h5py
+from typing import Optional
+
 import numpy
 from neuroconv.basedatainterface import BaseDataInterface
 from pynwb.file import NWBFile
 from pynwb.image import Image, Images, IndexSeries
 
+from .shared_methods import get_timing_kwargs
+from ..tools import open_source_file, read_source_dataset
+
 
 class NaturalSceneStimulusInterface(BaseDataInterface):
     """Stimulus interface specific to the natural scenes for visual coding ophys conversion."""
 
+    # The datasets of the v1 NWB file read in full by `add_to_nwbfile`, if present, so that they can be prefetched
+    source_dataset_paths = (
+        "stimulus/templates/natural_scenes_image_stack/data",
+        "stimulus/presentation/natural_scenes_stimulus/data",
+        "stimulus/presentation/natural_scenes_stimulus/timestamps",
+        "stimulus/presentation/natural_scenes_stimulus/frame_duration",
+    )
+
     def __init__(self, v1_nwbfile_path: str):
         super().__init__(v1_nwbfile_path=v1_nwbfile_path)
-        self.v1_nwbfile = h5py.File(name=self.source_data["v1_nwbfile_path"], mode="r")
+        self.v1_nwbfile = open_source_file(file_path=self.source_data["v1_nwbfile_path"])
 
-    def add_to_nwbfile(self, nwbfile: NWBFile, metadata: dict):
+    def add_to_nwbfile(self, nwbfile: NWBFile, metadata: dict, jitter_tolerance: Optional[float] = None):
         # Early exit based on template presence
         if "natural_scenes_image_stack" not in self.v1_nwbfile["stimulus"]["templates"]:
             return
@@ -24,7 +36,7 @@ class NaturalSceneStimulusInterface(BaseDataInterface):
 
         # Original data was in float32 for some reason, even though data values were uint8
         # Data should always be able to fit into RAM
-        source_images = numpy.array(natural_scenes_template_source["data"], dtype="uint8")
+        source_images = numpy.array(read_source_dataset(dataset=natural_scenes_template_source["data"]), dtype="uint8")
         images = [
             Image(
                 name=f"NaturalScene{image_index}",
@@ -46,14 +58,20 @@ class NaturalSceneStimulusInterface(BaseDataInterface):
         # Original dtype was int64, but there will never be negative values
         # and the were only be at most hundreds of templates
         # Would go with uint16, but HDMF coerces to uint32 anyway
-        natural_scenes_presentation_data = numpy.array(natural_scenes_presentation_source["data"], dtype="uint32")
-        natural_scenes_presentation_timestamps = natural_scenes_presentation_source["timestamps"][:]
+        natural_scenes_presentation_data = numpy.array(
+            read_source_dataset(dataset=natural_scenes_presentation_source["data"]), dtype="uint32"
+        )
+        natural_scenes_presentation_timestamps = read_source_dataset(
+            dataset=natural_scenes_presentation_source["timestamps"]
+        )
 
         # The data consists of many repeated presentations, so an IndexSeries is ideal
         # However, there is also a duration at which each image was presented...
         index_series_description = "The order and timing for presentation of the natural scene templates."
 
-        unique_frame_duration = numpy.unique(numpy.diff(natural_scenes_presentation_source["frame_duration"]))
+        unique_frame_duration = numpy.unique(
+            numpy.diff(read_source_dataset(dataset=natural_scenes_presentation_source["frame_duration"]))
+        )
         if unique_frame_duration.shape[0] == 1:
             frames_per_second = 60  # as taken from the 'cycle' value in the Allen SDK
             duration_in_seconds = unique_frame_duration[0] / frames_per_second
@@ -65,6 +83,11 @@ class NaturalSceneStimulusInterface(BaseDataInterface):
             data=natural_scenes_presentation_data,
             indexed_images=all_images,
             unit="n.a.",
-            timestamps=natural_scenes_presentation_timestamps,
+            **get_timing_kwargs(
+                nwbfile=nwbfile,
+                series_name="natural_scenes_stimulus",
+                timestamps=natural_scenes_presentation_timestamps,
+                jitter_tolerance=jitter_tolerance,
+            ),
         )
         nwbfile.add_stimulus(timeseries=index_series)
@@ -1,10 +1,10 @@
 """Primary class for two photon series."""
 
-from typing import Union
+import warnings
+from typing import List, Literal, Optional, Union
 
-import h5py
 import numpy
-from hdmf.common import DynamicTable, VectorData
+from hdmf.common import DynamicTable, DynamicTableRegion, VectorData, VectorIndex
 from neuroconv.basedatainterface import BaseDataInterface
 from neuroconv.tools.nwb_helpers import get_module
 from pynwb.file import NWBFile
@@ -17,18 +17,98 @@ from pynwb.ophys import (
     RoiResponseSeries,
 )
 
-from .shared_methods import add_imaging_device, add_imaging_plane
+from .shared_methods import (
+    add_imaging_device,
+    add_imaging_plane,
+    get_linked_timing_kwargs,
+    get_timing_kwargs,
+)
+from ..tools import (
+    ROI_SPATIAL_INDEX_COLUMNS,
+    compute_condition_responses,
+    compute_roi_spatial_index,
+    create_condition_response_table,
+    extract_response_tensor,
+    open_source_file,
+    read_source_dataset,
+    sparsify_events,
+)
+
+# The conditions of each stimulus to summarize the responses to, by the name of its presentation in the v1 NWB file;
+# each parameter column is taken from that column of the source data, or from the data itself if it is 1D
+CONDITION_RESPONSE_STIMULI = dict(
+    drifting_gratings_stimulus=dict(
+        table_name="DriftingGratingsResponses",
+        description="drifting gratings, by orientation and temporal frequency",
+        duration=2.0,
+        parameter_columns=dict(
+            orientation_in_degrees=(1, "Angle of the grating in degrees. NaN for the blank sweep.", "float64"),
+            temporal_frequency_in_hz=(0, "The speed at which the grating moves. NaN for the blank sweep.", "float64"),
+        ),
+    ),
+    static_gratings_stimulus=dict(
+        table_name="StaticGratingsResponses",
+        description="static gratings, by orientation, spatial frequency, and phase",
+        duration=0.25,
+        parameter_columns=dict(
+            orientation_in_degrees=(0, "Angle of the grating in degrees. NaN for the blank sweep.", "float64"),
+            spatial_frequency_in_cycles_per_degree=(
+                1,
+                "Period of the grating in cycles/degree. NaN for the blank sweep.",
+                "float64",
+            ),
+            phase=(2, "Relative position of the grating. NaN for the blank sweep.", "float64"),
+        ),
+    ),
+    natural_scenes_stimulus=dict(
+        table_name="NaturalScenesResponses",
+        description="natural scenes, by the index of the scene",
+        duration=0.25,
+        parameter_columns=dict(
+            scene_index=(None, "The index of the scene in the 'natural_scenes_template'; -1 for a blank.", "int32"),
+        ),
+    ),
+)
 
 
 class VisualCodingProcessedOphysInterface(BaseDataInterface):
     """Two photon calcium imaging interface for visual coding ophys conversion."""
 
+    # The datasets of the v1 NWB file read in full by `add_to_nwbfile`, if present, so that they can be prefetched
+    source_dataset_paths = (
+        "processing/brain_observatory_pipeline/ImageSegmentation/imaging_plane_1/reference_images/maximum_intensity_projection_image/data",
+        "processing/brain_observatory_pipeline/Fluorescence/imaging_plane_1/data",
+        "processing/brain_observatory_pipeline/Fluorescence/imaging_plane_1/timestamps",
+        "processing/brain_observatory_pipeline/Fluorescence/imaging_plane_1_neuropil_response/data",
+        "processing/brain_observatory_pipeline/Fluorescence/imaging_plane_1_demixed_signal/data",
+        "processing/brain_observatory_pipeline/DfOverF/imaging_plane_1/data",
+        "processing/brain_observatory_pipeline/Fluorescence/imaging_plane_1/r",
+        "processing/brain_observatory_pipeline/Fluorescence/imaging_plane_1/rmse",
+    )
+
     def __init__(self, v1_nwbfile_path: str, df_over_f_events_file_path: Union[str, None] = None):
-        self.v1_nwbfile = h5py.File(name=v1_nwbfile_path, mode="r")
+        self.v1_nwbfile = open_source_file(file_path=v1_nwbfile_path)
         self.df_over_f_events_file_path = df_over_f_events_file_path
         super().__init__(v1_nwbfile_path=v1_nwbfile_path, df_over_f_events_file_path=df_over_f_events_file_path)
 
-    def add_to_nwbfile(self, nwbfile: NWBFile, metadata: dict, stub_test: bool = False):
+    def add_to_nwbfile(
+        self,
+        nwbfile: NWBFile,
+        metadata: dict,
+        stub_test: bool = False,
+        jitter_tolerance: Optional[float] = None,
+        df_over_f_events_storage: Literal["dense", "sparse"] = "dense",
+        add_condition_responses: bool = False,
+    ):
+        """
+        The dF/F events are either stored as a dense (time, roi) series alongside the dF/F, or if
+        `df_over_f_events_storage` is 'sparse', as the frames and amplitudes of the events of each ROI in the
+        'DfOverFEvents' table of the processing module.
+
+        If `add_condition_responses` is True, the mean and standard error of the dF/F of each ROI during the
+        presentations of each condition of the gratings and natural scenes are added to the processing module as well,
+        in one table per stimulus; see `CONDITION_RESPONSE_STIMULI`.
+        """
         ophys_module = get_module(
             nwbfile=nwbfile, name="ophys", description="Contains processed optical physiology data."
         )
@@ -39,7 +119,9 @@ class VisualCodingProcessedOphysInterface(BaseDataInterface):
         source_reference_image = source_plane_segmentation["reference_images"]
 
         # Add reference image
-        maximum_intensity_projection_data = source_reference_image["maximum_intensity_projection_image"]["data"][:]
+        maximum_intensity_projection_data = read_source_dataset(
+            dataset=source_reference_image["maximum_intensity_projection_image"]["data"]
+        )
         maximum_intensity_projection_image = Image(
             name="maximum_intensity_projection",
             description="Summary image calculated from maximum intensity of the plane.",
@@ -91,11 +173,19 @@ class VisualCodingProcessedOphysInterface(BaseDataInterface):
             name="global_roi_id", description="The global ID assigned to each unique ROI across sessions."
         )
 
-        for global_roi_id, pixel_mask, global_roi_id in zip(local_roi_ids, pixel_masks, global_roi_ids):
+        # Precompute the footprint of each ROI, so that they can be located without reading every pixel mask
+        roi_spatial_index = compute_roi_spatial_index(pixel_masks=pixel_masks)
+        for column_name, column_description in ROI_SPATIAL_INDEX_COLUMNS.items():
+            plane_segmentation.add_column(name=column_name, description=column_description)
+
+        for roi_index, (global_roi_id, pixel_mask, global_roi_id) in enumerate(
+            zip(local_roi_ids, pixel_masks, global_roi_ids)
+        ):
             plane_segmentation.add_roi(
                 id=global_roi_id,
                 pixel_mask=pixel_mask,
                 global_roi_id=global_roi_id,
+                **{column_name: roi_spatial_index[column_name][roi_index] for column_name in ROI_SPATIAL_INDEX_COLUMNS},
             )
 
         ophys_module.add(
@@ -105,9 +195,13 @@ class VisualCodingProcessedOphysInterface(BaseDataInterface):
         # Add fluorescence, neuropil response, and demixed signal
         # Small enough to fit in RAM
 
-        neuropil_data = source_ophys_module["Fluorescence"]["imaging_plane_1_neuropil_response"]["data"][:].T
-        corrected_fluorescence_data = source_ophys_module["Fluorescence"]["imaging_plane_1"]["data"][:].T
-        timestamps = source_ophys_module["Fluorescence"]["imaging_plane_1"]["timestamps"][:]
+        neuropil_data = read_source_dataset(
+            dataset=source_ophys_module["Fluorescence"]["imaging_plane_1_neuropil_response"]["data"]
+        ).T
+        corrected_fluorescence_data = read_source_dataset(
+            dataset=source_ophys_module["Fluorescence"]["imaging_plane_1"]["data"]
+        ).T
+        timestamps = read_source_dataset(dataset=source_ophys_module["Fluorescence"]["imaging_plane_1"]["timestamps"])
 
         region_indices = list(range(number_of_rois))  # Indices into plane segmentation table that uses global IDs
         roi_table_region = plane_segmentation.create_roi_table_region(
@@ -122,7 +216,9 @@ class VisualCodingProcessedOphysInterface(BaseDataInterface):
                 "of neuropil background, but prior to dF/F normalization."
             ),
             data=corrected_fluorescence_data,
-            timestamps=timestamps,
+            **get_timing_kwargs(
+                nwbfile=nwbfile, series_name="Corrected", timestamps=timestamps, jitter_tolerance=jitter_tolerance
+            ),
             unit="n.a.",
             rois=roi_table_region,
         )
@@ -130,7 +226,7 @@ class VisualCodingProcessedOphysInterface(BaseDataInterface):
             name="Neuropil",
             description="Fluorescence contaminated by background neuropil.",
             data=neuropil_data,
-            timestamps=corrected_series,  # Link timestamps
+            **get_linked_timing_kwargs(time_series=corrected_series),  # Link timestamps
             unit="n.a.",
             rois=roi_table_region,
         )
@@ -139,12 +235,14 @@ class VisualCodingProcessedOphysInterface(BaseDataInterface):
 
         # Demixed is occasionally missing; e.g., session ID 507691476
         if "imaging_plane_1_demixed_signal" in source_ophys_module["Fluorescence"]:
-            demixed_data = source_ophys_module["Fluorescence"]["imaging_plane_1_demixed_signal"]["data"][:].T
+            demixed_data = read_source_dataset(
+                dataset=source_ophys_module["Fluorescence"]["imaging_plane_1_demixed_signal"]["data"]
+            ).T
             demixed_series = RoiResponseSeries(
                 name="Demixed",
                 description="Spatially demixed traces of potentially overlapping masks.",
                 data=demixed_data,
-                timestamps=corrected_series,  # Link timestamps
+                **get_linked_timing_kwargs(time_series=corrected_series),  # Link timestamps
                 unit="n.a.",
                 rois=roi_table_region,
             )
@@ -154,7 +252,7 @@ class VisualCodingProcessedOphysInterface(BaseDataInterface):
         ophys_module.add(data_interfaces=[fluorescence])
 
         # Add dF/F
-        df_over_f_data = source_ophys_module["DfOverF"]["imaging_plane_1"]["data"][:].T
+        df_over_f_data = read_source_dataset(dataset=source_ophys_module["DfOverF"]["imaging_plane_1"]["data"]).T
 
         df_over_f_series = RoiResponseSeries(
             name="DfOverF",
@@ -163,7 +261,7 @@ class VisualCodingProcessedOphysInterface(BaseDataInterface):
                 "Please consult the AllenSDK for details of the calculation."
             ),
             data=df_over_f_data,
-            timestamps=corrected_series,  # Link timestamps
+            **get_linked_timing_kwargs(time_series=corrected_series),  # Link timestamps
             unit="a.u.",
             rois=roi_table_region,
         )
@@ -171,29 +269,34 @@ class VisualCodingProcessedOphysInterface(BaseDataInterface):
         all_df_over_f_series = [df_over_f_series]
 
         # Add dF/F events
-        if self.df_over_f_events_file_path is not None:
-            df_over_f_events_data = numpy.load(file=self.df_over_f_events_file_path)
-
-            df_over_f_event_series = RoiResponseSeries(
-                name="DfOverFEvents",
-                description=(
-                    "Events from the ΔF/F detected using the L0 method from the AllenSDK. "
-                    "Please consult the AllenSDK for more details of the calculation."
-                ),
-                data=df_over_f_events_data,
-                timestamps=corrected_series,  # Link timestamps
-                unit="a.u.",
-                rois=roi_table_region,
+        if self.df_over_f_events_file_path is not None and df_over_f_events_storage == "dense":
+            all_df_over_f_series.append(
+                self._create_df_over_f_event_series(
+                    corrected_series=corrected_series, roi_table_region=roi_table_region
+                )
+            )
+        elif self.df_over_f_events_file_path is not None:
+            ophys_module.add(
+                data_interfaces=[self._create_df_over_f_event_table(plane_segmentation=plane_segmentation)]
             )
-
-            all_df_over_f_series.append(df_over_f_event_series)
 
         df_over_f = DfOverF(name="DfOverF", roi_response_series=all_df_over_f_series)
         ophys_module.add(data_interfaces=[df_over_f])
 
+        if add_condition_responses:
+            ophys_module.add(
+                data_interfaces=self._create_condition_response_tables(
+                    df_over_f_data=df_over_f_data, timestamps=timestamps
+                )
+            )
+
         # Include contamination ratio
-        contamination_ratio_data = source_ophys_module["Fluorescence"]["imaging_plane_1"]["r"][:]
-        contamination_ratio_mse_data = source_ophys_module["Fluorescence"]["imaging_plane_1"]["rmse"][:]
+        contamination_ratio_data = read_source_dataset(
+            dataset=source_ophys_module["Fluorescence"]["imaging_plane_1"]["r"]
+        )
+        contamination_ratio_mse_data = read_source_dataset(
+            dataset=source_ophys_module["Fluorescence"]["imaging_plane_1"]["rmse"]
+        )
 
         contamination_ratio_table = DynamicTable(
             name="ContaminationRatios",
@@ -221,3 +324,127 @@ class VisualCodingProcessedOphysInterface(BaseDataInterface):
             ],
         )
         ophys_module.add(data_interfaces=[contamination_ratio_table])
+
+    def _create_condition_response_tables(
+        self, df_over_f_data: numpy.ndarray, timestamps: numpy.ndarray
+    ) -> List[DynamicTable]:
+        """Summarize the dF/F while it is in memory, by its mean over each presentation of each stimulus."""
+        source_presentations = self.v1_nwbfile["stimulus"]["presentation"]
+
+        condition_response_tables = list()
+        for presentation_name, stimulus in CONDITION_RESPONSE_STIMULI.items():
+            if presentation_name not in source_presentations:
+                continue
+
+            source_data = read_source_dataset(dataset=source_presentations[presentation_name]["data"])
+            source_data = source_data.reshape(len(source_data), -1)
+            trial_conditions = numpy.stack(
+                [
+                    source_data[:, 0 if column_index is None else column_index]
+                    for column_index, _, _ in stimulus["parameter_columns"].values()
+                ],
+                axis=1,
+            )
+
+            response_tensor = extract_response_tensor(
+                data=df_over_f_data,
+                timestamps=timestamps,
+                event_times=read_source_dataset(dataset=source_presentations[presentation_name]["timestamps"]),
+                window=(0.0, stimulus["duration"]),
+            )
+            with warnings.catch_warnings():
+                warnings.simplefilter(action="ignore", category=RuntimeWarning)  # Windows entirely outside the session
+                trial_responses = numpy.nanmean(response_tensor, axis=2)
+
+            condition_response_tables.append(
+                create_condition_response_table(
+                    name=stimulus["table_name"],
+                    description=(
+                        f"The mean and standard error of the ΔF/F of each ROI over the {stimulus['duration']} seconds "
+                        f"of each presentation of the {stimulus['description']}."
+                    ),
+                    condition_responses=compute_condition_responses(
+                        trial_responses=trial_responses, trial_conditions=trial_conditions
+                    ),
+                    condition_columns={
+                        column_name: (column_description, column_dtype)
+                        for column_name, (_, column_description, column_dtype) in stimulus["parameter_columns"].items()
+                    },
+                )
+            )
+
+        return condition_response_tables
+
+    def _create_df_over_f_event_series(
+        self, corrected_series: RoiResponseSeries, roi_table_region: DynamicTableRegion
+    ) -> RoiResponseSeries:
+        df_over_f_events_data = numpy.load(file=self.df_over_f_events_file_path)
+
+        return RoiResponseSeries(
+            name="DfOverFEvents",
+            description=(
+                "Events from the ΔF/F detected using the L0 method from the AllenSDK. "
+                "Please consult the AllenSDK for more details of the calculation."
+            ),
+            data=df_over_f_events_data,
+            **get_linked_timing_kwargs(time_series=corrected_series),  # Link timestamps
+            unit="a.u.",
+            rois=roi_table_region,
+        )
+
+    def _create_df_over_f_event_table(self, plane_segmentation: PlaneSegmentation) -> DynamicTable:
+        sparse_events = sparsify_events(data=numpy.load(file=self.df_over_f_events_file_path))
+
+        frame_indices = VectorData(
+            name="frame_indices",
+            description=(
+                "The frames of the nonzero events of each region of interest (ROI), as indices into the timestamps "
+                "of the 'Corrected' fluorescence."
+            ),
+            data=sparse_events["frame_indices"],
+        )
+        amplitudes = VectorData(
+            name="amplitudes", description="The amplitude of each of these events.", data=sparse_events["amplitudes"]
+        )
+        return DynamicTable(
+            name="DfOverFEvents",
+            description=(
+                "Events from the ΔF/F detected using the L0 method from the AllenSDK, stored sparsely with one row per "
+                "region of interest (ROI); frames without an event have an amplitude of zero. "
+                "Please consult the AllenSDK for more details of the calculation."
+            ),
+            columns=[
+                DynamicTableRegion(
+                    name="roi",
+                    description="The region of interest (ROI) of these events.",
+                    data=list(range(len(plane_segmentation))),
+                    table=plane_segmentation,
+                ),
+                frame_indices,
+                VectorIndex(name="frame_indices_index", data=sparse_events["index"], target=frame_indices),
+                amplitudes,
+                VectorIndex(name="amplitudes_index", data=sparse_events["index"], target=amplitudes),
+            ],
+        )
+
+    def add_df_over_f_events_to_nwbfile(
+        self, nwbfile: NWBFile, df_over_f_events_storage: Literal["dense", "sparse"] = "dense"
+    ) -> None:
+        """Add only the dF/F events, to an NWB file that already holds the rest of the processed data."""
+        ophys_module = nwbfile.processing["ophys"]
+        plane_segmentation = ophys_module["ImageSegmentation"]["PlaneSegmentation"]
+        if df_over_f_events_storage == "sparse":
+            ophys_module.add(
+                data_interfaces=[self._create_df_over_f_event_table(plane_segmentation=plane_segmentation)]
+            )
+            return
+
+        roi_table_region = plane_segmentation.create_roi_table_region(
+            region=list(range(len(plane_segmentation))),
+            description="The regions of interest (ROIs) this response series refers to.",
+        )
+
+        df_over_f_event_series = self._create_df_over_f_event_series(
+            corrected_series=ophys_module["Fluorescence"]["Corrected"], roi_table_region=roi_table_region
+        )
+        ophys_module["DfOverF"].add_roi_response_series(roi_response_series=df_over_f_event_series)
@@ -1,39 +1,52 @@
 """Primary class for pupil tracking data."""
 
-import h5py
+from typing import Optional
+
 from neuroconv.basedatainterface import BaseDataInterface
 from neuroconv.tools.nwb_helpers import get_module
 from pynwb.base import TimeSeries
 from pynwb.behavior import PupilTracking
 from pynwb.file import NWBFile
 
-from .shared_methods import add_eye_tracking_device
+from .shared_methods import add_eye_tracking_device, get_timing_kwargs
+from ..tools import open_source_file, read_source_dataset
 
 
 class PupilTrackingInterface(BaseDataInterface):
     """Pupil tracking interface for visual coding ophys conversion."""
 
+    # The datasets of the v1 NWB file read in full by `add_to_nwbfile`, if present, so that they can be prefetched
+    source_dataset_paths = (
+        "processing/brain_observatory_pipeline/PupilTracking/pupil_size/data",
+        "processing/brain_observatory_pipeline/PupilTracking/pupil_size/timestamps",
+    )
+
     def __init__(self, v1_nwbfile_path: str):
         super().__init__(v1_nwbfile_path=v1_nwbfile_path)
-        self.v1_nwbfile = h5py.File(name=self.source_data["v1_nwbfile_path"], mode="r")
+        self.v1_nwbfile = open_source_file(file_path=self.source_data["v1_nwbfile_path"])
 
-    def add_to_nwbfile(self, nwbfile: NWBFile, metadata: dict):
+    def add_to_nwbfile(self, nwbfile: NWBFile, metadata: dict, jitter_tolerance: Optional[float] = None):
         if "Camera" not in nwbfile.devices:
             add_eye_tracking_device(nwbfile=nwbfile)
 
         processing_source = self.v1_nwbfile["processing"]["brain_observatory_pipeline"]
         if "PupilTracking" not in processing_source:
             return
-        pupil_size_data = processing_source["PupilTracking"]["pupil_size"]["data"][:]
-        pupil_size_timestamps = self.v1_nwbfile["processing"]["brain_observatory_pipeline"]["PupilTracking"][
-            "pupil_size"
-        ]["timestamps"][:]
+        pupil_size_data = read_source_dataset(dataset=processing_source["PupilTracking"]["pupil_size"]["data"])
+        pupil_size_timestamps = read_source_dataset(
+            dataset=processing_source["PupilTracking"]["pupil_size"]["timestamps"]
+        )
 
         pupil_time_series = TimeSeries(
             name="pupil_size",
             description="Size of pupil dilation in units pixels.",
             data=pupil_size_data,
-            timestamps=pupil_size_timestamps,
+            **get_timing_kwargs(
+                nwbfile=nwbfile,
+                series_name="pupil_size",
+                timestamps=pupil_size_timestamps,
+                jitter_tolerance=jitter_tolerance,
+            ),
             unit="px",
         )
         pupil_tracking = PupilTracking(time_series=[pupil_time_series])
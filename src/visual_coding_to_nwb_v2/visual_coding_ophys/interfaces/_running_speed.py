@@ -1,21 +1,31 @@
 """Primary class for running speed data."""
 
-import h5py
+from typing import Optional
+
 from neuroconv.basedatainterface import BaseDataInterface
 from neuroconv.tools.nwb_helpers import get_module
 from pynwb import TimeSeries
 from pynwb.behavior import BehavioralTimeSeries
 from pynwb.file import NWBFile
 
+from .shared_methods import get_timing_kwargs
+from ..tools import open_source_file, read_source_dataset
+
 
 class RunningSpeedInterface(BaseDataInterface):
     """Running speed interface for visual coding ophys conversion."""
 
+    # The datasets of the v1 NWB file read in full by `add_to_nwbfile`, if present, so that they can be prefetched
+    source_dataset_paths = (
+        "processing/brain_observatory_pipeline/BehavioralTimeSeries/running_speed/data",
+        "processing/brain_observatory_pipeline/BehavioralTimeSeries/running_speed/timestamps",
+    )
+
     def __init__(self, v1_nwbfile_path: str):
         super().__init__(v1_nwbfile_path=v1_nwbfile_path)
-        self.v1_nwbfile = h5py.File(name=self.source_data["v1_nwbfile_path"], mode="r")
+        self.v1_nwbfile = open_source_file(file_path=self.source_data["v1_nwbfile_path"])
 
-    def add_to_nwbfile(self, nwbfile: NWBFile, metadata: dict):
+    def add_to_nwbfile(self, nwbfile: NWBFile, metadata: dict, jitter_tolerance: Optional[float] = None):
         processing_source = self.v1_nwbfile["processing"]["brain_observatory_pipeline"]
         if (
             "BehavioralTimeSeries" not in processing_source
@@ -25,8 +35,8 @@ class RunningSpeedInterface(BaseDataInterface):
         running_speed_source = processing_source["BehavioralTimeSeries"]["running_speed"]
 
         # x, y grid
-        running_speed_data = running_speed_source["data"][:]
-        running_speed_timestamps = running_speed_source["timestamps"][:]
+        running_speed_data = read_source_dataset(dataset=running_speed_source["data"])
+        running_speed_timestamps = read_source_dataset(dataset=running_speed_source["timestamps"])
 
         running_speed_time_series = TimeSeries(
             name="running_speed",
@@ -37,7 +47,12 @@ class RunningSpeedInterface(BaseDataInterface):
                 "match the timing of the 2-photon imaging (30 Hz)."
             ),
             data=running_speed_data,
-            timestamps=running_speed_timestamps,
+            **get_timing_kwargs(
+                nwbfile=nwbfile,
+                series_name="running_speed",
+                timestamps=running_speed_timestamps,
+                jitter_tolerance=jitter_tolerance,
+            ),
             unit="cm/s",  # Note, original data said 'frame' but SDK docs said 'cm/s' and did not modify source
         )
         behavioral_time_series = BehavioralTimeSeries(time_series=running_speed_time_series)
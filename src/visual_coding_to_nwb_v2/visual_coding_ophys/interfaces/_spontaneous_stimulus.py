@@ -1,16 +1,17 @@
 """Primary class for stimulus data specific to a spontaneous stimulus."""
 
-import h5py
 from neuroconv.basedatainterface import BaseDataInterface
 from pynwb.file import NWBFile, TimeIntervals
 
+from ..tools import open_source_file
+
 
 class SpontaneousStimulusInterface(BaseDataInterface):
     """Tnterface specific to a spontaneous stimulus for visual coding ophys conversion."""
 
     def __init__(self, v1_nwbfile_path: str):
         super().__init__(v1_nwbfile_path=v1_nwbfile_path)
-        self.v1_nwbfile = h5py.File(name=self.source_data["v1_nwbfile_path"], mode="r")
+        self.v1_nwbfile = open_source_file(file_path=self.source_data["v1_nwbfile_path"])
 
     def add_to_nwbfile(self, nwbfile: NWBFile, metadata: dict):
         if "spontaneous_stimulus" not in self.v1_nwbfile["stimulus"]["presentation"]:
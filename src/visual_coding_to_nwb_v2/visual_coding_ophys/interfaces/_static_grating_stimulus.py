@@ -1,17 +1,25 @@
 """Primary class for stimulus data specific to static gratings."""
 
-import h5py
 import numpy
 from neuroconv.basedatainterface import BaseDataInterface
 from pynwb.file import NWBFile, TimeIntervals
 
+from ..tools import open_source_file, read_source_dataset
+
 
 class StaticGratingStimulusInterface(BaseDataInterface):
     """Stimulus interface specific to the natural scenes for visual coding ophys conversion."""
 
+    # The datasets of the v1 NWB file read in full by `add_to_nwbfile`, if present, so that they can be prefetched
+    source_dataset_paths = (
+        "stimulus/presentation/static_gratings_stimulus/data",
+        "stimulus/presentation/static_gratings_stimulus/timestamps",
+        "stimulus/presentation/static_gratings_stimulus/frame_duration",
+    )
+
     def __init__(self, v1_nwbfile_path: str):
         super().__init__(v1_nwbfile_path=v1_nwbfile_path)
-        self.v1_nwbfile = h5py.File(name=self.source_data["v1_nwbfile_path"], mode="r")
+        self.v1_nwbfile = open_source_file(file_path=self.source_data["v1_nwbfile_path"])
 
     def add_to_nwbfile(self, nwbfile: NWBFile, metadata: dict):
         if "static_gratings_stimulus" not in self.v1_nwbfile["stimulus"]["presentation"]:
@@ -41,7 +49,7 @@ class StaticGratingStimulusInterface(BaseDataInterface):
 
         duration = 0.25  # Duration of presentation was hard coded and not explicitly synchronized
         # The 'frame_start, frame_stop' are nearest interpolations of ophys frames, not to the source sampling frequency
-        static_gratings_data = static_gratings_source["data"][:]
+        static_gratings_data = read_source_dataset(dataset=static_gratings_source["data"])
         static_gratings_nan = numpy.isnan(static_gratings_data)
         blank_sweeps = static_gratings_nan[0] & static_gratings_nan[1] & static_gratings_nan[2]
         for (
@@ -50,8 +58,8 @@ class StaticGratingStimulusInterface(BaseDataInterface):
             (orientation_in_degrees, spatial_frequency_in_cycles_per_degree, phase),
             is_blank_sweep,
         ) in zip(
-            static_gratings_source["timestamps"][:],
-            static_gratings_source["frame_duration"][:],
+            read_source_dataset(dataset=static_gratings_source["timestamps"]),
+            read_source_dataset(dataset=static_gratings_source["frame_duration"]),
             static_gratings_data,
             blank_sweeps,
         ):
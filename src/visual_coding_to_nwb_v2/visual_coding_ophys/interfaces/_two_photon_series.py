@@ -1,21 +1,51 @@
 """Primary class for two photon series."""
 
-import h5py
+import math
+from typing import List, Optional, Tuple
+
 import numpy
 import pynwb
 from neuroconv.basedatainterface import BaseDataInterface
 from neuroconv.tools.hdmf import SliceableDataChunkIterator
+from neuroconv.tools.nwb_helpers import get_module
+from pynwb.base import Images
+from pynwb.image import Image, ImageSeries
 from pynwb.ophys import TwoPhotonSeries
 
-from .shared_methods import add_imaging_device, add_imaging_plane
+from .shared_methods import (
+    add_imaging_device,
+    add_imaging_plane,
+    get_linked_timing_kwargs,
+    get_timing_kwargs,
+)
+from ..tools import (
+    SUMMARY_IMAGES,
+    HashingDataChunkIterator,
+    MoviePreviewDataChunkIterator,
+    RemoteHDF5File,
+    SharedMovieBuffers,
+    StreamingSummaryImages,
+    SummaryImageDataChunkIterator,
+    open_source_dataset,
+    open_source_file,
+    read_source_dataset,
+)
 
 
 class VisualCodingTwoPhotonSeriesInterface(BaseDataInterface):
     """Two photon calcium imaging interface for visual coding ophys conversion."""
 
+    # The datasets of the v1 NWB file read in full by `add_to_nwbfile`, if present, so that they can be prefetched
+    source_dataset_paths = (
+        "acquisition/timeseries/2p_image_series/timestamps",
+        "processing/brain_observatory_pipeline/MotionCorrection/2p_image_series/xy_translation/data",
+    )
+
     def __init__(self, v1_nwbfile_path: str, ophys_movie_file_path: str):
-        self.v1_nwbfile = h5py.File(name=v1_nwbfile_path, mode="r")
-        self.ophys_movie = h5py.File(name=ophys_movie_file_path, mode="r")
+        self.v1_nwbfile = open_source_file(file_path=v1_nwbfile_path)
+        self.ophys_movie = open_source_file(file_path=ophys_movie_file_path)
+        if isinstance(self.ophys_movie, RemoteHDF5File):  # The movie is streamed in order, so read ahead whole chunks
+            self.ophys_movie.remote_file.tune_to_dataset(dataset=self.ophys_movie["data"])
         super().__init__(v1_nwbfile_path=v1_nwbfile_path, ophys_movie_file_path=ophys_movie_file_path)
 
     def __del__(self):
@@ -29,9 +59,35 @@ class VisualCodingTwoPhotonSeriesInterface(BaseDataInterface):
         if hasattr(self, "ophys_movie"):
             self.ophys_movie.close()
 
-    def add_to_nwbfile(self, nwbfile: pynwb.NWBFile, metadata: dict, stub_test: bool = False):
-        ophys_data = self.ophys_movie["data"]
-        timestamps = self.v1_nwbfile["acquisition"]["timeseries"]["2p_image_series"]["timestamps"]
+    def add_to_nwbfile(
+        self,
+        nwbfile: pynwb.NWBFile,
+        metadata: dict,
+        stub_test: bool = False,
+        jitter_tolerance: Optional[float] = None,
+        record_chunk_hashes: bool = False,
+        preview_factors: Optional[List[Tuple[int, int]]] = None,
+        add_summary_images: bool = False,
+        read_profile: Optional[dict] = None,
+    ):
+        """
+        If `record_chunk_hashes` is True, each buffer of the movie is hashed as it is written, and the hashes are kept
+        in `chunk_hashes` by the path of the written dataset, for verification without reading the movie again.
+
+        Each (temporal, spatial) factor of the `preview_factors`, such as (10, 2) or (10, 4), adds a preview of the
+        movie to the 'ophys' processing module, binned by averaging that many frames and that many pixels along each
+        side. The previews are binned from the same buffers of the movie as it is written, without reading it again.
+
+        If `add_summary_images` is True, the mean, maximum, standard deviation, and local correlation images of the
+        movie are likewise accumulated over the buffers as it is written, and added to the 'SummaryImages' of the
+        'ophys' processing module.
+
+        The chunk cache of the source movie is sized by the `read_profile` (see `DEFAULT_READ_PROFILE`) to the chunks
+        that its consecutive buffers share, so that no chunk is decompressed more than once.
+        """
+        timestamps = read_source_dataset(
+            dataset=self.v1_nwbfile["acquisition"]["timeseries"]["2p_image_series"]["timestamps"]
+        )
 
         add_imaging_device(nwbfile=nwbfile)
 
@@ -44,12 +100,12 @@ class VisualCodingTwoPhotonSeriesInterface(BaseDataInterface):
         imaging_plane = nwbfile.imaging_planes["ImagingPlane"]
 
         chunk_mb = 10.0
-        maxshape = ophys_data.shape
+        maxshape = self.ophys_movie["data"].shape
         num_frames = maxshape[0]
         width = maxshape[1]
         height = maxshape[2]
 
-        dtype = ophys_data.dtype
+        dtype = self.ophys_movie["data"].dtype
         frame_size_bytes = width * height * dtype.itemsize
         chunk_size_bytes = chunk_mb * 1e6
         num_frames_per_chunk = int(chunk_size_bytes / frame_size_bytes)
@@ -57,14 +113,39 @@ class VisualCodingTwoPhotonSeriesInterface(BaseDataInterface):
         chunk_shape = (max(min(num_frames_per_chunk, num_frames), 1), width, height)
         buffer_shape = (max(min(num_frames_per_chunk * 50, num_frames), 1), width, height)
 
-        data_iterator = SliceableDataChunkIterator(
-            data=ophys_data[:10, ...] if stub_test else ophys_data,
+        # Opened only once the buffers are known, since the first open handle of a dataset sets its chunk cache
+        ophys_data = open_source_dataset(
+            file=self.ophys_movie, name="data", buffer_shape=buffer_shape, read_profile=read_profile
+        )
+        movie_data = ophys_data[:10, ...] if stub_test else ophys_data
+        preview_factors = preview_factors or list()
+        if preview_factors or add_summary_images:
+            # Every bin of every preview must lie within a single buffer of the movie
+            buffer_multiple = int(
+                numpy.lcm.reduce([chunk_shape[0]] + [temporal_factor for temporal_factor, _ in preview_factors])
+            )
+            buffer_length = buffer_multiple * math.ceil(num_frames_per_chunk * 50 / buffer_multiple)
+            buffer_shape = (max(min(buffer_length, movie_data.shape[0]), 1), width, height)
+            movie_data = SharedMovieBuffers(data=movie_data, buffer_length=buffer_length)
+
+        data_iterator_class = HashingDataChunkIterator if record_chunk_hashes else SliceableDataChunkIterator
+        data_iterator = data_iterator_class(
+            data=movie_data,
             display_progress=True,
             progress_bar_options=dict(position=1),
             chunk_shape=chunk_shape,
             buffer_shape=buffer_shape,
         )
 
+        timing_kwargs = get_timing_kwargs(
+            nwbfile=nwbfile,
+            series_name="MotionCorrectedTwoPhotonSeries",
+            timestamps=timestamps[:10] if stub_test else timestamps,
+            jitter_tolerance=jitter_tolerance,
+        )
+        if "timestamps" in timing_kwargs:
+            timing_kwargs.update(timestamps=SliceableDataChunkIterator(timing_kwargs["timestamps"]))
+
         two_photon_series = TwoPhotonSeries(
             name="MotionCorrectedTwoPhotonSeries",
             description=(
@@ -74,16 +155,32 @@ class VisualCodingTwoPhotonSeriesInterface(BaseDataInterface):
             data=data_iterator,
             imaging_plane=imaging_plane,
             unit="n.a.",
-            timestamps=SliceableDataChunkIterator(
-                numpy.array(timestamps)[:10] if stub_test else numpy.array(timestamps),
-            ),
+            **timing_kwargs,
         )
         nwbfile.add_acquisition(two_photon_series)
 
+        for temporal_factor, spatial_factor in preview_factors:
+            self._add_preview_to_nwbfile(
+                nwbfile=nwbfile,
+                movie_buffers=movie_data,
+                timestamps=timestamps[:10] if stub_test else timestamps,
+                temporal_factor=temporal_factor,
+                spatial_factor=spatial_factor,
+                jitter_tolerance=jitter_tolerance,
+            )
+
+        if add_summary_images:
+            self._add_summary_images_to_nwbfile(nwbfile=nwbfile, movie_buffers=movie_data)
+
+        if record_chunk_hashes:
+            self.chunk_hashes = {"acquisition/MotionCorrectedTwoPhotonSeries/data": data_iterator.block_hashes}
+
         motion_correction = self.v1_nwbfile["processing"]["brain_observatory_pipeline"]["MotionCorrection"]
         # Either 'x' is 'height' and 'y' is 'width', or the imaging data is saved as height x width (hard to tell)
         # Either way, flipping this here so it makes more sense one-to-one with axis indices
-        xy_translation_data = numpy.flip(motion_correction["2p_image_series"]["xy_translation"]["data"][:, :], axis=1)
+        xy_translation_data = numpy.flip(
+            read_source_dataset(dataset=motion_correction["2p_image_series"]["xy_translation"]["data"]), axis=1
+        )
         xy_translation = pynwb.TimeSeries(
             name="MotionCorrectionShiftsPerFrame",
             description=(
@@ -92,6 +189,64 @@ class VisualCodingTwoPhotonSeriesInterface(BaseDataInterface):
             ),
             data=xy_translation_data[:10, ...] if stub_test else xy_translation_data,
             unit="n.a.",
-            timestamps=two_photon_series,
+            **get_linked_timing_kwargs(time_series=two_photon_series),
         )
         nwbfile.add_acquisition(xy_translation)
+
+    def _add_preview_to_nwbfile(
+        self,
+        nwbfile: pynwb.NWBFile,
+        movie_buffers: SharedMovieBuffers,
+        timestamps: numpy.ndarray,
+        temporal_factor: int,
+        spatial_factor: int,
+        jitter_tolerance: Optional[float] = None,
+    ) -> None:
+        preview_name = f"MotionCorrectedTwoPhotonSeriesPreview{temporal_factor}xTime{spatial_factor}xSpace"
+        preview = ImageSeries(
+            name=preview_name,
+            description=(
+                "A preview of the 'MotionCorrectedTwoPhotonSeries' for browsing, where each frame is the mean of "
+                f"{temporal_factor} consecutive frames and each pixel the mean of {spatial_factor} x {spatial_factor} "
+                "pixels; the timestamp of each frame is that of the first frame it averages."
+            ),
+            data=MoviePreviewDataChunkIterator(
+                movie_buffers=movie_buffers, temporal_factor=temporal_factor, spatial_factor=spatial_factor
+            ),
+            unit="n.a.",
+            **get_timing_kwargs(
+                nwbfile=nwbfile,
+                series_name=preview_name,
+                timestamps=timestamps[::temporal_factor],
+                jitter_tolerance=jitter_tolerance,
+            ),
+        )
+        ophys_module = get_module(
+            nwbfile=nwbfile, name="ophys", description="Contains processed optical physiology data."
+        )
+        ophys_module.add(preview)
+
+    def _add_summary_images_to_nwbfile(self, nwbfile: pynwb.NWBFile, movie_buffers: SharedMovieBuffers) -> None:
+        summary_images = StreamingSummaryImages(frame_shape=movie_buffers.shape[1:], dtype=movie_buffers.dtype)
+        movie_buffers.add_buffer_consumer(consumer=lambda _, frames: summary_images.update(frames=frames))
+
+        images = [
+            Image(
+                name=image_name,
+                description=image_description,
+                data=SummaryImageDataChunkIterator(
+                    movie_buffers=movie_buffers, summary_images=summary_images, image_name=image_name
+                ),
+            )
+            for image_name, image_description in SUMMARY_IMAGES.items()
+        ]
+        ophys_module = get_module(
+            nwbfile=nwbfile, name="ophys", description="Contains processed optical physiology data."
+        )
+        ophys_module.add(
+            Images(
+                name="SummaryImages",
+                description="Summary images derived from the two-photon calcium imaging.",
+                images=images,
+            )
+        )
@@ -6,5 +6,20 @@ from ._shared_methods import (
     add_imaging_plane,
     add_stimulus_device,
 )
+from ._timestamps import (
+    analyze_timestamps,
+    get_linked_timing_kwargs,
+    get_timing_kwargs,
+    reconstruct_timestamps,
+)
 
-__all__ = ["add_imaging_device", "add_imaging_plane", "add_eye_tracking_device", "add_stimulus_device"]
+__all__ = [
+    "add_imaging_device",
+    "add_imaging_plane",
+    "add_eye_tracking_device",
+    "add_stimulus_device",
+    "analyze_timestamps",
+    "get_timing_kwargs",
+    "get_linked_timing_kwargs",
+    "reconstruct_timestamps",
+]
@@ -0,0 +1,153 @@
+"""Common functions for replacing nearly regular timestamps with a starting time and rate."""
+
+from typing import Optional
+
+import numpy
+from neuroconv.tools.nwb_helpers import get_module
+from pynwb import NWBFile, TimeSeries
+
+_RESIDUAL_DTYPES = ("int8", "int16", "int32")
+
+
+def reconstruct_timestamps(
+    starting_time: float,
+    rate: float,
+    number_of_samples: int,
+    residuals: Optional[numpy.ndarray] = None,
+    residual_conversion: float = 1.0,
+) -> numpy.ndarray:
+    """Rebuild explicit timestamps from a starting time, a rate, and optionally the quantized residuals."""
+    timestamps = starting_time + numpy.arange(number_of_samples, dtype="float64") / rate
+    if residuals is not None:
+        timestamps += numpy.asarray(residuals, dtype="float64") * residual_conversion
+    return timestamps
+
+
+def analyze_timestamps(timestamps: numpy.ndarray, jitter_tolerance: float) -> dict:
+    """
+    Test if the timestamps are regular up to a jitter tolerance (in seconds).
+
+    A line is fit through the timestamps against their index. If every residual is within the tolerance, the
+    timestamps are fully described by a starting time and a rate. Otherwise, as long as the residuals stay below half
+    of a sampling period (that is, no frames were dropped or repeated), they are quantized in steps of the tolerance
+    and kept in the smallest integer type that fits them.
+
+    Every candidate is reconstructed and compared against the original timestamps before being accepted, so the
+    returned 'max_timing_error' is measured rather than assumed, and never exceeds the tolerance.
+    """
+    assert jitter_tolerance > 0, "The 'jitter_tolerance' must be a positive number of seconds."
+
+    timestamps = numpy.asarray(timestamps, dtype="float64")
+    irregular = dict(is_regular=False, timestamps=timestamps)
+
+    number_of_samples = timestamps.shape[0]
+    if timestamps.ndim != 1 or number_of_samples < 2 or not numpy.all(numpy.isfinite(timestamps)):
+        return irregular
+
+    indices = numpy.arange(number_of_samples, dtype="float64")
+    centered_indices = indices - indices.mean()
+    period = numpy.dot(centered_indices, timestamps - timestamps.mean()) / numpy.dot(centered_indices, centered_indices)
+    if period <= 0:
+        return irregular
+    rate = float(1.0 / period)
+
+    # Center the residuals around zero to minimize the largest absolute deviation instead of the squared error
+    starting_time = float(timestamps.mean() - period * indices.mean())
+    residuals = timestamps - reconstruct_timestamps(
+        starting_time=starting_time, rate=rate, number_of_samples=number_of_samples
+    )
+    starting_time += float(residuals.max() + residuals.min()) / 2
+    regular_timestamps = reconstruct_timestamps(
+        starting_time=starting_time, rate=rate, number_of_samples=number_of_samples
+    )
+    residuals = timestamps - regular_timestamps
+
+    max_residual = float(numpy.abs(residuals).max())
+    if max_residual <= jitter_tolerance:
+        return dict(
+            is_regular=True,
+            starting_time=starting_time,
+            rate=rate,
+            residuals=None,
+            residual_conversion=None,
+            max_timing_error=max_residual,
+        )
+
+    if max_residual >= period / 2:
+        return irregular
+
+    quantized_residuals = numpy.round(residuals / jitter_tolerance)
+    max_quantized_residual = numpy.abs(quantized_residuals).max()
+    residual_dtype = next(
+        (dtype for dtype in _RESIDUAL_DTYPES if max_quantized_residual <= numpy.iinfo(dtype).max), None
+    )
+    if residual_dtype is None:
+        return irregular
+    quantized_residuals = quantized_residuals.astype(residual_dtype)
+
+    reconstructed_timestamps = reconstruct_timestamps(
+        starting_time=starting_time,
+        rate=rate,
+        number_of_samples=number_of_samples,
+        residuals=quantized_residuals,
+        residual_conversion=jitter_tolerance,
+    )
+    max_timing_error = float(numpy.abs(timestamps - reconstructed_timestamps).max())
+    if max_timing_error > jitter_tolerance:
+        return irregular
+
+    return dict(
+        is_regular=True,
+        starting_time=starting_time,
+        rate=rate,
+        residuals=quantized_residuals,
+        residual_conversion=jitter_tolerance,
+        max_timing_error=max_timing_error,
+    )
+
+
+def get_timing_kwargs(
+    nwbfile: NWBFile, series_name: str, timestamps: numpy.ndarray, jitter_tolerance: Optional[float] = None
+) -> dict:
+    """
+    Decide how the timing of a series is stored; the result is meant to be unpacked into the TimeSeries constructor.
+
+    If the 'jitter_tolerance' is not specified, or the timestamps are not regular, they are stored explicitly.
+    When residuals are required to stay within the tolerance, they are added to the 'timing' processing module.
+    """
+    if jitter_tolerance is None:
+        return dict(timestamps=timestamps)
+
+    timing = analyze_timestamps(timestamps=timestamps, jitter_tolerance=jitter_tolerance)
+    if not timing["is_regular"]:
+        return dict(timestamps=timestamps)
+
+    if timing["residuals"] is not None:
+        timing_module = get_module(
+            nwbfile=nwbfile,
+            name="timing",
+            description="Deviations of the original timestamps from the regular timing of series with the same name.",
+        )
+        residual_series = TimeSeries(
+            name=f"{series_name}_timestamp_residuals",
+            description=(
+                f"The original timestamps of '{series_name}' are recovered by adding these residuals to its "
+                "'starting_time' plus the sample index divided by its 'rate'. "
+                f"The maximum error after reconstruction is {timing['max_timing_error']} seconds."
+            ),
+            data=timing["residuals"],
+            unit="seconds",
+            conversion=timing["residual_conversion"],
+            starting_time=timing["starting_time"],
+            rate=timing["rate"],
+        )
+        timing_module.add(residual_series)
+
+    return dict(starting_time=timing["starting_time"], rate=timing["rate"])
+
+
+def get_linked_timing_kwargs(time_series: TimeSeries) -> dict:
+    """Share the timing of another series, linking its timestamps when they are stored explicitly."""
+    if time_series.timestamps is not None:
+        return dict(timestamps=time_series)
+    return dict(starting_time=time_series.starting_time, rate=time_series.rate)
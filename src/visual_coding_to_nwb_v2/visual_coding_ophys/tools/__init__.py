@@ -0,0 +1,292 @@
+"""
+Exposed imports for visual_coding_ophys.tools submodule.
+
+Each tool is only imported from its private module upon first access, so that lightweight tools do not pay for the
+dependencies of the others.
+"""
+
+import importlib
+from typing import TYPE_CHECKING
+
+_LAZY_IMPORTS = dict(
+    DEFAULT_COMPRESSION_POLICY="._compression_policy",
+    apply_compression_policy="._compression_policy",
+    classify_dataset="._compression_policy",
+    load_compression_policy="._compression_policy",
+    save_compression_policy="._compression_policy",
+    assert_no_open_hdf5_files="._worker_pool",
+    get_open_hdf5_file_names="._worker_pool",
+    run_worker_pool="._worker_pool",
+    SessionLeaseQueue="._session_leases",
+    run_leased_sessions="._session_leases",
+    DEFAULT_RUNTIME_CONTROL="._runtime_control",
+    RuntimeControl="._runtime_control",
+    update_runtime_control="._runtime_control",
+    BandwidthLimiter="._bandwidth",
+    ThrottledBytes="._bandwidth",
+    measure_transfer="._bandwidth",
+    throttle_dandi_uploads="._bandwidth",
+    download_object="._ranged_download",
+    get_unsigned_s3_client="._ranged_download",
+    verify_etag="._ranged_download",
+    SourceCache="._source_cache",
+    get_memory_map="._memory_mapped_reads",
+    read_source_dataset="._memory_mapped_reads",
+    prefetch_source_datasets="._source_prefetch",
+    SUMMARY_IMAGES="._summary_images",
+    StreamingSummaryImages="._summary_images",
+    SummaryImageDataChunkIterator="._summary_images",
+    compute_summary_images="._summary_images",
+    MoviePreviewDataChunkIterator="._movie_previews",
+    SharedMovieBuffers="._movie_previews",
+    bin_movie="._movie_previews",
+    create_presentation_run_table="._presentation_runs",
+    encode_presentation_runs="._presentation_runs",
+    expand_natural_movie_presentation="._presentation_runs",
+    expand_presentation_runs="._presentation_runs",
+    extract_response_tensor="._response_tensors",
+    extract_stimulus_responses="._response_tensors",
+    get_frame_windows="._response_tensors",
+    get_presentation_times="._response_tensors",
+    get_series_timestamps="._response_tensors",
+    RemoteFile="._remote_file",
+    RemoteHDF5File="._remote_file",
+    is_remote_path="._remote_file",
+    open_source_file="._remote_file",
+    DEFAULT_READ_PROFILE="._read_profile",
+    get_chunk_cache_settings="._read_profile",
+    get_file_access_kwargs="._read_profile",
+    open_source_dataset="._read_profile",
+    HashingDataChunkIterator="._chunk_verification",
+    compute_condition_responses="._condition_responses",
+    create_condition_response_table="._condition_responses",
+    GLOBAL_ROI_INDEX_DTYPE="._global_roi_index",
+    GlobalRoiIndex="._global_roi_index",
+    build_global_roi_index="._global_roi_index",
+    read_roi_records="._global_roi_index",
+    ROI_SPATIAL_INDEX_COLUMNS="._roi_spatial_index",
+    compute_roi_spatial_index="._roi_spatial_index",
+    find_rois="._roi_spatial_index",
+    densify_df_over_f_events="._sparse_events",
+    densify_events="._sparse_events",
+    sparsify_events="._sparse_events",
+    get_artifact_fingerprint="._dependency_manifest",
+    get_container_storage="._dependency_manifest",
+    get_stale_containers="._dependency_manifest",
+    load_dependency_manifest="._dependency_manifest",
+    record_container_storage="._dependency_manifest",
+    record_containers="._dependency_manifest",
+    save_dependency_manifest="._dependency_manifest",
+    hash_block="._chunk_verification",
+    verify_nwbfile="._chunk_verification",
+    DEFAULT_RETRY_POLICY="._retry_policy",
+    PermanentStageError="._retry_policy",
+    classify_exception="._retry_policy",
+    get_retry_delay="._retry_policy",
+    is_quarantined="._retry_policy",
+    quarantine_session="._retry_policy",
+    run_stage="._retry_policy",
+)
+
+if TYPE_CHECKING:
+    from ._bandwidth import (
+        BandwidthLimiter,
+        ThrottledBytes,
+        measure_transfer,
+        throttle_dandi_uploads,
+    )
+    from ._chunk_verification import (
+        HashingDataChunkIterator,
+        hash_block,
+        verify_nwbfile,
+    )
+    from ._compression_policy import (
+        DEFAULT_COMPRESSION_POLICY,
+        apply_compression_policy,
+        classify_dataset,
+        load_compression_policy,
+        save_compression_policy,
+    )
+    from ._condition_responses import (
+        compute_condition_responses,
+        create_condition_response_table,
+    )
+    from ._dependency_manifest import (
+        get_artifact_fingerprint,
+        get_container_storage,
+        get_stale_containers,
+        load_dependency_manifest,
+        record_container_storage,
+        record_containers,
+        save_dependency_manifest,
+    )
+    from ._global_roi_index import (
+        GLOBAL_ROI_INDEX_DTYPE,
+        GlobalRoiIndex,
+        build_global_roi_index,
+        read_roi_records,
+    )
+    from ._memory_mapped_reads import get_memory_map, read_source_dataset
+    from ._movie_previews import (
+        MoviePreviewDataChunkIterator,
+        SharedMovieBuffers,
+        bin_movie,
+    )
+    from ._presentation_runs import (
+        create_presentation_run_table,
+        encode_presentation_runs,
+        expand_natural_movie_presentation,
+        expand_presentation_runs,
+    )
+    from ._ranged_download import download_object, get_unsigned_s3_client, verify_etag
+    from ._read_profile import (
+        DEFAULT_READ_PROFILE,
+        get_chunk_cache_settings,
+        get_file_access_kwargs,
+        open_source_dataset,
+    )
+    from ._remote_file import (
+        RemoteFile,
+        RemoteHDF5File,
+        is_remote_path,
+        open_source_file,
+    )
+    from ._response_tensors import (
+        extract_response_tensor,
+        extract_stimulus_responses,
+        get_frame_windows,
+        get_presentation_times,
+        get_series_timestamps,
+    )
+    from ._retry_policy import (
+        DEFAULT_RETRY_POLICY,
+        PermanentStageError,
+        classify_exception,
+        get_retry_delay,
+        is_quarantined,
+        quarantine_session,
+        run_stage,
+    )
+    from ._roi_spatial_index import (
+        ROI_SPATIAL_INDEX_COLUMNS,
+        compute_roi_spatial_index,
+        find_rois,
+    )
+    from ._runtime_control import (
+        DEFAULT_RUNTIME_CONTROL,
+        RuntimeControl,
+        update_runtime_control,
+    )
+    from ._session_leases import SessionLeaseQueue, run_leased_sessions
+    from ._source_cache import SourceCache
+    from ._source_prefetch import prefetch_source_datasets
+    from ._sparse_events import (
+        densify_df_over_f_events,
+        densify_events,
+        sparsify_events,
+    )
+    from ._summary_images import (
+        SUMMARY_IMAGES,
+        StreamingSummaryImages,
+        SummaryImageDataChunkIterator,
+        compute_summary_images,
+    )
+    from ._worker_pool import (
+        assert_no_open_hdf5_files,
+        get_open_hdf5_file_names,
+        run_worker_pool,
+    )
+
+
+def __getattr__(name: str):
+    if name not in _LAZY_IMPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+    value = getattr(importlib.import_module(name=_LAZY_IMPORTS[name], package=__name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
+
+
+__all__ = [
+    "DEFAULT_COMPRESSION_POLICY",
+    "apply_compression_policy",
+    "classify_dataset",
+    "load_compression_policy",
+    "save_compression_policy",
+    "assert_no_open_hdf5_files",
+    "get_open_hdf5_file_names",
+    "run_worker_pool",
+    "SessionLeaseQueue",
+    "run_leased_sessions",
+    "DEFAULT_RUNTIME_CONTROL",
+    "RuntimeControl",
+    "update_runtime_control",
+    "BandwidthLimiter",
+    "ThrottledBytes",
+    "measure_transfer",
+    "throttle_dandi_uploads",
+    "download_object",
+    "get_unsigned_s3_client",
+    "verify_etag",
+    "SourceCache",
+    "get_memory_map",
+    "read_source_dataset",
+    "prefetch_source_datasets",
+    "SUMMARY_IMAGES",
+    "StreamingSummaryImages",
+    "SummaryImageDataChunkIterator",
+    "compute_summary_images",
+    "MoviePreviewDataChunkIterator",
+    "SharedMovieBuffers",
+    "bin_movie",
+    "create_presentation_run_table",
+    "encode_presentation_runs",
+    "expand_natural_movie_presentation",
+    "expand_presentation_runs",
+    "extract_response_tensor",
+    "extract_stimulus_responses",
+    "get_frame_windows",
+    "get_presentation_times",
+    "get_series_timestamps",
+    "RemoteFile",
+    "RemoteHDF5File",
+    "is_remote_path",
+    "open_source_file",
+    "DEFAULT_READ_PROFILE",
+    "get_chunk_cache_settings",
+    "get_file_access_kwargs",
+    "open_source_dataset",
+    "HashingDataChunkIterator",
+    "compute_condition_responses",
+    "create_condition_response_table",
+    "GLOBAL_ROI_INDEX_DTYPE",
+    "GlobalRoiIndex",
+    "build_global_roi_index",
+    "read_roi_records",
+    "ROI_SPATIAL_INDEX_COLUMNS",
+    "compute_roi_spatial_index",
+    "find_rois",
+    "densify_df_over_f_events",
+    "densify_events",
+    "sparsify_events",
+    "get_artifact_fingerprint",
+    "get_container_storage",
+    "get_stale_containers",
+    "load_dependency_manifest",
+    "record_container_storage",
+    "record_containers",
+    "save_dependency_manifest",
+    "hash_block",
+    "verify_nwbfile",
+    "DEFAULT_RETRY_POLICY",
+    "PermanentStageError",
+    "classify_exception",
+    "get_retry_delay",
+    "is_quarantined",
+    "quarantine_session",
+    "run_stage",
+]
@@ -0,0 +1,151 @@
+"""Share a bandwidth budget for downloads and uploads across every worker process on a host."""
+
+import json
+import os
+import pathlib
+import struct
+import time
+from contextlib import contextmanager
+from typing import Iterator, Literal, Union
+
+from ._file_locks import exclusive_file_lock
+from ._runtime_control import RuntimeControl
+
+_STATE_FORMAT = "<dd"  # Number of tokens available, and the time at which they were last refilled
+_THROTTLED_BLOCK_SIZE = 64 * 1024
+
+
+class BandwidthLimiter:
+    """
+    A token bucket shared by every process that uses the same state file.
+
+    Each transfer consumes one token per byte, and tokens refill at the given rate (in bytes per second) up to a burst
+    of `burst_duration` seconds worth of transfer. A transfer that overdraws the bucket sleeps until the debt would be
+    repaid, so the combined rate of all processes converges to the limit no matter how the bytes are split between them.
+
+    If a `runtime_control` is specified, the '{direction}_bandwidth' setting in its control file takes precedence over
+    the `rate`, so the limit can be changed while transfers are running.
+    """
+
+    def __init__(
+        self,
+        state_file_path: Union[str, pathlib.Path],
+        direction: Literal["download", "upload"],
+        rate: Union[float, None] = None,
+        runtime_control: Union[RuntimeControl, None] = None,
+        burst_duration: float = 1.0,
+    ):
+        self.state_file_path = pathlib.Path(state_file_path)
+        self.direction = direction
+        self.rate = rate
+        self.runtime_control = runtime_control
+        self.burst_duration = burst_duration
+
+    def get_rate(self) -> Union[float, None]:
+        if self.runtime_control is not None:
+            rate = self.runtime_control.read()[f"{self.direction}_bandwidth"]
+            if rate is not None:
+                return float(rate)
+        return self.rate
+
+    def consume(self, number_of_bytes: int) -> None:
+        """Take tokens for the bytes about to be (or just) transferred, waiting if the budget is exhausted."""
+        rate = self.get_rate()
+        if rate is None or number_of_bytes <= 0:
+            return
+
+        capacity = rate * self.burst_duration
+        with exclusive_file_lock(file_path=self.state_file_path) as file_descriptor:
+            os.lseek(file_descriptor, 0, os.SEEK_SET)
+            state = os.read(file_descriptor, struct.calcsize(_STATE_FORMAT))
+            current_time = time.time()
+            if len(state) == struct.calcsize(_STATE_FORMAT):
+                tokens, last_refill_time = struct.unpack(_STATE_FORMAT, state)
+                tokens = min(capacity, tokens + (current_time - last_refill_time) * rate)
+            else:
+                tokens = capacity
+            tokens -= number_of_bytes
+
+            os.lseek(file_descriptor, 0, os.SEEK_SET)
+            os.write(file_descriptor, struct.pack(_STATE_FORMAT, tokens, current_time))
+
+        if tokens < 0:
+            time.sleep(-tokens / rate)
+
+    def __call__(self, number_of_bytes: int) -> None:
+        """Allows the limiter to be passed directly as the progress `Callback` of boto3 transfers."""
+        self.consume(number_of_bytes=number_of_bytes)
+
+
+class ThrottledBytes:
+    """
+    Request body that releases the bytes in small blocks as the limiter allows.
+
+    The length is known ahead of time, so the request keeps its Content-Length, and iteration starts over from the
+    beginning for every attempt, so retries resend the whole body.
+    """
+
+    def __init__(self, data: bytes, bandwidth_limiter: BandwidthLimiter):
+        self.data = data
+        self.bandwidth_limiter = bandwidth_limiter
+
+    def __len__(self) -> int:
+        return len(self.data)
+
+    def __iter__(self) -> Iterator[bytes]:
+        data_view = memoryview(self.data)
+        for start in range(0, len(self.data), _THROTTLED_BLOCK_SIZE):
+            block = data_view[start : start + _THROTTLED_BLOCK_SIZE]
+            self.bandwidth_limiter.consume(number_of_bytes=len(block))
+            yield bytes(block)
+
+
+@contextmanager
+def throttle_dandi_uploads(bandwidth_limiter: Union[BandwidthLimiter, None]) -> Iterator[None]:
+    """
+    Limit the bandwidth of the DANDI upload for the duration of the context.
+
+    The DANDI client offers no hook for this, so its request method is wrapped to send every part as `ThrottledBytes`.
+    """
+    if bandwidth_limiter is None:
+        yield
+        return
+
+    from dandi.dandiapi import RESTFullAPIClient
+
+    original_request = RESTFullAPIClient.request
+
+    def throttled_request(self, method, path, *args, data=None, **kwargs):
+        if isinstance(data, (bytes, bytearray)):
+            data = ThrottledBytes(data=data, bandwidth_limiter=bandwidth_limiter)
+        return original_request(self, method, path, *args, data=data, **kwargs)
+
+    RESTFullAPIClient.request = throttled_request
+    try:
+        yield
+    finally:
+        RESTFullAPIClient.request = original_request
+
+
+@contextmanager
+def measure_transfer(
+    name: str, direction: Literal["download", "upload"], log_file_path: Union[str, pathlib.Path, None] = None
+) -> Iterator[dict]:
+    """
+    Measure the achieved throughput of a transfer.
+
+    Set the 'number_of_bytes' of the yielded record before leaving the context; the duration and throughput are then
+    filled in, and the record is appended as a line of JSON to the log file, if one is specified.
+    """
+    transfer_record = dict(name=name, direction=direction, number_of_bytes=0, process_id=os.getpid())
+    start_time = time.perf_counter()
+    yield transfer_record
+
+    duration = time.perf_counter() - start_time
+    transfer_record.update(
+        duration_in_seconds=duration,
+        megabytes_per_second=transfer_record["number_of_bytes"] / 1e6 / duration if duration > 0 else None,
+    )
+    if log_file_path is not None:
+        with open(file=log_file_path, mode="a") as io:
+            io.write(json.dumps(transfer_record) + "\n")
@@ -0,0 +1,275 @@
+"""Verify that the datasets of a v2 file round-tripped from the v1 sources, by comparing hashes of blocks of chunks."""
+
+import hashlib
+import math
+import pathlib
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Dict, List, Tuple, Union
+
+import h5py
+import numpy
+from neuroconv.tools.hdmf import SliceableDataChunkIterator
+
+from ._remote_file import open_source_file
+
+Block = Tuple[Tuple[int, int], ...]  # The (start, stop) of the selection along every axis
+
+# Each v2 dataset, the source file and dataset it was copied from, and whether the source is stored transposed
+SOURCE_DATASETS = [
+    dict(
+        v2_path="acquisition/MotionCorrectedTwoPhotonSeries/data",
+        source="ophys_movie",
+        source_path="data",
+        transpose=False,
+    ),
+    dict(
+        v2_path="acquisition/MotionCorrectedTwoPhotonSeries/timestamps",
+        source="v1_nwbfile",
+        source_path="acquisition/timeseries/2p_image_series/timestamps",
+        transpose=False,
+    ),
+    dict(
+        v2_path="processing/ophys/Fluorescence/Corrected/data",
+        source="v1_nwbfile",
+        source_path="processing/brain_observatory_pipeline/Fluorescence/imaging_plane_1/data",
+        transpose=True,
+    ),
+    dict(
+        v2_path="processing/ophys/Fluorescence/Corrected/timestamps",
+        source="v1_nwbfile",
+        source_path="processing/brain_observatory_pipeline/Fluorescence/imaging_plane_1/timestamps",
+        transpose=False,
+    ),
+    dict(
+        v2_path="processing/ophys/Fluorescence/Neuropil/data",
+        source="v1_nwbfile",
+        source_path="processing/brain_observatory_pipeline/Fluorescence/imaging_plane_1_neuropil_response/data",
+        transpose=True,
+    ),
+    dict(
+        v2_path="processing/ophys/Fluorescence/Demixed/data",
+        source="v1_nwbfile",
+        source_path="processing/brain_observatory_pipeline/Fluorescence/imaging_plane_1_demixed_signal/data",
+        transpose=True,
+    ),
+    dict(
+        v2_path="processing/ophys/DfOverF/DfOverF/data",
+        source="v1_nwbfile",
+        source_path="processing/brain_observatory_pipeline/DfOverF/imaging_plane_1/data",
+        transpose=True,
+    ),
+] + [
+    dataset_pair
+    for movie_name in ("one", "two", "three")
+    for dataset_pair in (
+        dict(
+            v2_path=f"stimulus/templates/natural_movie_{movie_name}/data",
+            source="v1_nwbfile",
+            source_path=f"stimulus/templates/natural_movie_{movie_name}_image_stack/data",
+            transpose=False,
+        ),
+        dict(
+            v2_path=f"stimulus/presentation/natural_movie_{movie_name}_stimulus/timestamps",
+            source="v1_nwbfile",
+            source_path=f"stimulus/presentation/natural_movie_{movie_name}_stimulus/timestamps",
+            transpose=False,
+        ),
+    )
+]
+
+
+def hash_block(data: numpy.ndarray) -> str:
+    """Hash the values of an array along with its shape and type, independently of its memory layout."""
+    data = numpy.ascontiguousarray(data)
+    block_hash = hashlib.blake2b(digest_size=16)
+    block_hash.update(f"{data.dtype.str}{data.shape}".encode("utf-8"))
+    block_hash.update(data.data if data.size > 0 else b"")
+    return block_hash.hexdigest()
+
+
+def get_blocks(
+    shape: Tuple[int, ...], chunks: Union[Tuple[int, ...], None], itemsize: int, block_size: int
+) -> List[Block]:
+    """Split a dataset along its first axis into blocks of about `block_size` bytes made of whole chunks."""
+    if len(shape) == 0:
+        return [tuple()]
+
+    frame_size = math.prod(shape[1:]) * itemsize
+    frames_per_chunk = chunks[0] if chunks is not None else 1
+    chunks_per_block = max(block_size // max(frame_size * frames_per_chunk, 1), 1)
+    frames_per_block = frames_per_chunk * chunks_per_block
+    return [
+        ((start, min(start + frames_per_block, shape[0])), *((0, length) for length in shape[1:]))
+        for start in range(0, max(shape[0], 1), frames_per_block)
+    ]
+
+
+def _read_block(
+    dataset: h5py.Dataset, block: Block, transpose: bool = False, source_index: Union[int, None] = None
+) -> numpy.ndarray:
+    if source_index is not None:  # The block is within a single plane of a stack
+        dataset = dataset[source_index]
+    if len(block) == 0:
+        return dataset[()]
+
+    selection = tuple(slice(start, stop) for start, stop in block)
+    if transpose:  # The block is in the (time, roi) layout of the v2 dataset, while the source is (roi, time)
+        return dataset[selection[::-1]].T
+    return dataset[selection]
+
+
+def _hash_file_block(
+    file_path: str,
+    dataset_path: str,
+    block: Block,
+    transpose: bool = False,
+    source_index: Union[int, None] = None,
+    dtype: Union[str, None] = None,
+) -> str:
+    with open_source_file(file_path=file_path) as file:
+        data = _read_block(dataset=file[dataset_path], block=block, transpose=transpose, source_index=source_index)
+    return hash_block(data=data if dtype is None else numpy.asarray(data, dtype=dtype))
+
+
+class HashingDataChunkIterator(SliceableDataChunkIterator):
+    """
+    A `SliceableDataChunkIterator` that hashes each buffer as it is read from the source for writing.
+
+    The hashes are kept in `block_hashes` by the selection of each buffer, so that the written dataset can later be
+    verified by reading only the output, instead of reading the source a second time.
+    """
+
+    def __init__(self, *args, **kwargs):
+        self.block_hashes: Dict[Block, str] = dict()
+        super().__init__(*args, **kwargs)
+
+    def _get_data(self, selection: Tuple[slice]) -> numpy.ndarray:
+        data = super()._get_data(selection=selection)
+        block = tuple(
+            (axis_selection.start or 0, axis_selection.stop if axis_selection.stop is not None else length)
+            for axis_selection, length in zip(selection, self.maxshape)
+        )
+        self.block_hashes[block] = hash_block(data=data)
+        return data
+
+
+def _map(function: Callable[..., str], task_arguments: List[dict], number_of_jobs: int) -> List[str]:
+    if number_of_jobs == 1:
+        return [function(**arguments) for arguments in task_arguments]
+
+    with ProcessPoolExecutor(max_workers=number_of_jobs) as executor:
+        futures = [executor.submit(function, **arguments) for arguments in task_arguments]
+        return [future.result() for future in futures]
+
+
+def verify_nwbfile(
+    v2_nwbfile_path: Union[str, pathlib.Path],
+    v1_nwbfile_path: Union[str, pathlib.Path, None] = None,
+    ophys_movie_file_path: Union[str, pathlib.Path, None] = None,
+    recorded_hashes: Union[Dict[str, Dict[Block, str]], None] = None,
+    number_of_jobs: int = 4,
+    block_size: int = 64 * 1024 * 1024,
+) -> dict:
+    """
+    Compare every dataset of the v2 file copied from the v1 sources, block by block in parallel processes.
+
+    Each block is a run of whole chunks of the v2 dataset, so that each chunk is only read once. The values of the
+    sources are cast to the type of the v2 dataset before hashing, and the (roi, time) traces of the v1 file are
+    transposed to the (time, roi) layout of the v2 file.
+
+    The `recorded_hashes` are those of the blocks streamed from the sources during the write, by the v2 path of each
+    dataset, such as the `block_hashes` of a `HashingDataChunkIterator`; the sources of these datasets are not read
+    again. Datasets that are not present in both files, such as timestamps stored as a starting time and rate, are
+    reported as skipped.
+
+    Returns a report with 'is_verified', and for each dataset its 'status' ('verified', 'mismatched', or 'skipped')
+    along with the blocks whose hashes differ.
+    """
+    recorded_hashes = recorded_hashes or dict()
+    source_file_paths = dict(v1_nwbfile=v1_nwbfile_path, ophys_movie=ophys_movie_file_path)
+    source_files = {
+        source: open_source_file(file_path=str(file_path))
+        for source, file_path in source_file_paths.items()
+        if file_path is not None
+    }
+
+    dataset_reports = list()
+    task_arguments = list()
+    comparisons = list()  # The report, block, index of the v2 hash, and either the index of the source hash or a hash
+    try:
+        with h5py.File(name=v2_nwbfile_path, mode="r") as v2_nwbfile:
+            source_datasets = list(SOURCE_DATASETS)
+            if "stimulus/templates/natural_scenes_template" in v2_nwbfile:
+                # The scenes are stored as separate images, each a plane of the source stack
+                source_datasets.extend(
+                    dict(
+                        v2_path=f"stimulus/templates/natural_scenes_template/{image_name}",
+                        source="v1_nwbfile",
+                        source_path="stimulus/templates/natural_scenes_image_stack/data",
+                        transpose=False,
+                        source_index=int(image_name[len("NaturalScene") :]),
+                    )
+                    for image_name in v2_nwbfile["stimulus/templates/natural_scenes_template"]
+                )
+
+            for source_dataset in source_datasets:
+                v2_path = source_dataset["v2_path"]
+                source_path = source_dataset["source_path"]
+                dataset_report = dict(v2_path=v2_path, source_path=source_path, status="skipped")
+                dataset_reports.append(dataset_report)
+
+                is_recorded = v2_path in recorded_hashes
+                source_file = source_files.get(source_dataset["source"])
+                if v2_path not in v2_nwbfile:
+                    continue
+                if not is_recorded and (source_file is None or source_path not in source_file):
+                    continue
+
+                v2_dataset = v2_nwbfile[v2_path]
+                blocks = (
+                    list(recorded_hashes[v2_path])
+                    if is_recorded
+                    else get_blocks(
+                        shape=v2_dataset.shape,
+                        chunks=v2_dataset.chunks,
+                        itemsize=v2_dataset.dtype.itemsize,
+                        block_size=block_size,
+                    )
+                )
+                dataset_report.update(status="verified", number_of_blocks=len(blocks), mismatched_blocks=list())
+
+                for block in blocks:
+                    task_arguments.append(dict(file_path=str(v2_nwbfile_path), dataset_path=v2_path, block=block))
+                    v2_hash_index = len(task_arguments) - 1
+
+                    if is_recorded:
+                        comparisons.append((dataset_report, block, v2_hash_index, recorded_hashes[v2_path][block]))
+                        continue
+
+                    task_arguments.append(
+                        dict(
+                            file_path=str(source_file_paths[source_dataset["source"]]),
+                            dataset_path=source_path,
+                            block=block,
+                            transpose=source_dataset["transpose"],
+                            source_index=source_dataset.get("source_index"),
+                            dtype=v2_dataset.dtype.str,
+                        )
+                    )
+                    comparisons.append((dataset_report, block, v2_hash_index, len(task_arguments) - 1))
+    finally:
+        for source_file in source_files.values():
+            source_file.close()
+
+    hashes = _map(function=_hash_file_block, task_arguments=task_arguments, number_of_jobs=number_of_jobs)
+    for dataset_report, block, v2_hash_index, expected_hash in comparisons:
+        if isinstance(expected_hash, int):
+            expected_hash = hashes[expected_hash]
+        if hashes[v2_hash_index] != expected_hash:
+            dataset_report["status"] = "mismatched"
+            dataset_report["mismatched_blocks"].append([list(axis_range) for axis_range in block])
+
+    return dict(
+        is_verified=all(dataset_report["status"] != "mismatched" for dataset_report in dataset_reports),
+        datasets=dataset_reports,
+    )
@@ -0,0 +1,82 @@
+"""Assign compression codecs and levels per class of dataset instead of using a single codec for everything."""
+
+import copy
+import json
+import pathlib
+from typing import Literal, Union
+
+import numpy
+from neuroconv.tools.nwb_helpers import BackendConfiguration, DatasetIOConfiguration
+
+DatasetClass = Literal["movie", "traces", "events", "templates", "timestamps", "default"]
+
+# GZIP for every class, at level 4 for the bulk of the data and level 9 for the sparse and highly compressible events;
+# anything not otherwise classified is left at the h5py default level, as neuroconv does
+DEFAULT_COMPRESSION_POLICY = dict(
+    movie=dict(compression_method="gzip", compression_options=dict(level=4)),
+    traces=dict(compression_method="gzip", compression_options=dict(level=4)),
+    events=dict(compression_method="gzip", compression_options=dict(level=9)),
+    templates=dict(compression_method="gzip", compression_options=dict(level=4)),
+    timestamps=dict(compression_method="gzip", compression_options=dict(level=4)),
+    default=dict(compression_method="gzip", compression_options=None),
+)
+
+
+def load_compression_policy(file_path: Union[str, pathlib.Path, None] = None) -> dict:
+    """
+    Load a compression policy from a JSON file.
+
+    The file maps each dataset class to a 'compression_method' and optional 'compression_options'. Classes that are
+    not specified in the file fall back to the `DEFAULT_COMPRESSION_POLICY`.
+    """
+    compression_policy = copy.deepcopy(DEFAULT_COMPRESSION_POLICY)
+    if file_path is None:
+        return compression_policy
+
+    with open(file=file_path, mode="r") as io:
+        policy_from_file = json.load(fp=io)
+
+    unknown_dataset_classes = set(policy_from_file) - set(DEFAULT_COMPRESSION_POLICY)
+    assert not unknown_dataset_classes, (
+        f"Unknown dataset classes {sorted(unknown_dataset_classes)} in compression policy '{file_path}'! "
+        f"Choose from {list(DEFAULT_COMPRESSION_POLICY)}."
+    )
+    for dataset_class, codec in policy_from_file.items():
+        assert "compression_method" in codec, f"Dataset class '{dataset_class}' does not specify a compression_method!"
+        compression_policy[dataset_class] = dict(
+            compression_method=codec["compression_method"], compression_options=codec.get("compression_options")
+        )
+
+    return compression_policy
+
+
+def save_compression_policy(compression_policy: dict, file_path: Union[str, pathlib.Path]) -> None:
+    """Save a compression policy to a JSON file that can be passed back to `load_compression_policy`."""
+    with open(file=file_path, mode="w") as io:
+        json.dump(obj=compression_policy, fp=io, indent=4)
+
+
+def classify_dataset(dataset_configuration: DatasetIOConfiguration) -> DatasetClass:
+    """Classify a dataset of the in-memory NWB file by its name, location, and data type."""
+    dtype = numpy.dtype(dataset_configuration.dtype)
+    number_of_dimensions = len(dataset_configuration.full_shape)
+
+    if dataset_configuration.dataset_name == "timestamps":
+        return "timestamps"
+    if dataset_configuration.location_in_file.split("/")[-2:-1] == ["DfOverFEvents"]:  # Any dense or sparse layout
+        return "events"
+    if dtype == numpy.dtype("uint8") and number_of_dimensions == 3:
+        return "templates"
+    if numpy.issubdtype(dtype, numpy.integer) and number_of_dimensions == 3:
+        return "movie"
+    if numpy.issubdtype(dtype, numpy.floating):
+        return "traces"
+    return "default"
+
+
+def apply_compression_policy(backend_configuration: BackendConfiguration, compression_policy: dict) -> None:
+    """Set the compression method and options of every dataset in the backend configuration according to its class."""
+    for dataset_configuration in backend_configuration.dataset_configurations.values():
+        codec = compression_policy[classify_dataset(dataset_configuration=dataset_configuration)]
+        dataset_configuration.compression_method = codec["compression_method"]
+        dataset_configuration.compression_options = codec["compression_options"]
@@ -0,0 +1,98 @@
+"""Summarize the response of every ROI to each unique condition of a stimulus, by its mean and standard error."""
+
+from typing import Dict, Tuple
+
+import numpy
+from hdmf.common import DynamicTable, VectorData
+
+
+def compute_condition_responses(trial_responses: numpy.ndarray, trial_conditions: numpy.ndarray) -> dict:
+    """
+    Average the (trial, roi) responses over the trials of each unique condition, all conditions and ROIs at once.
+
+    The `trial_conditions` are a (trial, parameter) array; NaN parameters (such as those of a blank sweep) form their
+    own condition. NaN responses (such as those of trials near the ends of the session) are left out of the averages.
+
+    Returns the unique (condition, parameter) 'conditions', and the (condition, roi) 'number_of_trials', 'mean', and
+    'sem' (standard error of the mean), which is NaN for conditions with fewer than two trials.
+    """
+    trial_responses = numpy.asarray(trial_responses, dtype="float64")
+    trial_conditions = numpy.asarray(trial_conditions, dtype="float64").reshape(len(trial_responses), -1)
+
+    # Code each parameter by its unique values (NaN is a single value of its own), then each combination of codes
+    parameter_codes = list()
+    for parameter_values in trial_conditions.T:
+        _, codes = numpy.unique(parameter_values, return_inverse=True)
+        parameter_codes.append(codes.reshape(-1))
+    combined_codes = numpy.ravel_multi_index(
+        multi_index=parameter_codes, dims=[codes.max(initial=0) + 1 for codes in parameter_codes]
+    )
+    _, first_trials, condition_of_trial = numpy.unique(combined_codes, return_index=True, return_inverse=True)
+    condition_of_trial = condition_of_trial.reshape(-1)
+
+    # Sums over the trials of each condition as a single product with the (condition, trial) membership
+    membership = numpy.zeros(shape=(len(first_trials), len(trial_responses)))
+    membership[condition_of_trial, numpy.arange(len(trial_responses))] = 1.0
+    is_valid = ~numpy.isnan(trial_responses)
+    valid_responses = numpy.where(is_valid, trial_responses, 0.0)
+
+    number_of_trials = membership @ is_valid
+    sums = membership @ valid_responses
+    sums_of_squares = membership @ valid_responses**2
+    with numpy.errstate(invalid="ignore", divide="ignore"):
+        means = sums / number_of_trials
+        variances = (sums_of_squares - number_of_trials * means**2) / (number_of_trials - 1)
+        sems = numpy.sqrt(numpy.clip(variances, 0.0, None) / number_of_trials)
+    sems[number_of_trials < 2] = numpy.nan
+
+    return dict(
+        conditions=trial_conditions[first_trials],
+        number_of_trials=number_of_trials.astype("uint32"),
+        mean=means,
+        sem=sems,
+    )
+
+
+def create_condition_response_table(
+    name: str,
+    description: str,
+    condition_responses: dict,
+    condition_columns: Dict[str, Tuple[str, str]],
+) -> DynamicTable:
+    """
+    Store the responses to each condition as a table with one row per condition and one value per ROI in each row.
+
+    The `condition_columns` map the name of each parameter column, in the order of the parameters, to its description
+    and dtype.
+    """
+    columns = [
+        VectorData(
+            name=column_name,
+            description=column_description,
+            data=condition_responses["conditions"][:, column_index].astype(column_dtype),
+        )
+        for column_index, (column_name, (column_description, column_dtype)) in enumerate(condition_columns.items())
+    ]
+    columns.extend(
+        [
+            VectorData(
+                name="number_of_trials",
+                description="The number of trials of this condition with a response, for each ROI.",
+                data=condition_responses["number_of_trials"],
+            ),
+            VectorData(
+                name="mean_response",
+                description=(
+                    "The mean response of each ROI to this condition, in the order of the rows of the "
+                    "PlaneSegmentation."
+                ),
+                data=condition_responses["mean"].astype("float32"),
+            ),
+            VectorData(
+                name="sem_response",
+                description="The standard error of the mean response of each ROI to this condition.",
+                data=condition_responses["sem"].astype("float32"),
+            ),
+        ]
+    )
+    return DynamicTable(name=name, description=description, columns=columns)
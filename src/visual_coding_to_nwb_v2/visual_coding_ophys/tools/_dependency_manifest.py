@@ -0,0 +1,96 @@
+"""Record which source artifacts each container of a v2 file came from, so that only the stale containers are updated."""
+
+import json
+import os
+import pathlib
+from typing import Dict, List, Union
+
+from ._remote_file import is_remote_path
+
+# The artifacts of each container, by the name of their source data argument, with the path of each or None if absent
+ContainerSources = Dict[str, Dict[str, Union[str, pathlib.Path, None]]]
+
+
+def get_artifact_fingerprint(file_path: Union[str, pathlib.Path, None]) -> Union[dict, None]:
+    """
+    Identify the version of a source artifact by its path, size, and modification time.
+
+    Artifacts that do not exist have no fingerprint. Remote artifacts are identified by their URL alone.
+    """
+    if file_path is None:
+        return None
+    if is_remote_path(file_path=file_path):
+        return dict(path=str(file_path))
+
+    file_path = pathlib.Path(file_path)
+    if not file_path.exists():
+        return None
+    file_stat = file_path.stat()
+    return dict(path=str(file_path), size=file_stat.st_size, modified_time=file_stat.st_mtime)
+
+
+def get_container_fingerprints(container_sources: ContainerSources) -> Dict[str, Dict[str, Union[dict, None]]]:
+    return {
+        container_name: {
+            artifact_name: get_artifact_fingerprint(file_path=file_path)
+            for artifact_name, file_path in artifacts.items()
+        }
+        for container_name, artifacts in container_sources.items()
+    }
+
+
+def load_dependency_manifest(manifest_file_path: Union[str, pathlib.Path]) -> dict:
+    manifest_file_path = pathlib.Path(manifest_file_path)
+    if not manifest_file_path.exists():
+        return dict(containers=dict())
+
+    with open(file=manifest_file_path, mode="r") as io:
+        return json.load(fp=io)
+
+
+def save_dependency_manifest(manifest_file_path: Union[str, pathlib.Path], manifest: dict) -> None:
+    """Replace the manifest in a single step, so that a reader never sees it partially written."""
+    manifest_file_path = pathlib.Path(manifest_file_path)
+    manifest_file_path.parent.mkdir(parents=True, exist_ok=True)
+
+    temporary_file_path = manifest_file_path.with_suffix(f"{manifest_file_path.suffix}.tmp")
+    with open(file=temporary_file_path, mode="w") as io:
+        json.dump(obj=manifest, fp=io, indent=4)
+    os.replace(src=temporary_file_path, dst=manifest_file_path)
+
+
+def get_stale_containers(manifest: dict, container_sources: ContainerSources) -> List[str]:
+    """
+    List the containers whose artifacts were added, changed, or removed since they were recorded in the manifest.
+
+    A container that was never recorded counts as converted from absent artifacts, so that it is only stale once any of
+    its artifacts exists.
+    """
+    recorded_fingerprints = manifest["containers"]
+    return [
+        container_name
+        for container_name, fingerprints in get_container_fingerprints(container_sources=container_sources).items()
+        if recorded_fingerprints.get(container_name, {artifact_name: None for artifact_name in fingerprints})
+        != fingerprints
+    ]
+
+
+def record_containers(manifest: dict, container_sources: ContainerSources, container_names: List[str]) -> None:
+    """Record the current artifacts of the containers as those they were converted from."""
+    fingerprints = get_container_fingerprints(container_sources=container_sources)
+    for container_name in container_names:
+        manifest["containers"][container_name] = fingerprints[container_name]
+
+
+def get_container_storage(manifest: dict, container_name: str) -> Union[str, None]:
+    """The storage layout a container was last written with, or None if it was never recorded."""
+    return manifest.get("storage", dict()).get(container_name)
+
+
+def record_container_storage(manifest: dict, container_name: str, storage: str) -> None:
+    """
+    Record the storage layout a container was written with, such as 'dense' or 'sparse'.
+
+    Updates reuse it unless another layout is asked for explicitly, so that a container is never switched silently.
+    """
+    manifest.setdefault("storage", dict())[container_name] = storage
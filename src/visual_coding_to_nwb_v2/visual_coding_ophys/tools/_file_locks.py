@@ -0,0 +1,76 @@
+"""Exclusive locks on files, respected by every process on the host."""
+
+import os
+import pathlib
+import sys
+from contextlib import contextmanager
+from typing import Iterator, Union
+
+
+@contextmanager
+def exclusive_file_lock(file_path: Union[str, pathlib.Path]) -> Iterator[int]:
+    """Hold an exclusive lock on the file across processes, yielding its descriptor opened for reading and writing."""
+    file_descriptor = os.open(path=file_path, flags=os.O_RDWR | os.O_CREAT | getattr(os, "O_BINARY", 0))
+    try:
+        if sys.platform == "win32":
+            import msvcrt
+
+            while True:
+                try:
+                    msvcrt.locking(file_descriptor, msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:  # LK_LOCK gives up after roughly ten seconds of contention
+                    continue
+            try:
+                yield file_descriptor
+            finally:
+                os.lseek(file_descriptor, 0, os.SEEK_SET)
+                msvcrt.locking(file_descriptor, msvcrt.LK_UNLCK, 1)
+        else:
+            import fcntl
+
+            fcntl.flock(file_descriptor, fcntl.LOCK_EX)
+            try:
+                yield file_descriptor
+            finally:
+                fcntl.flock(file_descriptor, fcntl.LOCK_UN)
+    finally:
+        os.close(file_descriptor)
+
+
+@contextmanager
+def try_exclusive_file_lock(file_path: Union[str, pathlib.Path]) -> Iterator[bool]:
+    """
+    Take an exclusive lock on the file only if no other holder has it, yielding whether it was taken.
+
+    A lock held through another descriptor counts as held, even within the same process.
+    """
+    file_descriptor = os.open(path=file_path, flags=os.O_RDWR | os.O_CREAT | getattr(os, "O_BINARY", 0))
+    try:
+        if sys.platform == "win32":
+            import msvcrt
+
+            try:
+                msvcrt.locking(file_descriptor, msvcrt.LK_NBLCK, 1)
+            except OSError:
+                yield False
+                return
+            try:
+                yield True
+            finally:
+                os.lseek(file_descriptor, 0, os.SEEK_SET)
+                msvcrt.locking(file_descriptor, msvcrt.LK_UNLCK, 1)
+        else:
+            import fcntl
+
+            try:
+                fcntl.flock(file_descriptor, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                yield False
+                return
+            try:
+                yield True
+            finally:
+                fcntl.flock(file_descriptor, fcntl.LOCK_UN)
+    finally:
+        os.close(file_descriptor)
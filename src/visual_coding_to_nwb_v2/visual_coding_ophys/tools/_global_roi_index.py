@@ -0,0 +1,181 @@
+"""An index of every ROI across sessions by its global ID, for finding the sessions of a cell without opening them."""
+
+import os
+import pathlib
+import re
+from typing import Dict, Iterable, List, Tuple, Union
+
+import h5py
+import numpy
+
+from ._file_locks import exclusive_file_lock
+from ._roi_spatial_index import compute_roi_spatial_index
+
+GLOBAL_ROI_INDEX_DTYPE = numpy.dtype(
+    [
+        ("global_roi_id", "<i8"),
+        ("session_id", "<i8"),
+        ("container_id", "<i8"),
+        ("row", "<u4"),
+        ("centroid_x", "<f4"),
+        ("centroid_y", "<f4"),
+    ]
+)
+
+
+def read_roi_records(nwbfile_path: Union[str, pathlib.Path]) -> numpy.ndarray:
+    """
+    Read the index records of every ROI of a processed v2 file, from its ROI table and session metadata alone.
+
+    The session is the ophys experiment ID at the start of the 'session_id', and the container is parsed from the
+    'notes'; a missing container is recorded as -1. Files from before the spatial index have their centroids computed
+    from the pixel masks.
+    """
+    with h5py.File(name=nwbfile_path, mode="r") as nwbfile:
+        plane_segmentation = nwbfile["processing/ophys/ImageSegmentation/PlaneSegmentation"]
+        global_roi_ids = plane_segmentation["global_roi_id"][:]
+
+        if "centroid" in plane_segmentation:
+            centroids = plane_segmentation["centroid"][:]
+        else:
+            pixel_mask = plane_segmentation["pixel_mask"][:]
+            pixel_mask_ends = plane_segmentation["pixel_mask_index"][:]
+            pixel_masks = numpy.split(
+                numpy.stack([pixel_mask["x"], pixel_mask["y"], pixel_mask["weight"]], axis=1), pixel_mask_ends[:-1]
+            )
+            centroids = compute_roi_spatial_index(pixel_masks=pixel_masks)["centroid"]
+
+        session_id = int(nwbfile["general/session_id"][()].decode("utf-8").split("-")[0])
+        container_match = re.search(pattern=r"Container ID: (\d+)", string=nwbfile["general/notes"][()].decode("utf-8"))
+        container_id = int(container_match.group(1)) if container_match is not None else -1
+
+    records = numpy.empty(shape=len(global_roi_ids), dtype=GLOBAL_ROI_INDEX_DTYPE)
+    records["global_roi_id"] = global_roi_ids
+    records["session_id"] = session_id
+    records["container_id"] = container_id
+    records["row"] = numpy.arange(len(global_roi_ids))
+    records["centroid_x"] = centroids[:, 0]
+    records["centroid_y"] = centroids[:, 1]
+    return records
+
+
+def _save_array_atomically(file_path: pathlib.Path, array: numpy.ndarray) -> None:
+    temporary_file_path = file_path.with_name(f"{file_path.name}.tmp")
+    with open(file=temporary_file_path, mode="wb") as io:
+        numpy.save(file=io, arr=array)
+    os.replace(src=temporary_file_path, dst=file_path)
+
+
+class GlobalRoiIndex:
+    """
+    A table of every ROI across sessions, sorted by global ROI ID and memory-mapped for lookups.
+
+    Each converted session is added as its own small file under `pending/`, so that any number of workers can add
+    sessions as they finish without contending for the table. Lookups include the pending sessions, and `compact`
+    merges them into the sorted table; a session that is added again replaces its previous records.
+    """
+
+    def __init__(self, index_folder_path: Union[str, pathlib.Path]):
+        self.index_folder_path = pathlib.Path(index_folder_path)
+        self.pending_folder_path = self.index_folder_path / "pending"
+        self.pending_folder_path.mkdir(parents=True, exist_ok=True)
+
+        self.table_file_path = self.index_folder_path / "global_roi_index.npy"
+        self.lock_file_path = self.index_folder_path / "index.lock"
+        self._table = None
+        self._table_version = None
+
+    def add_session(self, records: numpy.ndarray) -> None:
+        """Add the records of a single session, replacing any previous records of that session."""
+        session_ids = numpy.unique(records["session_id"])
+        assert len(session_ids) == 1, "The records must all be from a single session."
+
+        _save_array_atomically(
+            file_path=self.pending_folder_path / f"{session_ids[0]}.npy",
+            array=numpy.asarray(records, dtype=GLOBAL_ROI_INDEX_DTYPE),
+        )
+
+    def add_nwbfile(self, nwbfile_path: Union[str, pathlib.Path]) -> None:
+        self.add_session(records=read_roi_records(nwbfile_path=nwbfile_path))
+
+    def _load_pending(self) -> Dict[pathlib.Path, Tuple[int, numpy.ndarray]]:
+        """The records of each pending session, along with the modification time of their file when read."""
+        pending = dict()
+        for pending_file_path in self.pending_folder_path.glob("*.npy"):
+            try:
+                modification_time = pending_file_path.stat().st_mtime_ns
+                pending[pending_file_path] = (modification_time, numpy.load(file=pending_file_path))
+            except FileNotFoundError:  # Merged by another process in the meantime
+                continue
+        return pending
+
+    def get_table(self) -> numpy.ndarray:
+        """The sorted table, memory-mapped; it is mapped again whenever it has been replaced by a compaction."""
+        if not self.table_file_path.exists():
+            return numpy.empty(shape=0, dtype=GLOBAL_ROI_INDEX_DTYPE)
+
+        table_stat = self.table_file_path.stat()
+        table_version = (table_stat.st_ino, table_stat.st_mtime_ns)
+        if self._table is None or table_version != self._table_version:
+            self._table = numpy.load(file=self.table_file_path, mmap_mode="r")
+            self._table_version = table_version
+        return self._table
+
+    def compact(self) -> int:
+        """Merge the pending sessions into the sorted table, returning the number of sessions merged."""
+        with exclusive_file_lock(file_path=self.lock_file_path):
+            pending = self._load_pending()
+            if len(pending) == 0:
+                return 0
+
+            pending_records = numpy.concatenate([records for _, records in pending.values()])
+            table = numpy.array(self.get_table())  # Copy out of the memory map before replacing its file
+            table = table[~numpy.isin(table["session_id"], numpy.unique(pending_records["session_id"]))]
+            table = numpy.concatenate([table, pending_records])
+            table = table[numpy.lexsort((table["row"], table["session_id"], table["global_roi_id"]))]
+
+            self._table = None
+            _save_array_atomically(file_path=self.table_file_path, array=table)
+
+            # A session added again during the merge keeps its newer pending file for the next one
+            for pending_file_path, (modification_time, _) in pending.items():
+                try:
+                    if pending_file_path.stat().st_mtime_ns == modification_time:
+                        pending_file_path.unlink()
+                except FileNotFoundError:
+                    continue
+        return len(pending)
+
+    def lookup(self, global_roi_ids: Union[int, Iterable[int]]) -> numpy.ndarray:
+        """Find the records of every session containing any of the global ROI IDs, by binary search of the table."""
+        global_roi_ids = numpy.atleast_1d(numpy.asarray(global_roi_ids, dtype="int64"))
+
+        table = self.get_table()
+        starts = numpy.searchsorted(table["global_roi_id"], global_roi_ids, side="left")
+        stops = numpy.searchsorted(table["global_roi_id"], global_roi_ids, side="right")
+        matches = [table[start:stop] for start, stop in zip(starts, stops) if stop > start]
+        matches = numpy.concatenate(matches) if matches else numpy.empty(shape=0, dtype=GLOBAL_ROI_INDEX_DTYPE)
+
+        pending_records = [records for _, records in self._load_pending().values()]
+        if len(pending_records) == 0:
+            return numpy.array(matches)
+
+        pending_records = numpy.concatenate(pending_records)
+        matches = matches[~numpy.isin(matches["session_id"], numpy.unique(pending_records["session_id"]))]
+        pending_matches = pending_records[numpy.isin(pending_records["global_roi_id"], global_roi_ids)]
+        return numpy.concatenate([numpy.array(matches), pending_matches])
+
+    def get_sessions(self, global_roi_id: int) -> List[int]:
+        """The sessions containing the ROI with this global ID."""
+        return sorted(set(self.lookup(global_roi_ids=global_roi_id)["session_id"].tolist()))
+
+
+def build_global_roi_index(
+    nwbfile_paths: Iterable[Union[str, pathlib.Path]], index_folder_path: Union[str, pathlib.Path]
+) -> GlobalRoiIndex:
+    """Add the ROIs of every processed v2 file to the index, then merge them into its table."""
+    global_roi_index = GlobalRoiIndex(index_folder_path=index_folder_path)
+    for nwbfile_path in nwbfile_paths:
+        global_roi_index.add_nwbfile(nwbfile_path=nwbfile_path)
+    global_roi_index.compact()
+    return global_roi_index
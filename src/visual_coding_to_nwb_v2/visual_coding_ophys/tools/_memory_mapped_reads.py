@@ -0,0 +1,60 @@
+"""Read contiguous, unfiltered datasets of local HDF5 sources as views of the file in memory, without copying them."""
+
+from concurrent.futures import Future
+from typing import Dict, Optional, Tuple
+
+import h5py
+import numpy
+
+# The drivers that read a file by its name on a local disk, so that the file can be mapped by that name as well
+_MAPPABLE_DRIVERS = ("sec2", "stdio")
+
+# The arrays being read ahead by `prefetch_source_datasets`, by the number of their file and their name in it
+_prefetched_arrays: Dict[Tuple[tuple, str], Future] = dict()
+
+
+def _get_dataset_key(dataset: h5py.Dataset) -> Tuple[tuple, str]:
+    """Identify a dataset by its open file and its name, the same for every handle of it opened through that file."""
+    return dataset.file.id.fileno, dataset.name
+
+
+def get_memory_map(dataset: h5py.Dataset) -> Optional[numpy.ndarray]:
+    """
+    A read-only view of a dataset mapped from its file at the offset of its data, or None if it cannot be mapped.
+
+    Only datasets of numbers, stored contiguously in the file without filters or external storage, can be mapped; the
+    file must also be read from a local disk by its name (streamed sources never are). The pages of the view are read
+    on demand through the page cache of the operating system, instead of being copied through the HDF5 library.
+    """
+    if dataset.chunks is not None or dataset.ndim == 0 or dataset.size == 0:
+        return None
+    if dataset.dtype.kind not in "iuf" or dataset.file.driver not in _MAPPABLE_DRIVERS:
+        return None
+
+    creation_properties = dataset.id.get_create_plist()
+    if creation_properties.get_nfilters() > 0 or creation_properties.get_external_count() > 0:
+        return None
+
+    offset = dataset.id.get_offset()
+    if offset is None:  # The data was never written, so it has no place in the file
+        return None
+
+    memory_map = numpy.memmap(
+        filename=dataset.file.filename, mode="r", dtype=dataset.dtype, offset=offset, shape=dataset.shape
+    )
+    return memory_map.view(numpy.ndarray)
+
+
+def read_source_dataset(dataset: h5py.Dataset) -> numpy.ndarray:
+    """
+    Read a whole dataset of a source file, as a read-only memory map when its layout allows, or else through h5py.
+
+    A mapped dataset keeps its file open until the array (and every view of it) is released. A dataset that is being
+    prefetched is taken from its prefetch instead, waiting for it if it is still being read.
+    """
+    prefetched_array = _prefetched_arrays.pop(_get_dataset_key(dataset=dataset), None)
+    if prefetched_array is not None:
+        return prefetched_array.result()
+
+    memory_map = get_memory_map(dataset=dataset)
+    return dataset[()] if memory_map is None else memory_map
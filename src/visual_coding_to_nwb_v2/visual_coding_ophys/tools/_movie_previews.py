@@ -0,0 +1,178 @@
+"""Bin a movie in time and space as it is written, to store small previews of it without reading it again."""
+
+import math
+import pathlib
+import tempfile
+from typing import Callable, Dict, List, Set, Tuple
+
+import numpy
+from hdmf.data_utils import GenericDataChunkIterator
+
+
+class SharedMovieBuffers:
+    """
+    A sliceable view of a movie that bins every preview of it from each buffer of frames as that buffer is read.
+
+    The binned frames of each preview are kept in a temporary file until they are written, so that the movie is only
+    read once however its iterator and those of its previews take turns; only the current buffer is kept in memory.
+    Other consumers, such as the accumulators of summary images, are likewise given each buffer exactly once.
+    """
+
+    def __init__(self, data, buffer_length: int):
+        self.data = data
+        self.buffer_length = buffer_length
+        self.shape = data.shape
+        self.dtype = data.dtype
+        self.number_of_reads = 0
+
+        self.previews: Dict[Tuple[int, int], numpy.ndarray] = dict()
+        self._buffer_consumers: List[Callable[[int, numpy.ndarray], None]] = list()
+        self._consumed_buffer_indices: Set[int] = set()
+        self._buffer_index = None
+        self._buffer = None
+        self._temporary_folder = None
+
+    def __len__(self) -> int:
+        return self.shape[0]
+
+    def add_preview(self, temporal_factor: int, spatial_factor: int) -> Tuple[int, ...]:
+        """Bin a preview by these factors from each buffer as it is read, returning the shape of the preview."""
+        assert self.number_of_reads == 0, "Previews must be added before the movie is read."
+        assert (
+            self.buffer_length % temporal_factor == 0 or self.buffer_length >= self.shape[0]
+        ), "The buffer length of the movie must be a multiple of the temporal factor of each preview."
+
+        if self._temporary_folder is None:
+            self._temporary_folder = tempfile.TemporaryDirectory(prefix="movie_previews_")
+        preview_shape = (
+            math.ceil(self.shape[0] / temporal_factor),
+            *(math.ceil(length / spatial_factor) for length in self.shape[1:]),
+        )
+        self.previews[(temporal_factor, spatial_factor)] = numpy.lib.format.open_memmap(
+            filename=pathlib.Path(self._temporary_folder.name) / f"preview_{temporal_factor}_{spatial_factor}.npy",
+            mode="w+",
+            dtype=self.dtype,
+            shape=preview_shape,
+        )
+        return preview_shape
+
+    def add_buffer_consumer(self, consumer: Callable[[int, numpy.ndarray], None]) -> None:
+        """Call the consumer with the first frame index and the frames of each buffer, the first time it is read."""
+        assert self.number_of_reads == 0, "Consumers must be added before the movie is read."
+        self._buffer_consumers.append(consumer)
+
+    def read_all_buffers(self) -> None:
+        """Read every buffer that was not yet read, such as when a consumer needs the whole movie before its writer."""
+        for buffer_index in range(math.ceil(self.shape[0] / self.buffer_length)):
+            if buffer_index not in self._consumed_buffer_indices:
+                self.get_buffer(buffer_index=buffer_index)
+
+    def get_buffer(self, buffer_index: int) -> numpy.ndarray:
+        if self._buffer_index != buffer_index:
+            start = buffer_index * self.buffer_length
+            self._buffer = numpy.asarray(self.data[start : start + self.buffer_length])
+            self._buffer_index = buffer_index
+            self.number_of_reads += 1
+
+            if buffer_index not in self._consumed_buffer_indices:
+                for (temporal_factor, spatial_factor), preview in self.previews.items():
+                    preview_start = start // temporal_factor
+                    binned_buffer = bin_movie(
+                        data=self._buffer, temporal_factor=temporal_factor, spatial_factor=spatial_factor
+                    )
+                    preview[preview_start : preview_start + binned_buffer.shape[0]] = binned_buffer
+                for consumer in self._buffer_consumers:
+                    consumer(start, self._buffer)
+                self._consumed_buffer_indices.add(buffer_index)
+        return self._buffer
+
+    def __getitem__(self, selection: Tuple[slice, ...]) -> numpy.ndarray:
+        frame_selection, *frame_axes_selection = selection if isinstance(selection, tuple) else (selection,)
+        start = frame_selection.start or 0
+        stop = frame_selection.stop if frame_selection.stop is not None else self.shape[0]
+
+        buffer_index = start // self.buffer_length
+        buffer_start = buffer_index * self.buffer_length
+        assert stop - buffer_start <= self.buffer_length, "Selections must lie within a single buffer of the movie."
+        buffer = self.get_buffer(buffer_index=buffer_index)
+        return buffer[(slice(start - buffer_start, stop - buffer_start), *frame_axes_selection)]
+
+    def get_preview_frames(self, temporal_factor: int, spatial_factor: int, start: int, stop: int) -> numpy.ndarray:
+        """The binned frames of a preview, reading the buffers of the movie they are binned from if not yet read."""
+        first_buffer_index = start * temporal_factor // self.buffer_length
+        last_buffer_index = (min(stop * temporal_factor, self.shape[0]) - 1) // self.buffer_length
+        for buffer_index in range(first_buffer_index, last_buffer_index + 1):
+            if buffer_index not in self._consumed_buffer_indices:
+                self.get_buffer(buffer_index=buffer_index)
+        return numpy.array(self.previews[(temporal_factor, spatial_factor)][start:stop])
+
+
+def bin_movie(data: numpy.ndarray, temporal_factor: int, spatial_factor: int) -> numpy.ndarray:
+    """
+    Average each block of `temporal_factor` frames and `spatial_factor` x `spatial_factor` pixels of a movie.
+
+    Blocks at the edges of the movie are averaged over the frames and pixels they have. Integer movies are rounded to
+    the nearest value of their type.
+    """
+    # Sum in double precision, without first converting the whole buffer, and divide once so that integer sums stay
+    # exact and halves round consistently
+    binned_data = numpy.asarray(data)
+    counts = numpy.ones(shape=(1,) * binned_data.ndim)
+    for axis, factor in enumerate((temporal_factor, spatial_factor, spatial_factor)):
+        starts = numpy.arange(0, binned_data.shape[axis], factor)
+        count_shape = [1] * binned_data.ndim
+        count_shape[axis] = len(starts)
+        counts = counts * numpy.diff(numpy.append(starts, binned_data.shape[axis])).reshape(count_shape)
+        binned_data = numpy.add.reduceat(binned_data, starts, axis=axis, dtype="float64")
+    binned_data /= counts
+
+    if numpy.issubdtype(data.dtype, numpy.integer):
+        binned_data = numpy.round(binned_data)
+    return binned_data.astype(data.dtype)
+
+
+class MoviePreviewDataChunkIterator(GenericDataChunkIterator):
+    """
+    Write a binned preview of a movie, from the frames binned by its `SharedMovieBuffers` as the movie is read.
+
+    Each buffer of the preview is binned from a single buffer of the movie, so the buffer length of the movie must be
+    a multiple of the `temporal_factor`.
+    """
+
+    def __init__(
+        self,
+        movie_buffers: SharedMovieBuffers,
+        temporal_factor: int,
+        spatial_factor: int,
+        display_progress: bool = False,
+        progress_bar_options: dict = None,
+    ):
+        self.movie_buffers = movie_buffers
+        self.temporal_factor = temporal_factor
+        self.spatial_factor = spatial_factor
+        self.preview_shape = movie_buffers.add_preview(temporal_factor=temporal_factor, spatial_factor=spatial_factor)
+
+        preview_buffer_shape = (
+            min(max(movie_buffers.buffer_length // temporal_factor, 1), self.preview_shape[0]),
+            *self.preview_shape[1:],
+        )
+        super().__init__(
+            buffer_shape=preview_buffer_shape,
+            chunk_shape=preview_buffer_shape,
+            display_progress=display_progress,
+            progress_bar_options=progress_bar_options,
+        )
+
+    def _get_maxshape(self) -> Tuple[int, ...]:
+        return self.preview_shape
+
+    def _get_dtype(self) -> numpy.dtype:
+        return self.movie_buffers.dtype
+
+    def _get_data(self, selection: Tuple[slice]) -> numpy.ndarray:
+        return self.movie_buffers.get_preview_frames(
+            temporal_factor=self.temporal_factor,
+            spatial_factor=self.spatial_factor,
+            start=selection[0].start,
+            stop=selection[0].stop,
+        )
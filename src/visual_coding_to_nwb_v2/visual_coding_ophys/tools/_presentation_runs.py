@@ -0,0 +1,209 @@
+"""Convert the frame by frame presentations of a movie to and from runs of consecutive frames shown at a steady rate."""
+
+from typing import Optional, Tuple
+
+import numpy
+from hdmf.common import VectorData, VectorIndex
+from pynwb.epoch import TimeIntervals
+from pynwb.file import NWBFile
+
+_RESIDUAL_DTYPES = ("int8", "int16", "int32")
+
+# How much longer than the median frame period an interval may last before it is taken as a gap between runs
+_RUN_GAP_FACTOR = 1.5
+
+
+def encode_presentation_runs(
+    frame_indices: numpy.ndarray, timestamps: numpy.ndarray, jitter_tolerance: Optional[float] = None
+) -> dict:
+    """
+    Compress the presentation of a movie, one frame index and timestamp per displayed frame, into runs.
+
+    A run is a span of displayed frames where each shows the next frame of the movie at about the median frame period
+    after the previous one; a new run starts wherever a frame is repeated or skipped, or the display pauses, as between
+    trials. Each run is described by its first frame, its number of frames, its starting time, and its frame rate, fit
+    through its timestamps as in `analyze_timestamps`.
+
+    The deviations of the timestamps from their runs are kept as 'timestamp_residuals', ordered by run then by frame
+    like the presentation itself, so that `expand_presentation_runs` recovers every timestamp. If the
+    `jitter_tolerance` (in seconds) is specified, they are quantized in steps of it into the smallest integer type that
+    fits them, or left out if they are all within the tolerance; otherwise they are kept in seconds, and the timestamps
+    are recovered to within the rounding of double precision. The frame indices are always recovered exactly.
+    """
+    assert jitter_tolerance is None or jitter_tolerance > 0, "The 'jitter_tolerance' must be a positive number!"
+
+    frame_indices = numpy.asarray(frame_indices, dtype="int64")
+    timestamps = numpy.asarray(timestamps, dtype="float64")
+    assert frame_indices.ndim == 1 and frame_indices.shape == timestamps.shape, "Expected one timestamp per frame!"
+    assert numpy.all(numpy.isfinite(timestamps)), "Runs cannot be fit through timestamps that are not finite!"
+
+    number_of_samples = frame_indices.shape[0]
+    if number_of_samples == 0:
+        return dict(
+            start_frames=numpy.empty(0, dtype="uint32"),
+            number_of_frames=numpy.empty(0, dtype="uint32"),
+            start_times=numpy.empty(0, dtype="float64"),
+            frame_rates=numpy.empty(0, dtype="float64"),
+            timestamp_residuals=None,
+            residual_conversion=jitter_tolerance or 1.0,
+        )
+
+    intervals = numpy.diff(timestamps)
+    frame_period = float(numpy.median(intervals)) if number_of_samples > 1 else 1.0
+    is_continued = (numpy.diff(frame_indices) == 1) & (intervals > 0) & (intervals < _RUN_GAP_FACTOR * frame_period)
+
+    run_starts = numpy.flatnonzero(numpy.concatenate(([True], ~is_continued)))
+    number_of_frames = numpy.diff(run_starts, append=number_of_samples)
+    run_indices = numpy.repeat(numpy.arange(run_starts.shape[0]), number_of_frames)
+    sample_indices = numpy.arange(number_of_samples, dtype="float64") - run_starts[run_indices]
+
+    # A least squares line through each run, relative to its first timestamp to keep the sums well conditioned
+    relative_timestamps = timestamps - timestamps[run_starts][run_indices]
+    mean_indices = (number_of_frames - 1) / 2
+    centered_indices = sample_indices - mean_indices[run_indices]
+    covariances = numpy.add.reduceat(centered_indices * relative_timestamps, run_starts)
+    variances = numpy.add.reduceat(centered_indices**2, run_starts)
+    periods = numpy.full(shape=run_starts.shape, fill_value=frame_period)
+    numpy.divide(covariances, variances, out=periods, where=variances > 0)  # Single frames keep the median period
+    frame_rates = 1.0 / periods
+    start_times = (
+        timestamps[run_starts]
+        + numpy.add.reduceat(relative_timestamps, run_starts) / number_of_frames
+        - periods * mean_indices
+    )
+
+    # Center the residuals of each run around zero to minimize their largest absolute deviation
+    residuals = timestamps - (start_times[run_indices] + sample_indices / frame_rates[run_indices])
+    start_times += (numpy.maximum.reduceat(residuals, run_starts) + numpy.minimum.reduceat(residuals, run_starts)) / 2
+    residuals = timestamps - (start_times[run_indices] + sample_indices / frame_rates[run_indices])
+
+    residual_conversion = 1.0
+    if jitter_tolerance is not None:
+        residual_conversion = jitter_tolerance
+        residuals = numpy.round(residuals / jitter_tolerance)
+        max_quantized_residual = numpy.abs(residuals).max()
+        residual_dtype = next(
+            (dtype for dtype in _RESIDUAL_DTYPES if max_quantized_residual <= numpy.iinfo(dtype).max), None
+        )
+        assert residual_dtype is not None, "The timestamps deviate too far from their runs for this tolerance!"
+        residuals = residuals.astype(residual_dtype) if max_quantized_residual > 0 else None
+
+    return dict(
+        start_frames=frame_indices[run_starts].astype("uint32"),
+        number_of_frames=number_of_frames.astype("uint32"),
+        start_times=start_times,
+        frame_rates=frame_rates,
+        timestamp_residuals=residuals,
+        residual_conversion=residual_conversion,
+    )
+
+
+def expand_presentation_runs(
+    start_frames: numpy.ndarray,
+    number_of_frames: numpy.ndarray,
+    start_times: numpy.ndarray,
+    frame_rates: numpy.ndarray,
+    timestamp_residuals: Optional[numpy.ndarray] = None,
+    residual_conversion: float = 1.0,
+) -> Tuple[numpy.ndarray, numpy.ndarray]:
+    """Expand runs back into the frame index (as uint32) and timestamp of every displayed frame, all at once."""
+    number_of_frames = numpy.asarray(number_of_frames, dtype="int64")
+    run_starts = numpy.cumsum(number_of_frames) - number_of_frames
+    run_indices = numpy.repeat(numpy.arange(number_of_frames.shape[0]), number_of_frames)
+    sample_indices = numpy.arange(run_indices.shape[0], dtype="int64") - run_starts[run_indices]
+
+    frame_indices = (numpy.asarray(start_frames, dtype="int64")[run_indices] + sample_indices).astype("uint32")
+    timestamps = (
+        numpy.asarray(start_times, dtype="float64")[run_indices]
+        + sample_indices / numpy.asarray(frame_rates, dtype="float64")[run_indices]
+    )
+    if timestamp_residuals is not None:
+        timestamps += numpy.asarray(timestamp_residuals, dtype="float64") * residual_conversion
+    return frame_indices, timestamps
+
+
+def create_presentation_run_table(name: str, description: str, presentation_runs: dict) -> TimeIntervals:
+    """
+    Store the runs of `encode_presentation_runs` as a table of intervals, one row per run.
+
+    Each run lasts from its starting time until the end of its last frame. The residuals, if any, are a ragged column
+    in the units of the `timestamp_residual_conversion` column, which is the same for every run.
+    """
+    number_of_runs = presentation_runs["start_frames"].shape[0]
+    stop_times = (
+        presentation_runs["start_times"] + presentation_runs["number_of_frames"] / presentation_runs["frame_rates"]
+    )
+    columns = [
+        VectorData(
+            name="start_time", description="Start time of the run, in seconds.", data=presentation_runs["start_times"]
+        ),
+        VectorData(name="stop_time", description="Stop time of the run, in seconds.", data=stop_times),
+        VectorData(
+            name="start_frame",
+            description="The index of the frame of the template shown first in this run.",
+            data=presentation_runs["start_frames"],
+        ),
+        VectorData(
+            name="number_of_frames",
+            description="The number of consecutive frames of the template shown in this run, one after the other.",
+            data=presentation_runs["number_of_frames"],
+        ),
+        VectorData(
+            name="frame_rate",
+            description="The rate at which the frames of this run were shown, in frames per second.",
+            data=presentation_runs["frame_rates"],
+        ),
+    ]
+    if presentation_runs["timestamp_residuals"] is not None:
+        timestamp_residuals = VectorData(
+            name="timestamp_residuals",
+            description=(
+                "The deviation of the timestamp of each frame of the run from its 'start_time' plus the index of the "
+                "frame within the run divided by its 'frame_rate', in units of the 'timestamp_residual_conversion'."
+            ),
+            data=presentation_runs["timestamp_residuals"],
+        )
+        columns.extend(
+            [
+                timestamp_residuals,
+                VectorIndex(
+                    name="timestamp_residuals_index",
+                    data=numpy.cumsum(presentation_runs["number_of_frames"], dtype="uint64"),
+                    target=timestamp_residuals,
+                ),
+                VectorData(
+                    name="timestamp_residual_conversion",
+                    description="The number of seconds per unit of the 'timestamp_residuals'.",
+                    data=numpy.full(shape=number_of_runs, fill_value=presentation_runs["residual_conversion"]),
+                ),
+            ]
+        )
+
+    return TimeIntervals(name=name, description=description, columns=columns)
+
+
+def expand_natural_movie_presentation(nwbfile: NWBFile, stimulus_name: str) -> Tuple[numpy.ndarray, numpy.ndarray]:
+    """
+    Read the frame index and timestamp of every displayed frame of a natural movie stored as runs.
+
+    The `stimulus_name` is that of the presentation, such as 'natural_movie_one_stimulus', whose runs are in the
+    '{stimulus_name}_runs' table of the stimuli.
+    """
+    table_name = f"{stimulus_name}_runs"
+    assert table_name in nwbfile.stimulus, f"The runs of the stimulus '{stimulus_name}' are not in this NWB file!"
+
+    presentation_run_table = nwbfile.stimulus[table_name]
+    timestamp_residuals = None
+    residual_conversion = 1.0
+    if "timestamp_residuals" in presentation_run_table.colnames:
+        timestamp_residuals = presentation_run_table["timestamp_residuals"].target.data[:]
+        residual_conversion = float(presentation_run_table["timestamp_residual_conversion"].data[0])
+
+    return expand_presentation_runs(
+        start_frames=presentation_run_table["start_frame"].data[:],
+        number_of_frames=presentation_run_table["number_of_frames"].data[:],
+        start_times=presentation_run_table["start_time"].data[:],
+        frame_rates=presentation_run_table["frame_rate"].data[:],
+        timestamp_residuals=timestamp_residuals,
+        residual_conversion=residual_conversion,
+    )
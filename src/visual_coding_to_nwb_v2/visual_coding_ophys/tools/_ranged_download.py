@@ -0,0 +1,227 @@
+"""Download large S3 objects as concurrent byte ranges that resume after interruption."""
+
+import hashlib
+import json
+import math
+import os
+import pathlib
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Union
+
+from ._bandwidth import BandwidthLimiter
+
+_BLOCK_SIZE = 1024 * 1024
+_MEBIBYTE = 1024 * 1024
+
+
+def get_unsigned_s3_client(endpoint_url: Union[str, None] = None):
+    """Anonymous client for the public buckets; the `endpoint_url` replaces AWS, such as for a local stand-in."""
+    import boto3
+    from botocore import UNSIGNED
+    from botocore.client import Config
+
+    return boto3.client(
+        "s3",
+        region_name="us-west-2",
+        endpoint_url=endpoint_url,
+        config=Config(signature_version=UNSIGNED, max_pool_connections=32),
+    )
+
+
+def _get_candidate_part_sizes(number_of_bytes: int, number_of_parts: int) -> List[int]:
+    """List the whole-mebibyte part sizes that split the object into exactly the number of parts of its ETag."""
+    smallest_part_size = math.ceil(number_of_bytes / number_of_parts / _MEBIBYTE) * _MEBIBYTE
+    candidate_part_sizes = {smallest_part_size} | {_MEBIBYTE * 2**exponent for exponent in range(3, 13)}
+    return sorted(
+        part_size
+        for part_size in candidate_part_sizes
+        if part_size > 0 and math.ceil(number_of_bytes / part_size) == number_of_parts
+    )
+
+
+def verify_etag(file_path: Union[str, pathlib.Path], etag: str) -> Union[bool, None]:
+    """
+    Check the contents of a file against the ETag of the S3 object it was downloaded from.
+
+    The ETag of an object uploaded in one part is the MD5 of its contents. For an object uploaded in N parts, it is the
+    MD5 of the concatenated MD5 of each part, followed by '-N'; the part size is not recorded, so every conventional
+    part size consistent with N is checked within the same pass over the file.
+
+    Returns None if the ETag has a form that cannot be reproduced, such as for objects encrypted with KMS.
+    """
+    etag = etag.strip('"')
+    digest, _, number_of_parts = etag.partition("-")
+    file_path = pathlib.Path(file_path)
+    number_of_bytes = file_path.stat().st_size
+
+    if number_of_parts == "":
+        part_sizes = [max(number_of_bytes, 1)]
+    else:
+        part_sizes = _get_candidate_part_sizes(number_of_bytes=number_of_bytes, number_of_parts=int(number_of_parts))
+    if len(digest) != 32 or not part_sizes:
+        return None
+
+    part_hashes = {part_size: hashlib.md5() for part_size in part_sizes}
+    part_digests = {part_size: list() for part_size in part_sizes}
+    with open(file=file_path, mode="rb") as io:
+        position = 0
+        for block in iter(lambda: io.read(_BLOCK_SIZE), b""):
+            position += len(block)
+            for part_size, part_hash in part_hashes.items():  # Part sizes are whole mebibytes, so blocks never straddle
+                part_hash.update(block)
+                if position % part_size == 0:
+                    part_digests[part_size].append(part_hash.digest())
+                    part_hashes[part_size] = hashlib.md5()
+
+    for part_size, part_hash in part_hashes.items():
+        if number_of_bytes % part_size != 0 or number_of_bytes == 0:
+            part_digests[part_size].append(part_hash.digest())
+
+        if number_of_parts == "":
+            candidate_digest = part_digests[part_size][0].hex()
+        else:
+            candidate_digest = hashlib.md5(b"".join(part_digests[part_size])).hexdigest()
+        if candidate_digest == digest:
+            return True
+
+    return False
+
+
+class _DownloadProgress:
+    """The ranges of a partial download that are already on disk, persisted next to it so that they can be resumed."""
+
+    def __init__(self, progress_file_path: pathlib.Path, key: str, number_of_bytes: int, etag: str, part_size: int):
+        self.progress_file_path = progress_file_path
+        self.description = dict(key=key, number_of_bytes=number_of_bytes, etag=etag, part_size=part_size)
+        self.completed_parts = set()
+        self._lock = threading.Lock()
+
+        if self.progress_file_path.exists():
+            try:
+                with open(file=self.progress_file_path, mode="r") as io:
+                    progress = json.load(fp=io)
+            except (OSError, json.JSONDecodeError):
+                return
+            # A changed object, or a different part size, invalidates everything downloaded so far
+            if {name: progress.get(name) for name in self.description} == self.description:
+                self.completed_parts = set(progress["completed_parts"])
+
+    def mark_completed(self, part_index: int) -> None:
+        with self._lock:
+            self.completed_parts.add(part_index)
+            progress = dict(self.description, completed_parts=sorted(self.completed_parts))
+
+            temporary_file_path = self.progress_file_path.parent / f".{self.progress_file_path.name}.{uuid.uuid4().hex}"
+            with open(file=temporary_file_path, mode="w") as io:
+                json.dump(obj=progress, fp=io)
+            os.replace(src=temporary_file_path, dst=self.progress_file_path)
+
+
+def _download_part(
+    s3_client,
+    bucket_name: str,
+    key: str,
+    etag: str,
+    partial_file_path: pathlib.Path,
+    start: int,
+    end: int,
+    bandwidth_limiter: Union[BandwidthLimiter, None],
+) -> None:
+    # IfMatch makes the request fail instead of mixing ranges of two versions if the object changes mid-download
+    response = s3_client.get_object(Bucket=bucket_name, Key=key, Range=f"bytes={start}-{end}", IfMatch=etag)
+    body = response["Body"]
+    with open(file=partial_file_path, mode="r+b") as io:
+        io.seek(start)
+        for block in iter(lambda: body.read(_BLOCK_SIZE), b""):
+            if bandwidth_limiter is not None:
+                bandwidth_limiter.consume(number_of_bytes=len(block))
+            io.write(block)
+        written_bytes = io.tell() - start
+        io.flush()
+        os.fsync(io.fileno())  # The range is only recorded as complete once it is certain to be on disk
+
+    expected_bytes = end - start + 1
+    if written_bytes != expected_bytes:
+        raise IOError(f"Received {written_bytes} bytes instead of {expected_bytes} for range {start}-{end} of '{key}'!")
+
+
+def download_object(
+    bucket_name: str,
+    key: str,
+    file_path: Union[str, pathlib.Path],
+    partial_folder_path: Union[str, pathlib.Path, None] = None,
+    part_size: int = 64 * _MEBIBYTE,
+    number_of_threads: int = 8,
+    bandwidth_limiter: Union[BandwidthLimiter, None] = None,
+    endpoint_url: Union[str, None] = None,
+    verify: bool = True,
+) -> int:
+    """
+    Download an S3 object as ranges of `part_size` bytes fetched by `number_of_threads` threads at once.
+
+    The data is written to a partial file in the `partial_folder_path` (by default, next to the `file_path`), and the
+    completed ranges are recorded beside it after each one lands. If the download is interrupted for any reason,
+    calling this again with the same arguments only fetches the missing ranges, provided the object is unchanged.
+
+    Once complete, the file is checked against the ETag of the object when possible, and against its size otherwise,
+    before being moved to the `file_path`. A file that fails the check is discarded and an error is raised.
+
+    Returns the size of the object in bytes.
+    """
+    file_path = pathlib.Path(file_path)
+    partial_folder_path = pathlib.Path(partial_folder_path) if partial_folder_path is not None else file_path.parent
+    partial_folder_path.mkdir(parents=True, exist_ok=True)
+    file_path.parent.mkdir(parents=True, exist_ok=True)
+    partial_file_path = partial_folder_path / f"{file_path.name}.partial"
+    progress_file_path = partial_folder_path / f"{file_path.name}.partial.json"
+
+    s3_client = get_unsigned_s3_client(endpoint_url=endpoint_url)
+    head = s3_client.head_object(Bucket=bucket_name, Key=key)
+    number_of_bytes = head["ContentLength"]
+    etag = head["ETag"]
+
+    progress = _DownloadProgress(
+        progress_file_path=progress_file_path, key=key, number_of_bytes=number_of_bytes, etag=etag, part_size=part_size
+    )
+    if not progress.completed_parts or not partial_file_path.exists():
+        progress.completed_parts = set()
+        with open(file=partial_file_path, mode="wb") as io:
+            io.truncate(number_of_bytes)
+
+    number_of_parts = max(math.ceil(number_of_bytes / part_size), 1)
+    missing_parts = [part_index for part_index in range(number_of_parts) if part_index not in progress.completed_parts]
+
+    def _fetch(part_index: int) -> None:
+        start = part_index * part_size
+        end = min(start + part_size, number_of_bytes) - 1
+        if end >= start:
+            _download_part(
+                s3_client=s3_client,
+                bucket_name=bucket_name,
+                key=key,
+                etag=etag,
+                partial_file_path=partial_file_path,
+                start=start,
+                end=end,
+                bandwidth_limiter=bandwidth_limiter,
+            )
+        progress.mark_completed(part_index=part_index)
+
+    with ThreadPoolExecutor(max_workers=number_of_threads) as executor:
+        for future in [executor.submit(_fetch, part_index) for part_index in missing_parts]:
+            future.result()  # Raise the first failure; the ranges that did complete remain recorded
+
+    if partial_file_path.stat().st_size != number_of_bytes:
+        raise IOError(
+            f"The download of '{key}' has {partial_file_path.stat().st_size} bytes instead of {number_of_bytes}!"
+        )
+    if verify and verify_etag(file_path=partial_file_path, etag=etag) is False:
+        partial_file_path.unlink()
+        progress_file_path.unlink()
+        raise IOError(f"The download of '{key}' does not match its ETag {etag}; the partial download was discarded.")
+
+    os.replace(src=partial_file_path, dst=file_path)
+    progress_file_path.unlink()
+    return number_of_bytes
@@ -0,0 +1,136 @@
+"""Size the HDF5 chunk caches and page buffers of source files to the layout of their datasets and how they are read."""
+
+import math
+import warnings
+from typing import Optional, Tuple, Union
+
+import h5py
+
+_MEBIBYTE = 1024 * 1024
+
+DEFAULT_READ_PROFILE = dict(
+    access_pattern="sequential",  # Reads in buffers along the first axis; or "random", for scattered small selections
+    chunk_cache_size=16 * _MEBIBYTE,  # The chunk cache of every dataset without a planned iteration
+    maximum_chunk_cache_size=512 * _MEBIBYTE,  # The most the chunk cache of a dataset is sized to from its iteration
+    random_access_chunks=16,  # The number of most recently used chunks kept for random access
+    page_buffer_size=16 * _MEBIBYTE,  # Only used for files created with paged file space management; 0 disables it
+)
+
+# The smallest chunks expected among datasets without a planned iteration, which sets the number of hash slots
+_SMALLEST_CHUNK_SIZE = 64 * 1024
+
+
+def _get_read_profile(read_profile: Optional[dict] = None) -> dict:
+    unknown_settings = set(read_profile or dict()) - set(DEFAULT_READ_PROFILE)
+    assert not unknown_settings, f"Unknown read profile settings {sorted(unknown_settings)}!"
+
+    read_profile = dict(DEFAULT_READ_PROFILE, **(read_profile or dict()))
+    assert read_profile["access_pattern"] in ("sequential", "random"), "Unknown 'access_pattern'!"
+    return read_profile
+
+
+def _get_number_of_slots(number_of_chunks: int) -> int:
+    """HDF5 recommends a prime number of hash slots about a hundred times the number of chunks held in the cache."""
+    number_of_slots = max(100 * number_of_chunks, 521) | 1
+    while any(number_of_slots % divisor == 0 for divisor in range(3, math.isqrt(number_of_slots) + 1, 2)):
+        number_of_slots += 2
+    return number_of_slots
+
+
+def get_chunk_cache_settings(
+    dataset: h5py.Dataset, buffer_shape: Union[Tuple[int, ...], None] = None, read_profile: Optional[dict] = None
+) -> dict:
+    """
+    The size, number of hash slots, and eviction weight of a chunk cache for reading a dataset as the profile plans.
+
+    For sequential reads in buffers of `buffer_shape` (by default, a chunk of the first axis across the whole of the
+    others), the cache holds every chunk that the end of a buffer cuts across, so that chunks shared by consecutive
+    buffers are read and decompressed once instead of once per buffer, and fully read chunks are evicted first. For
+    random reads, the cache holds the most recently used `random_access_chunks`. Neither exceeds the
+    `maximum_chunk_cache_size`.
+
+    Returns the `rdcc_nbytes`, `rdcc_nslots`, and `rdcc_w0` in the form taken by `h5py.File`.
+    """
+    assert dataset.chunks is not None, "Only chunked datasets are read through a chunk cache."
+    read_profile = _get_read_profile(read_profile=read_profile)
+
+    chunk_size = math.prod(dataset.chunks) * dataset.dtype.itemsize
+    if read_profile["access_pattern"] == "random":
+        number_of_chunks = read_profile["random_access_chunks"]
+        eviction_weight = 0.0
+    else:
+        buffer_shape = buffer_shape or (dataset.chunks[0], *dataset.shape[1:])
+        number_of_chunks = math.prod(
+            math.ceil(buffer_length / chunk_length) + int(buffer_length % chunk_length != 0)
+            for buffer_length, chunk_length in zip(buffer_shape[1:], dataset.chunks[1:])
+        )
+        eviction_weight = 1.0
+
+    chunk_cache_size = min(number_of_chunks * chunk_size, read_profile["maximum_chunk_cache_size"])
+    return dict(
+        rdcc_nbytes=int(chunk_cache_size),
+        rdcc_nslots=_get_number_of_slots(number_of_chunks=max(chunk_cache_size // chunk_size, 1)),
+        rdcc_w0=eviction_weight,
+    )
+
+
+def get_file_space_page_size(file: h5py.File) -> Optional[int]:
+    """The size of the pages of a file created with paged file space management, or None for any other file."""
+    creation_properties = file.id.get_create_plist()
+    if creation_properties.get_file_space_strategy()[0] != h5py.h5f.FSPACE_STRATEGY_PAGE:
+        return None
+    return creation_properties.get_file_space_page_size()
+
+
+def get_file_access_kwargs(read_profile: Optional[dict] = None, file_space_page_size: Optional[int] = None) -> dict:
+    """
+    The keyword arguments of `h5py.File` for the default chunk cache of a source file and, if paged, its page buffer.
+
+    The page buffer is rounded down to a whole number of pages (at least one), as HDF5 requires.
+    """
+    read_profile = _get_read_profile(read_profile=read_profile)
+
+    file_access_kwargs = dict(
+        rdcc_nbytes=read_profile["chunk_cache_size"],
+        rdcc_nslots=_get_number_of_slots(number_of_chunks=read_profile["chunk_cache_size"] // _SMALLEST_CHUNK_SIZE),
+        rdcc_w0=1.0 if read_profile["access_pattern"] == "sequential" else 0.0,
+    )
+    if file_space_page_size is not None and read_profile["page_buffer_size"] > 0:
+        number_of_pages = max(read_profile["page_buffer_size"] // file_space_page_size, 1)
+        file_access_kwargs.update(page_buf_size=number_of_pages * file_space_page_size)
+    return file_access_kwargs
+
+
+def open_source_dataset(
+    file: h5py.File,
+    name: str,
+    buffer_shape: Union[Tuple[int, ...], None] = None,
+    read_profile: Optional[dict] = None,
+) -> h5py.Dataset:
+    """
+    Open a dataset of a source file with a chunk cache of its own, sized by `get_chunk_cache_settings`.
+
+    HDF5 shares a single chunk cache among all open handles of a dataset, set by the first of them, so no other handle
+    of the dataset may be open at the time. Contiguous datasets are not read through a chunk cache, so they are opened
+    as usual.
+    """
+    dataset = file[name]
+    if dataset.chunks is None:
+        return dataset
+
+    chunk_cache_settings = get_chunk_cache_settings(
+        dataset=dataset, buffer_shape=buffer_shape, read_profile=read_profile
+    )
+    dataset.id.close()  # Release the handle used to inspect the layout, or its cache would be shared by the new one
+
+    access_properties = h5py.h5p.create(h5py.h5p.DATASET_ACCESS)
+    access_properties.set_chunk_cache(
+        chunk_cache_settings["rdcc_nslots"], chunk_cache_settings["rdcc_nbytes"], chunk_cache_settings["rdcc_w0"]
+    )
+    dataset = h5py.Dataset(h5py.h5d.open(file.id, name.encode("utf-8"), dapl=access_properties))
+    if dataset.id.get_access_plist().get_chunk_cache()[1] != chunk_cache_settings["rdcc_nbytes"]:
+        warnings.warn(
+            message=f"The chunk cache of '{name}' could not be set, since another handle of it is still open.",
+            stacklevel=2,
+        )
+    return dataset
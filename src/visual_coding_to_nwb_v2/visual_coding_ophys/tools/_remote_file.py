@@ -0,0 +1,260 @@
+"""A read-only file object over HTTP range requests, for reading HDF5 sources without downloading them first."""
+
+import collections
+import http.client
+import io
+import math
+import threading
+import urllib.parse
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, Optional, Union
+
+import h5py
+
+from ._read_profile import get_file_access_kwargs, get_file_space_page_size
+
+_MEBIBYTE = 1024 * 1024
+
+
+class RemoteFile(io.RawIOBase):
+    """
+    Read a remote file in blocks fetched by HTTP range requests, such as an object in a public S3 bucket.
+
+    The most recently used `cache_size` bytes of blocks are kept in memory. Whenever the reads move forward through the
+    file, the next `read_ahead` blocks are requested in the background, so that the download of the next part of the
+    file overlaps with the processing of the current one. Requests for blocks already in flight are shared.
+    """
+
+    def __init__(
+        self,
+        url: str,
+        block_size: int = 8 * _MEBIBYTE,
+        cache_size: int = 512 * _MEBIBYTE,
+        read_ahead: int = 4,
+        number_of_threads: int = 8,
+    ):
+        super().__init__()
+        self.url = url
+        self.block_size = block_size
+        self.cache_size = cache_size
+        self.read_ahead = read_ahead
+
+        parsed_url = urllib.parse.urlsplit(url)
+        assert parsed_url.scheme in ("http", "https"), f"Unsupported scheme '{parsed_url.scheme}' in '{url}'!"
+        self._connection_class = (
+            http.client.HTTPSConnection if parsed_url.scheme == "https" else http.client.HTTPConnection
+        )
+        self._host = parsed_url.netloc
+        self._path = urllib.parse.urlunsplit(("", "", parsed_url.path, parsed_url.query, ""))
+        self._thread_state = threading.local()
+
+        self._blocks: Dict[int, Union[bytes, Future]] = collections.OrderedDict()
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=number_of_threads, thread_name_prefix="remote_file")
+        self._position = 0
+        self._last_block_index = None
+        self.number_of_requests = 0
+
+        response = self._request(method="HEAD")
+        self.size = int(response.getheader("Content-Length"))
+
+    def _get_connection(self) -> http.client.HTTPConnection:
+        if getattr(self._thread_state, "connection", None) is None:
+            self._thread_state.connection = self._connection_class(self._host, timeout=60)
+        return self._thread_state.connection
+
+    def _request(self, method: str, headers: Union[dict, None] = None) -> http.client.HTTPResponse:
+        for attempt in range(3):  # Servers close idle keep-alive connections; reconnect and try again
+            connection = self._get_connection()
+            try:
+                connection.request(method=method, url=self._path, headers=headers or dict())
+                response = connection.getresponse()
+                if method == "HEAD":
+                    response.read()
+                break
+            except (http.client.HTTPException, ConnectionError):
+                connection.close()
+                self._thread_state.connection = None
+                if attempt == 2:
+                    raise
+
+        if response.status not in (200, 206):
+            response.read()
+            raise OSError(f"Request for '{self.url}' failed with HTTP status {response.status}!")
+        return response
+
+    def _fetch_block(self, block_index: int) -> bytes:
+        start = block_index * self.block_size
+        end = min(start + self.block_size, self.size) - 1
+        response = self._request(method="GET", headers={"Range": f"bytes={start}-{end}"})
+        data = response.read()
+        with self._lock:  # Blocks are fetched by the threads reading ahead as well as by the caller
+            self.number_of_requests += 1
+        if len(data) != end - start + 1:
+            raise OSError(f"Received {len(data)} bytes instead of {end - start + 1} from '{self.url}'!")
+        return data
+
+    def _schedule_block(self, block_index: int) -> Union[bytes, Future]:
+        """Must be called while holding the lock."""
+        if block_index in self._blocks:
+            self._blocks.move_to_end(block_index)
+            return self._blocks[block_index]
+
+        future = self._executor.submit(self._fetch_block, block_index)
+        self._blocks[block_index] = future
+
+        maximum_number_of_blocks = max(self.cache_size // self.block_size, self.read_ahead + 1)
+        while len(self._blocks) > maximum_number_of_blocks:
+            self._blocks.popitem(last=False)
+        return future
+
+    def _get_block(self, block_index: int) -> bytes:
+        with self._lock:
+            block = self._schedule_block(block_index=block_index)
+        if isinstance(block, Future):
+            try:
+                data = block.result()
+            except Exception:
+                with self._lock:
+                    if self._blocks.get(block_index) is block:
+                        del self._blocks[block_index]  # Allow a later read to try again
+                raise
+            with self._lock:
+                if block_index in self._blocks:
+                    self._blocks[block_index] = data
+            return data
+        return block
+
+    def _read_range(self, start: int, number_of_bytes: int) -> bytes:
+        if number_of_bytes <= 0 or start >= self.size:
+            return b""
+        end = min(start + number_of_bytes, self.size)
+        first_block_index = start // self.block_size
+        last_block_index = (end - 1) // self.block_size
+        number_of_blocks = math.ceil(self.size / self.block_size)
+
+        with self._lock:
+            # Request every block of the read at once, plus the next ones if the reads are moving forward
+            is_sequential = self._last_block_index is not None and first_block_index in (
+                self._last_block_index,
+                self._last_block_index + 1,
+            )
+            last_scheduled_block_index = last_block_index + (self.read_ahead if is_sequential else 0)
+            for block_index in range(first_block_index, min(last_scheduled_block_index, number_of_blocks - 1) + 1):
+                self._schedule_block(block_index=block_index)
+            self._last_block_index = last_block_index
+
+        data = b"".join(
+            self._get_block(block_index=block_index) for block_index in range(first_block_index, last_block_index + 1)
+        )
+        offset = start - first_block_index * self.block_size
+        return data[offset : offset + end - start]
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        if whence == io.SEEK_SET:
+            self._position = offset
+        elif whence == io.SEEK_CUR:
+            self._position += offset
+        elif whence == io.SEEK_END:
+            self._position = self.size + offset
+        else:
+            raise ValueError(f"Invalid 'whence' ({whence})!")
+        return self._position
+
+    def tell(self) -> int:
+        return self._position
+
+    def readinto(self, buffer) -> int:
+        data = self._read_range(start=self._position, number_of_bytes=len(buffer))
+        buffer[: len(data)] = data
+        self._position += len(data)
+        return len(data)
+
+    def read(self, size: int = -1) -> bytes:
+        if size is None or size < 0:
+            size = self.size - self._position
+        data = self._read_range(start=self._position, number_of_bytes=size)
+        self._position += len(data)
+        return data
+
+    def tune_to_dataset(self, dataset: h5py.Dataset, read_ahead_size: int = 64 * _MEBIBYTE) -> None:
+        """
+        Match the blocks to the layout of the dataset that will be read through this file.
+
+        Each block holds at least one whole stored chunk, so that no chunk takes two requests, and the read-ahead spans
+        about `read_ahead_size` bytes. Contiguous datasets keep the current block size.
+        """
+        if dataset.chunks is not None:
+            if dataset.id.get_num_chunks() > 0:
+                chunk_size = dataset.id.get_chunk_info(0).size
+            else:
+                chunk_size = math.prod(dataset.chunks) * dataset.dtype.itemsize
+            block_size = max(math.ceil(chunk_size / _MEBIBYTE), 1) * _MEBIBYTE
+        else:
+            block_size = self.block_size
+
+        with self._lock:
+            if block_size != self.block_size:
+                self._blocks.clear()
+                self._last_block_index = None
+            self.block_size = block_size
+            self.read_ahead = max(read_ahead_size // block_size, 1)
+
+    def close(self) -> None:
+        if not self.closed:
+            # Cancel the reads ahead that have not started yet; `shutdown(cancel_futures=True)` requires Python 3.9
+            with self._lock:
+                for block in self._blocks.values():
+                    if isinstance(block, Future):
+                        block.cancel()
+            self._executor.shutdown(wait=True)
+            with self._lock:
+                self._blocks.clear()
+        super().close()
+
+
+class RemoteHDF5File(h5py.File):
+    """An HDF5 file read through a `RemoteFile`, which is closed along with it, with caches set by a read profile."""
+
+    def __init__(self, url: str, read_profile: Optional[dict] = None, **remote_file_kwargs):
+        self.remote_file = RemoteFile(url=url, **remote_file_kwargs)
+        with h5py.File(self.remote_file, mode="r") as file:
+            file_space_page_size = get_file_space_page_size(file=file)
+        super().__init__(
+            self.remote_file,
+            mode="r",
+            **get_file_access_kwargs(read_profile=read_profile, file_space_page_size=file_space_page_size),
+        )
+
+    def close(self) -> None:
+        super().close()
+        self.remote_file.close()
+
+
+def is_remote_path(file_path: str) -> bool:
+    return str(file_path).startswith(("http://", "https://"))
+
+
+def open_source_file(file_path: str, read_profile: Optional[dict] = None, **remote_file_kwargs) -> h5py.File:
+    """
+    Open a local HDF5 file for reading, or stream it if the path is an HTTP(S) URL.
+
+    The default chunk cache of the file, and its page buffer if it was created with paged file space management, are
+    sized by the `read_profile`, with any settings it lacks taken from the `DEFAULT_READ_PROFILE`.
+    """
+    if is_remote_path(file_path=file_path):
+        return RemoteHDF5File(url=str(file_path), read_profile=read_profile, **remote_file_kwargs)
+
+    with h5py.File(name=file_path, mode="r") as file:
+        file_space_page_size = get_file_space_page_size(file=file)
+    return h5py.File(
+        name=file_path,
+        mode="r",
+        **get_file_access_kwargs(read_profile=read_profile, file_space_page_size=file_space_page_size),
+    )
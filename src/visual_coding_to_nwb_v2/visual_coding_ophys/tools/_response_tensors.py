@@ -0,0 +1,178 @@
+"""Extract the responses of every ROI around every stimulus presentation as a single (trial, roi, time) tensor."""
+
+from typing import Iterable, List, Optional, Tuple, Union
+
+import numpy
+from pynwb import NWBFile, TimeSeries
+from pynwb.epoch import TimeIntervals
+
+from ..interfaces.shared_methods import reconstruct_timestamps
+
+
+def get_series_timestamps(nwbfile: NWBFile, time_series: TimeSeries) -> numpy.ndarray:
+    """
+    The timestamps of a series, whether stored explicitly, linked from another series, or as a starting time and rate.
+
+    Regular timing is reconstructed along with its residuals from the 'timing' processing module, if any were stored.
+    """
+    if time_series.timestamps is not None:
+        timestamps = time_series.timestamps
+        return numpy.asarray(timestamps.timestamps if isinstance(timestamps, TimeSeries) else timestamps[:])
+
+    residuals = None
+    residual_conversion = 1.0
+    residual_series_name = f"{time_series.name}_timestamp_residuals"
+    if "timing" in nwbfile.processing and residual_series_name in nwbfile.processing["timing"].data_interfaces:
+        residual_series = nwbfile.processing["timing"][residual_series_name]
+        residuals = residual_series.data[:]
+        residual_conversion = residual_series.conversion
+
+    return reconstruct_timestamps(
+        starting_time=time_series.starting_time,
+        rate=time_series.rate,
+        number_of_samples=time_series.data.shape[0],
+        residuals=residuals,
+        residual_conversion=residual_conversion,
+    )
+
+
+def get_presentation_times(nwbfile: NWBFile, stimulus_name: str) -> numpy.ndarray:
+    """The onset of every presentation of a stimulus, from either its table of intervals or its `IndexSeries`."""
+    assert stimulus_name in nwbfile.stimulus, f"The stimulus '{stimulus_name}' is not in this NWB file!"
+
+    stimulus = nwbfile.stimulus[stimulus_name]
+    if isinstance(stimulus, TimeIntervals):
+        return numpy.asarray(stimulus["start_time"].data[:])
+    return get_series_timestamps(nwbfile=nwbfile, time_series=stimulus)
+
+
+def get_frame_windows(
+    timestamps: numpy.ndarray, event_times: numpy.ndarray, window: Tuple[float, float]
+) -> Tuple[numpy.ndarray, int]:
+    """
+    Map every event to the first frame of its window, all at once, along with the number of frames in each window.
+
+    Each window starts at the first frame at or after `event_time + window[0]`, and spans the duration of the window
+    at the median frame rate, so that every trial has the same number of frames. Starting frames may fall outside the
+    series for events near its ends; windows that start before the first timestamp start at a negative frame, counted
+    back from it in steps of the median frame period.
+    """
+    assert window[1] > window[0], "The 'window' must end after it starts."
+
+    timestamps = numpy.asarray(timestamps, dtype="float64")
+    frame_period = float(numpy.median(numpy.diff(timestamps)))
+    number_of_window_frames = max(int(round((window[1] - window[0]) / frame_period)), 1)
+
+    start_times = numpy.asarray(event_times, dtype="float64") + window[0]
+    start_frames = numpy.searchsorted(timestamps, start_times, side="left").astype("int64")
+    is_before_series = start_times < timestamps[0]
+    # Rounded before the floor so that starting times on the grid of frames are not moved back by floating point error
+    frame_offsets = numpy.round((start_times[is_before_series] - timestamps[0]) / frame_period, decimals=6)
+    start_frames[is_before_series] = numpy.floor(frame_offsets)
+    return start_frames, number_of_window_frames
+
+
+def _get_runs_to_read(frame_indices: numpy.ndarray, chunk_length: int, number_of_frames: int) -> List[Tuple[int, int]]:
+    """The spans of consecutive time chunks holding any of the frames, each as a (start, stop) frame range."""
+    chunk_indices = numpy.unique(frame_indices // chunk_length)
+    run_boundaries = numpy.flatnonzero(numpy.diff(chunk_indices) != 1) + 1
+    return [
+        (int(run[0]) * chunk_length, min((int(run[-1]) + 1) * chunk_length, number_of_frames))
+        for run in numpy.split(chunk_indices, run_boundaries)
+        if run.size > 0
+    ]
+
+
+def extract_response_tensor(
+    data,
+    timestamps: numpy.ndarray,
+    event_times: numpy.ndarray,
+    window: Tuple[float, float],
+    roi_indices: Optional[Iterable[int]] = None,
+) -> numpy.ndarray:
+    """
+    Gather the (time, roi) `data` around every event into a (trial, roi, time) tensor.
+
+    The `data` may be an array in memory or a lazily read HDF5 dataset; in the latter case only the time chunks that
+    hold any of the windows are read, in as few contiguous reads as possible. Frames of windows that fall outside the
+    series are NaN.
+    """
+    start_frames, number_of_window_frames = get_frame_windows(
+        timestamps=timestamps, event_times=event_times, window=window
+    )
+    number_of_frames, number_of_rois = data.shape
+    roi_indices = numpy.arange(number_of_rois) if roi_indices is None else numpy.asarray(list(roi_indices))
+
+    frame_indices = start_frames[:, numpy.newaxis] + numpy.arange(number_of_window_frames)
+    is_in_series = (frame_indices >= 0) & (frame_indices < number_of_frames)
+    frames_to_read = frame_indices[is_in_series]
+
+    tensor = numpy.full(
+        shape=(len(start_frames), number_of_window_frames, len(roi_indices)),
+        fill_value=numpy.nan,
+        dtype=numpy.result_type(data.dtype, "float32"),
+    )
+    if frames_to_read.size == 0:
+        return tensor.transpose(0, 2, 1)
+
+    if isinstance(data, numpy.ndarray):
+        tensor[is_in_series] = data[frames_to_read][:, roi_indices]
+        return tensor.transpose(0, 2, 1)
+
+    # Read each run of chunks into a buffer, then map every frame to its position in that buffer
+    chunk_length = data.chunks[0] if getattr(data, "chunks", None) is not None else number_of_frames
+    runs = _get_runs_to_read(frame_indices=frames_to_read, chunk_length=chunk_length, number_of_frames=number_of_frames)
+    buffer = numpy.concatenate([data[start:stop][:, roi_indices] for start, stop in runs])
+
+    run_starts = numpy.array([start for start, _ in runs])
+    run_offsets = numpy.cumsum([0] + [stop - start for start, stop in runs[:-1]])
+    run_of_frame = numpy.searchsorted(run_starts, frames_to_read, side="right") - 1
+    tensor[is_in_series] = buffer[frames_to_read - run_starts[run_of_frame] + run_offsets[run_of_frame]]
+    return tensor.transpose(0, 2, 1)
+
+
+def _get_roi_response_series(nwbfile: NWBFile, series_name: str) -> TimeSeries:
+    ophys_module = nwbfile.processing["ophys"]
+    for container_name in ("DfOverF", "Fluorescence"):
+        if (
+            container_name in ophys_module.data_interfaces
+            and series_name in ophys_module[container_name].roi_response_series
+        ):
+            return ophys_module[container_name][series_name]
+    raise ValueError(f"The series '{series_name}' is not in the 'DfOverF' or 'Fluorescence' of this NWB file!")
+
+
+def extract_stimulus_responses(
+    nwbfile: NWBFile,
+    stimulus_name: str,
+    window: Tuple[float, float] = (-0.5, 2.5),
+    series_name: str = "DfOverF",
+    roi_indices: Union[Iterable[int], None] = None,
+) -> dict:
+    """
+    Align the responses of a converted file to every presentation of one of its stimuli.
+
+    The `stimulus_name` is that of a table of intervals ('drifting_gratings', 'static_gratings') or of an `IndexSeries`
+    ('natural_scenes_stimulus', ...), and the `window` is in seconds relative to each onset. The `series_name` is any
+    of the response series of the 'DfOverF' or 'Fluorescence', and `roi_indices` are rows of the `PlaneSegmentation`.
+
+    Returns the (trial, roi, time) 'responses', the 'presentation_times', and the 'window_times' of each frame of a
+    window relative to its onset, at the median frame period.
+    """
+    roi_response_series = _get_roi_response_series(nwbfile=nwbfile, series_name=series_name)
+    timestamps = get_series_timestamps(nwbfile=nwbfile, time_series=roi_response_series)
+    presentation_times = get_presentation_times(nwbfile=nwbfile, stimulus_name=stimulus_name)
+
+    responses = extract_response_tensor(
+        data=roi_response_series.data,
+        timestamps=timestamps,
+        event_times=presentation_times,
+        window=window,
+        roi_indices=roi_indices,
+    )
+    frame_period = float(numpy.median(numpy.diff(timestamps)))
+    return dict(
+        responses=responses,
+        presentation_times=presentation_times,
+        window_times=window[0] + numpy.arange(responses.shape[2]) * frame_period,
+    )
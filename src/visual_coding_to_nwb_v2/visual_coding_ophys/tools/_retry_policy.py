@@ -0,0 +1,194 @@
+"""Classify the errors of each stage of a conversion, retrying the transient ones and quarantining the permanent ones."""
+
+import errno
+import json
+import pathlib
+import random
+import time
+import traceback
+from typing import Callable, Literal, TypeVar, Union
+
+Stage = Literal["transfer", "read", "write", "upload"]
+ReturnType = TypeVar("ReturnType")
+
+DEFAULT_RETRY_POLICY = dict(
+    transfer=dict(maximum_attempts=6, initial_delay=5.0, maximum_delay=300.0),
+    read=dict(maximum_attempts=3, initial_delay=5.0, maximum_delay=60.0),
+    write=dict(maximum_attempts=2, initial_delay=30.0, maximum_delay=300.0),
+    upload=dict(maximum_attempts=6, initial_delay=10.0, maximum_delay=600.0),
+)
+
+# Names of exception types from optional dependencies (botocore, urllib3, requests), so none need to be imported
+_NETWORK_ERROR_NAMES = {
+    "EndpointConnectionError",
+    "ConnectTimeoutError",
+    "ReadTimeoutError",
+    "IncompleteReadError",
+    "ResponseStreamingError",
+    "ProtocolError",
+    "ChunkedEncodingError",
+    "ConnectionError",
+    "Timeout",
+}
+_TRANSIENT_STATUS_CODES = {408, 412, 429, 500, 502, 503, 504}  # 412: the object changed, so the download restarts
+_PERMANENT_STATUS_REASONS = {400: "bad_request", 401: "access_denied", 403: "access_denied", 404: "source_not_found"}
+
+
+class PermanentStageError(Exception):
+    """An error that will recur on every attempt, so that the session should be set aside instead of retried."""
+
+    def __init__(self, stage: Stage, reason: str, original_exception: BaseException):
+        super().__init__(f"Permanent '{reason}' failure during the '{stage}' stage: {original_exception}")
+        self.stage = stage
+        self.reason = reason
+        self.original_exception = original_exception
+
+
+def _get_type_names(exception: BaseException) -> set:
+    return {exception_type.__name__ for exception_type in type(exception).__mro__}
+
+
+def _get_status_code(exception: BaseException) -> Union[int, None]:
+    """The HTTP status of errors raised by botocore (a `response` dictionary) or requests (a `response` object)."""
+    response = getattr(exception, "response", None)
+    if isinstance(response, dict):
+        return response.get("ResponseMetadata", dict()).get("HTTPStatusCode")
+    return getattr(response, "status_code", None)
+
+
+def classify_exception(exception: BaseException, stage: Stage) -> dict:
+    """
+    Decide whether an error raised during a stage is worth retrying.
+
+    Returns a dictionary with 'is_transient' and a short 'reason'. Errors in the data itself, such as a missing demixed
+    signal or a failure to separate the stimulus epochs, are permanent. Network errors, server-side HTTP errors, full
+    disks, and I/O errors on the files are transient. Anything else is treated as transient while transferring, where
+    unexpected errors are nearly always from the connection, but as permanent while reading or writing, where they are
+    nearly always from the code or the data.
+    """
+    type_names = _get_type_names(exception=exception)
+
+    if isinstance(exception, PermanentStageError):
+        return dict(is_transient=False, reason=exception.reason)
+    if "EpochSeparationException" in type_names:  # Raised by the AllenSDK when computing the epoch table
+        return dict(is_transient=False, reason="epoch_separation_failure")
+    if isinstance(exception, KeyError):
+        reason = "missing_demixed_signal" if "demixed" in str(exception) else "missing_source_data"
+        return dict(is_transient=False, reason=reason)
+
+    status_code = _get_status_code(exception=exception)
+    if status_code in _PERMANENT_STATUS_REASONS:
+        return dict(is_transient=False, reason=_PERMANENT_STATUS_REASONS[status_code])
+    if status_code in _TRANSIENT_STATUS_CODES:
+        return dict(is_transient=True, reason=f"http_{status_code}")
+
+    if isinstance(exception, (ConnectionError, TimeoutError)) or type_names & _NETWORK_ERROR_NAMES:
+        return dict(is_transient=True, reason="network")
+    if isinstance(exception, OSError):
+        if exception.errno == errno.ENOSPC:
+            return dict(is_transient=True, reason="disk_full")
+        return dict(is_transient=True, reason="hdf5_write" if stage == "write" else f"{stage}_io")
+    if isinstance(exception, MemoryError):
+        return dict(is_transient=True, reason="out_of_memory")
+    if isinstance(exception, (ValueError, TypeError, IndexError, AssertionError)):
+        return dict(is_transient=False, reason="invalid_data")
+
+    if stage in ("transfer", "upload"):
+        return dict(is_transient=True, reason="unclassified")
+    return dict(is_transient=False, reason="unclassified")
+
+
+def get_retry_delay(attempt: int, initial_delay: float, maximum_delay: float) -> float:
+    """Exponential backoff with jitter; half of the delay is fixed and the other half random, to spread out workers."""
+    delay = min(maximum_delay, initial_delay * 2 ** (attempt - 1))
+    return delay / 2 + random.uniform(0, delay / 2)
+
+
+def run_stage(
+    stage: Stage,
+    function: Callable[[], ReturnType],
+    retry_policy: Union[dict, None] = None,
+    name: str = "",
+    retry_log_file_path: Union[str, pathlib.Path, None] = None,
+) -> ReturnType:
+    """
+    Call the function, retrying only it when it fails with a transient error, up to the attempts allowed by the policy.
+
+    Permanent errors are raised immediately as a `PermanentStageError`. When the attempts are exhausted, the last error
+    is raised as it is. Each failed attempt is appended as a line of JSON to the retry log, if one is specified.
+    """
+    stage_policy = dict(DEFAULT_RETRY_POLICY[stage])
+    stage_policy.update((retry_policy or dict()).get(stage, dict()))
+
+    attempt = 1
+    while True:
+        try:
+            return function()
+        except Exception as exception:
+            classification = classify_exception(exception=exception, stage=stage)
+            will_retry = classification["is_transient"] and attempt < stage_policy["maximum_attempts"]
+            delay = (
+                get_retry_delay(
+                    attempt=attempt,
+                    initial_delay=stage_policy["initial_delay"],
+                    maximum_delay=stage_policy["maximum_delay"],
+                )
+                if will_retry
+                else None
+            )
+
+            if retry_log_file_path is not None:
+                retry_record = dict(
+                    name=name,
+                    stage=stage,
+                    attempt=attempt,
+                    error=f"{type(exception).__name__}: {exception}",
+                    delay=delay,
+                    **classification,
+                )
+                with open(file=retry_log_file_path, mode="a") as io:
+                    io.write(json.dumps(retry_record) + "\n")
+
+            if not classification["is_transient"]:
+                raise PermanentStageError(
+                    stage=stage, reason=classification["reason"], original_exception=exception
+                ) from exception
+            if not will_retry:
+                raise
+
+            time.sleep(delay)
+            attempt += 1
+
+
+def quarantine_session(
+    quarantine_folder_path: Union[str, pathlib.Path], session_id: str, error: PermanentStageError
+) -> pathlib.Path:
+    """Record why the session cannot be converted, so that no further attempts are made until the record is removed."""
+    quarantine_folder_path = pathlib.Path(quarantine_folder_path)
+    quarantine_folder_path.mkdir(parents=True, exist_ok=True)
+
+    quarantine_file_path = quarantine_folder_path / f"{session_id}.json"
+    original_exception = error.original_exception
+    with open(file=quarantine_file_path, mode="w") as io:
+        json.dump(
+            obj=dict(
+                session_id=session_id,
+                stage=error.stage,
+                reason=error.reason,
+                error_type=type(original_exception).__name__,
+                message=str(original_exception),
+                quarantined_at=time.time(),
+                traceback="".join(
+                    traceback.format_exception(
+                        type(original_exception), original_exception, original_exception.__traceback__
+                    )
+                ),
+            ),
+            fp=io,
+            indent=4,
+        )
+    return quarantine_file_path
+
+
+def is_quarantined(quarantine_folder_path: Union[str, pathlib.Path], session_id: str) -> bool:
+    return (pathlib.Path(quarantine_folder_path) / f"{session_id}.json").exists()
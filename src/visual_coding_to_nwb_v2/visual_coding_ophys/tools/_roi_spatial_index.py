@@ -0,0 +1,98 @@
+"""Summarize the footprint of each ROI, so that ROIs can be located without loading their pixel masks."""
+
+from typing import List, Optional, Tuple
+
+import numpy
+from pynwb.ophys import PlaneSegmentation
+
+# The columns added to the PlaneSegmentation, with their descriptions
+ROI_SPATIAL_INDEX_COLUMNS = dict(
+    centroid="The (x, y) center of the pixel mask of each ROI, weighted by the pixel weights.",
+    bounding_box="The (x_min, y_min, x_max, y_max) of the pixels of each ROI, inclusive.",
+    pixel_count="The number of pixels in the mask of each ROI.",
+    weighted_area="The sum of the pixel weights of each ROI.",
+)
+
+
+def compute_roi_spatial_index(pixel_masks: List[numpy.ndarray]) -> dict:
+    """
+    Compute the centroid, bounding box, pixel count, and weighted area of every ROI at once.
+
+    Each pixel mask is an array of (x, y, weight) rows, in the layout of the `pixel_mask` of a `PlaneSegmentation`.
+    ROIs without any pixels have a centroid of NaN and a bounding box of -1.
+    """
+    pixel_counts = numpy.array([len(pixel_mask) for pixel_mask in pixel_masks], dtype="uint32")
+    all_pixels = (
+        numpy.concatenate([numpy.asarray(pixel_mask, dtype="float64").reshape(-1, 3) for pixel_mask in pixel_masks])
+        if pixel_masks
+        else numpy.empty(shape=(0, 3))
+    )
+    x, y, weights = all_pixels.T
+    roi_indices = numpy.repeat(numpy.arange(len(pixel_masks)), pixel_counts)
+
+    number_of_rois = len(pixel_masks)
+    weighted_areas = numpy.bincount(roi_indices, weights=weights, minlength=number_of_rois)
+    with numpy.errstate(invalid="ignore", divide="ignore"):
+        centroids = numpy.stack(
+            [
+                numpy.bincount(roi_indices, weights=x * weights, minlength=number_of_rois) / weighted_areas,
+                numpy.bincount(roi_indices, weights=y * weights, minlength=number_of_rois) / weighted_areas,
+            ],
+            axis=1,
+        )
+
+    # The pixels of each ROI are contiguous, so each bound is a reduction over the run of that ROI
+    is_empty = pixel_counts == 0
+    run_starts = numpy.concatenate([[0], numpy.cumsum(pixel_counts)[:-1]]).astype("int64")[~is_empty]
+    bounding_boxes = numpy.full(shape=(number_of_rois, 4), fill_value=-1, dtype="int64")
+    if run_starts.size > 0:
+        bounding_boxes[~is_empty] = numpy.stack(
+            [
+                numpy.minimum.reduceat(x, run_starts),
+                numpy.minimum.reduceat(y, run_starts),
+                numpy.maximum.reduceat(x, run_starts),
+                numpy.maximum.reduceat(y, run_starts),
+            ],
+            axis=1,
+        )
+    centroids[is_empty] = numpy.nan
+
+    return dict(
+        centroid=centroids,
+        bounding_box=bounding_boxes,
+        pixel_count=pixel_counts,
+        weighted_area=weighted_areas,
+    )
+
+
+def find_rois(
+    plane_segmentation: PlaneSegmentation,
+    window: Optional[Tuple[float, float, float, float]] = None,
+    center: Optional[Tuple[float, float]] = None,
+    radius: Optional[float] = None,
+) -> numpy.ndarray:
+    """
+    Find the rows of the ROIs within a window or within a radius, from the spatial index of the `PlaneSegmentation`.
+
+    A `window` of (x_min, y_min, x_max, y_max) selects the ROIs whose bounding box overlaps it. A `center` of (x, y)
+    and a `radius` select the ROIs whose centroid lies within that distance. Only the index columns are read.
+    """
+    assert (window is None) != (
+        center is None
+    ), "Specify either a 'window', or a 'center' and 'radius', to search for ROIs."
+
+    if window is not None:
+        x_min, y_min, x_max, y_max = window
+        bounding_boxes = plane_segmentation["bounding_box"].data[:]
+        is_overlapping = (
+            (bounding_boxes[:, 0] <= x_max)
+            & (bounding_boxes[:, 2] >= x_min)
+            & (bounding_boxes[:, 1] <= y_max)
+            & (bounding_boxes[:, 3] >= y_min)
+        )
+        return numpy.flatnonzero(is_overlapping)
+
+    assert radius is not None, "A 'radius' must be specified along with the 'center'."
+    centroids = plane_segmentation["centroid"].data[:]
+    squared_distances = numpy.sum((centroids - numpy.asarray(center, dtype="float64")) ** 2, axis=1)
+    return numpy.flatnonzero(squared_distances <= radius**2)
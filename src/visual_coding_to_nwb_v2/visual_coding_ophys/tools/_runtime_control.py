@@ -0,0 +1,136 @@
+"""Adjust running batches through a watched control file, without stopping and restarting them."""
+
+import json
+import os
+import pathlib
+import sys
+import time
+import uuid
+import warnings
+from typing import Union
+
+DEFAULT_RUNTIME_CONTROL = dict(
+    number_of_workers=None,  # None keeps the number the batch was started with
+    download_bandwidth=None,  # In bytes per second, shared by all workers; None is unlimited
+    upload_bandwidth=None,  # In bytes per second, shared by all workers; None is unlimited
+    io_priority="normal",
+    paused=False,
+    drain=False,  # Finish the sessions in progress, but do not start any new ones
+)
+
+
+def update_runtime_control(control_file_path: Union[str, pathlib.Path], **changes) -> dict:
+    """
+    Change some settings in the control file, keeping the others.
+
+    The file is replaced atomically, so running batches never read a partially written file.
+    """
+    unknown_settings = set(changes) - set(DEFAULT_RUNTIME_CONTROL)
+    assert not unknown_settings, f"Unknown runtime settings {sorted(unknown_settings)}!"
+
+    control_file_path = pathlib.Path(control_file_path)
+    settings = RuntimeControl(control_file_path=control_file_path).read()
+    settings.update(changes)
+
+    temporary_file_path = control_file_path.parent / f".{control_file_path.name}.{uuid.uuid4().hex}"
+    with open(file=temporary_file_path, mode="w") as io:
+        json.dump(obj=settings, fp=io, indent=4)
+    os.replace(src=temporary_file_path, dst=control_file_path)
+
+    return settings
+
+
+class RuntimeControl:
+    """
+    Read the settings of a running batch from a JSON control file.
+
+    The file is only parsed again when it changes. Settings missing from the file take their default values, and an
+    unreadable file keeps the last settings that could be read.
+    """
+
+    def __init__(self, control_file_path: Union[str, pathlib.Path, None] = None, poll_interval: float = 5.0):
+        self.control_file_path = pathlib.Path(control_file_path) if control_file_path is not None else None
+        self.poll_interval = poll_interval
+
+        self._settings = dict(DEFAULT_RUNTIME_CONTROL)
+        self._last_file_signature = None
+        self._applied_io_priority = None
+
+    def read(self) -> dict:
+        if self.control_file_path is None or not self.control_file_path.exists():
+            return dict(self._settings)
+
+        # Updates replace the file, so its inode changes even when the modification time resolution is too coarse
+        file_stat = self.control_file_path.stat()
+        file_signature = (file_stat.st_mtime_ns, file_stat.st_ino, file_stat.st_size)
+        if file_signature == self._last_file_signature:
+            return dict(self._settings)
+
+        try:
+            with open(file=self.control_file_path, mode="r") as io:
+                settings_from_file = json.load(fp=io)
+        except (OSError, json.JSONDecodeError) as exception:
+            warnings.warn(f"Unable to read control file '{self.control_file_path}' ({exception}); keeping settings.")
+            return dict(self._settings)
+
+        self._settings = dict(DEFAULT_RUNTIME_CONTROL)
+        self._settings.update(
+            {key: value for key, value in settings_from_file.items() if key in DEFAULT_RUNTIME_CONTROL}
+        )
+        self._last_file_signature = file_signature
+        return dict(self._settings)
+
+    @property
+    def draining(self) -> bool:
+        return bool(self.read()["drain"])
+
+    def wait_while_paused(self) -> None:
+        while self.read()["paused"]:
+            time.sleep(self.poll_interval)
+
+    def apply_io_priority(self) -> None:
+        """Set the I/O priority of the current process, if it changed since it was last applied."""
+        io_priority = self.read()["io_priority"]
+        if io_priority == self._applied_io_priority:
+            return
+
+        try:
+            import psutil
+        except ImportError:
+            warnings.warn("Setting the I/O priority requires `psutil` to be installed; ignoring 'io_priority'.")
+            self._applied_io_priority = io_priority
+            return
+
+        if sys.platform.startswith("linux"):
+            io_priority_arguments = dict(
+                low=(psutil.IOPRIO_CLASS_IDLE,),
+                normal=(psutil.IOPRIO_CLASS_BE, 4),
+                high=(psutil.IOPRIO_CLASS_BE, 0),
+            )
+        elif sys.platform == "win32":
+            io_priority_arguments = dict(
+                low=(psutil.IOPRIO_VERYLOW,), normal=(psutil.IOPRIO_NORMAL,), high=(psutil.IOPRIO_HIGH,)
+            )
+        else:
+            warnings.warn(f"Setting the I/O priority is not supported on '{sys.platform}'; ignoring 'io_priority'.")
+            self._applied_io_priority = io_priority
+            return
+
+        assert io_priority in io_priority_arguments, f"Unknown 'io_priority' {io_priority}!"
+        psutil.Process().ionice(*io_priority_arguments[io_priority])
+        self._applied_io_priority = io_priority
+
+
+def _parse_setting(value: str):
+    try:
+        return json.loads(value)
+    except json.JSONDecodeError:  # Plain strings such as 'low' do not need to be quoted
+        return value
+
+
+if __name__ == "__main__":
+    # Example: python _runtime_control.py F:/visual_coding/control.json number_of_workers=2 io_priority=low
+    control_file_path = pathlib.Path(sys.argv[1])
+    changes = {key: _parse_setting(value) for key, value in (argument.split("=", 1) for argument in sys.argv[2:])}
+
+    print(json.dumps(update_runtime_control(control_file_path=control_file_path, **changes), indent=4))
@@ -0,0 +1,288 @@
+"""Distribute sessions across any number of hosts through lease files on shared storage."""
+
+import json
+import os
+import pathlib
+import socket
+import threading
+import time
+import traceback
+import uuid
+from contextlib import contextmanager
+from typing import Callable, Iterable, Iterator, List, Union
+
+import natsort
+
+from ._retry_policy import classify_exception
+from ._runtime_control import RuntimeControl
+
+
+class SessionLeaseQueue:
+    """
+    A queue of sessions shared by every host that can reach the same folder.
+
+    A host claims a session by atomically creating `leases/{session_id}.json`; creation fails if another host holds it.
+    While a session is being converted, a background thread refreshes the modification time of the lease (the
+    heartbeat). Any lease whose heartbeat is older than the `lease_timeout` is considered abandoned by a crashed host and
+    is reclaimed by the next host that encounters it. Finished sessions are marked by `completed/{session_id}.json`.
+
+    All timing is based on the modification times reported by the shared storage, so the timeout should be generous
+    compared to both the heartbeat interval and any clock skew between hosts.
+    """
+
+    def __init__(
+        self,
+        queue_folder_path: Union[str, pathlib.Path],
+        lease_timeout: float = 15 * 60,
+        heartbeat_interval: float = 60,
+    ):
+        assert heartbeat_interval < lease_timeout, "The 'heartbeat_interval' must be shorter than the 'lease_timeout'."
+
+        self.queue_folder_path = pathlib.Path(queue_folder_path)
+        self.session_ids_file_path = self.queue_folder_path / "session_ids.json"
+        self.leases_folder_path = self.queue_folder_path / "leases"
+        self.completed_folder_path = self.queue_folder_path / "completed"
+        self.failed_folder_path = self.queue_folder_path / "failed"
+        for folder_path in (self.leases_folder_path, self.completed_folder_path, self.failed_folder_path):
+            folder_path.mkdir(parents=True, exist_ok=True)
+
+        self.lease_timeout = lease_timeout
+        self.heartbeat_interval = heartbeat_interval
+        self.host_name = socket.gethostname()
+
+        self._lease_tokens = dict()  # Session ID -> token identifying the leases held by this object
+
+    def add_sessions(self, session_ids: Iterable[str]) -> None:
+        """Write the list of sessions to the queue, unless another host already has."""
+        if self.session_ids_file_path.exists():
+            return
+
+        temporary_file_path = self.queue_folder_path / f".session_ids_{uuid.uuid4().hex}.json"
+        with open(file=temporary_file_path, mode="w") as io:
+            json.dump(obj=natsort.natsorted(session_ids), fp=io, indent=4)
+        try:
+            os.link(src=temporary_file_path, dst=self.session_ids_file_path)  # Fails if another host got there first
+        except FileExistsError:
+            pass
+        finally:
+            temporary_file_path.unlink()
+
+    def get_session_ids(self) -> List[str]:
+        with open(file=self.session_ids_file_path, mode="r") as io:
+            return json.load(fp=io)
+
+    def is_completed(self, session_id: str) -> bool:
+        return (self.completed_folder_path / f"{session_id}.json").exists()
+
+    def is_failed(self, session_id: str) -> bool:
+        return (self.failed_folder_path / f"{session_id}.json").exists()
+
+    def _get_lease_file_path(self, session_id: str) -> pathlib.Path:
+        return self.leases_folder_path / f"{session_id}.json"
+
+    def _create_lease(self, session_id: str) -> bool:
+        token = uuid.uuid4().hex
+        try:
+            file_descriptor = os.open(
+                path=self._get_lease_file_path(session_id=session_id), flags=os.O_CREAT | os.O_EXCL | os.O_WRONLY
+            )
+        except FileExistsError:
+            return False
+
+        lease = dict(token=token, host_name=self.host_name, process_id=os.getpid(), acquired_at=time.time())
+        with os.fdopen(file_descriptor, mode="w") as io:
+            json.dump(obj=lease, fp=io)
+
+        self._lease_tokens[session_id] = token
+        return True
+
+    def _is_expired(self, file_path: pathlib.Path) -> bool:
+        try:
+            return time.time() - file_path.stat().st_mtime > self.lease_timeout
+        except FileNotFoundError:
+            return False
+
+    def _reclaim_expired_lease(self, session_id: str) -> None:
+        """Move an expired lease out of the way so that it can be acquired again."""
+        lease_file_path = self._get_lease_file_path(session_id=session_id)
+        if not self._is_expired(file_path=lease_file_path):
+            return
+
+        tombstone_file_path = self.leases_folder_path / f".expired_{session_id}_{uuid.uuid4().hex}.json"
+        try:
+            os.rename(src=lease_file_path, dst=tombstone_file_path)  # Only one host can move any given lease
+        except FileNotFoundError:
+            return
+
+        # Another host may have reclaimed and re-acquired the lease between the check and the rename above
+        if not self._is_expired(file_path=tombstone_file_path):
+            try:
+                os.link(src=tombstone_file_path, dst=lease_file_path)
+            except FileExistsError:
+                pass
+        tombstone_file_path.unlink()
+
+    def acquire(self, skip_session_ids: Iterable[str] = ()) -> Union[str, None]:
+        """
+        Lease the first session that is neither completed, failed, nor actively leased; None if there are none.
+
+        Sessions among the `skip_session_ids` are passed over, even if they are free.
+        """
+        skip_session_ids = set(skip_session_ids)
+        for session_id in self.get_session_ids():
+            if session_id in skip_session_ids:
+                continue
+            if self.is_completed(session_id=session_id) or self.is_failed(session_id=session_id):
+                continue
+
+            self._reclaim_expired_lease(session_id=session_id)
+            if self._create_lease(session_id=session_id):
+                # The session may have finished between the check above and acquiring the lease
+                if self.is_completed(session_id=session_id):
+                    self.release(session_id=session_id)
+                    continue
+                return session_id
+
+        return None
+
+    def holds_lease(self, session_id: str) -> bool:
+        """Check that the lease on the session has not expired and been reclaimed by another host."""
+        try:
+            with open(file=self._get_lease_file_path(session_id=session_id), mode="r") as io:
+                lease = json.load(fp=io)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return False
+        return lease["token"] == self._lease_tokens.get(session_id)
+
+    def heartbeat(self, session_id: str) -> bool:
+        """Refresh the lease on the session; returns False if it is no longer held."""
+        if not self.holds_lease(session_id=session_id):
+            return False
+        os.utime(path=self._get_lease_file_path(session_id=session_id))
+        return True
+
+    def release(self, session_id: str) -> None:
+        """Give up the lease so that the session can be picked up again."""
+        if self.holds_lease(session_id=session_id):
+            self._get_lease_file_path(session_id=session_id).unlink()
+        self._lease_tokens.pop(session_id, None)
+
+    def complete(self, session_id: str) -> None:
+        completed_file_path = self.completed_folder_path / f"{session_id}.json"
+        with open(file=completed_file_path, mode="w") as io:
+            json.dump(obj=dict(host_name=self.host_name, completed_at=time.time()), fp=io)
+        self.release(session_id=session_id)
+
+    def fail(self, session_id: str, exception: Exception) -> None:
+        """Record the failure so that no host retries the session until the record is removed."""
+        failed_file_path = self.failed_folder_path / f"{session_id}.json"
+        with open(file=failed_file_path, mode="w") as io:
+            json.dump(
+                obj=dict(
+                    host_name=self.host_name,
+                    failed_at=time.time(),
+                    error=f"{type(exception)}: {str(exception)}",
+                    traceback=traceback.format_exc(),
+                ),
+                fp=io,
+                indent=4,
+            )
+        self.release(session_id=session_id)
+
+    @contextmanager
+    def keep_alive(self, session_id: str) -> Iterator[threading.Event]:
+        """
+        Send heartbeats for the lease on the session from a background thread for the duration of the context.
+
+        Yields an event that is set once a heartbeat finds that the lease is no longer held, after which no more
+        heartbeats are sent; the session then belongs to whichever host reclaimed it.
+        """
+        stop_event = threading.Event()
+        lease_lost = threading.Event()
+
+        def _send_heartbeats():
+            while not stop_event.wait(timeout=self.heartbeat_interval):
+                if not self.heartbeat(session_id=session_id):
+                    lease_lost.set()
+                    return
+
+        heartbeat_thread = threading.Thread(target=_send_heartbeats, daemon=True)
+        heartbeat_thread.start()
+        try:
+            yield lease_lost
+        finally:
+            stop_event.set()
+            heartbeat_thread.join()
+
+
+def _holds_lease_to_the_end(
+    session_queue: SessionLeaseQueue, session_id: str, lease_lost: Union[threading.Event, None]
+) -> bool:
+    """Whether the lease on the session was held throughout its conversion, and so still is now."""
+    if lease_lost is None or lease_lost.is_set():
+        return False
+    return session_queue.holds_lease(session_id=session_id)
+
+
+def run_leased_sessions(
+    session_queue: SessionLeaseQueue,
+    session_function: Callable,
+    control_file_path: Union[str, pathlib.Path, None] = None,
+    **session_kwargs,
+) -> List[str]:
+    """
+    Lease and convert sessions from the shared queue until none are left.
+
+    Run this on any number of hosts at once; each session is converted by only one of them. The `session_function` is
+    called as `session_function(session_id=session_id, **session_kwargs)`. An exception it raises is recorded as a
+    failure of that session if it is permanent (see `classify_exception`); after a transient one, such as a network or
+    disk error, the lease is only released, so that another host (or a later run of this one) tries the session again.
+
+    If the lease is lost while the session is converted, because its heartbeats lapsed for longer than the lease
+    timeout and another host reclaimed it, the conversion still runs to its end, but neither its completion nor its
+    failure is recorded; the session is left to the host that now holds it.
+
+    If a `control_file_path` is specified, 'drain' stops this host from leasing new sessions, and 'paused' and
+    'io_priority' are applied between sessions. It is also passed on to the `session_function` as `control_file_path`,
+    so that the settings are applied within each session too.
+
+    Returns the session IDs that were completed by this host.
+    """
+    runtime_control = RuntimeControl(control_file_path=control_file_path)
+    if control_file_path is not None:
+        session_kwargs.update(control_file_path=control_file_path)
+
+    completed_session_ids = list()
+    released_session_ids = set()  # Sessions that failed transiently on this host, left for the others
+    while True:
+        runtime_control.wait_while_paused()
+        runtime_control.apply_io_priority()
+        if runtime_control.draining:
+            break
+
+        session_id = session_queue.acquire(skip_session_ids=released_session_ids)
+        if session_id is None:
+            break
+
+        lease_lost = None
+        try:
+            with session_queue.keep_alive(session_id=session_id) as lease_lost:
+                session_function(session_id=session_id, **session_kwargs)
+        except Exception as exception:
+            if not _holds_lease_to_the_end(session_queue=session_queue, session_id=session_id, lease_lost=lease_lost):
+                session_queue.release(session_id=session_id)
+            elif classify_exception(exception=exception, stage="write")["is_transient"]:
+                session_queue.release(session_id=session_id)
+                released_session_ids.add(session_id)
+            else:
+                session_queue.fail(session_id=session_id, exception=exception)
+            continue
+
+        if not _holds_lease_to_the_end(session_queue=session_queue, session_id=session_id, lease_lost=lease_lost):
+            session_queue.release(session_id=session_id)
+            continue
+
+        session_queue.complete(session_id=session_id)
+        completed_session_ids.append(session_id)
+
+    return completed_session_ids
@@ -0,0 +1,266 @@
+"""A cache of downloaded source files shared by every worker on a host, bounded in size on disk."""
+
+import json
+import os
+import pathlib
+import socket
+import sys
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Callable, Iterable, Iterator, List, Tuple, Union
+
+from ._file_locks import exclusive_file_lock, try_exclusive_file_lock
+
+# The suffix of the files of a partial download, such as '{entry}.partial' and its progress '{entry}.partial.json'
+_PARTIAL_SUFFIX = ".partial"
+
+
+def _is_process_alive(process_id: int) -> bool:
+    """
+    Check whether a process of this host exists, without signaling it.
+
+    `os.kill(process_id, 0)` cannot be used, since on Windows any signal but CTRL_C_EVENT and CTRL_BREAK_EVENT
+    terminates the process.
+    """
+    if process_id == os.getpid():
+        return True
+
+    try:
+        import psutil
+    except ImportError:
+        psutil = None
+    if psutil is not None:
+        return psutil.pid_exists(process_id)
+
+    if sys.platform == "win32":
+        import ctypes
+
+        process_query_limited_information = 0x1000
+        still_active = 259
+        error_access_denied = 5
+
+        kernel32 = ctypes.windll.kernel32
+        process_handle = kernel32.OpenProcess(process_query_limited_information, False, process_id)
+        if not process_handle:
+            return kernel32.GetLastError() == error_access_denied  # The process exists, but belongs to another user
+        try:
+            exit_code = ctypes.c_ulong()
+            if not kernel32.GetExitCodeProcess(process_handle, ctypes.byref(exit_code)):
+                return True
+            return exit_code.value == still_active
+        finally:
+            kernel32.CloseHandle(process_handle)
+
+    try:
+        os.kill(process_id, 0)  # Signal 0 only checks that the process exists on POSIX
+    except ProcessLookupError:
+        return False
+    except PermissionError:  # The process exists, but belongs to another user
+        return True
+    return True
+
+
+class SourceCache:
+    """
+    Keep downloaded source files across sessions, retries, and reruns, evicting the least recently used beyond a budget.
+
+    Files are stored under `files/` by their key in the bucket. Sessions pin the files they use for as long as they
+    need them; pinned files, and the partial downloads under `partial/` that are in progress, are never evicted, so the
+    cache can exceed its budget while the files of the sessions in progress do not fit within it. Partial downloads
+    left behind by interrupted workers are kept to be resumed, but are evicted like any other file that is not pinned.
+
+    A pin is a file under `pins/{entry}/` naming the host and process that holds it; pins left behind by processes that
+    no longer exist on this host are ignored. Every change to the set of cached files happens under a lock on the cache,
+    and each file is only downloaded by one worker at a time, under a lock on its entry.
+    """
+
+    def __init__(self, cache_folder_path: Union[str, pathlib.Path], maximum_size: int):
+        self.cache_folder_path = pathlib.Path(cache_folder_path)
+        self.maximum_size = maximum_size
+
+        self.files_folder_path = self.cache_folder_path / "files"
+        self.partial_folder_path = self.cache_folder_path / "partial"
+        self.pins_folder_path = self.cache_folder_path / "pins"
+        self.locks_folder_path = self.cache_folder_path / "locks"
+        for folder_path in (
+            self.files_folder_path,
+            self.partial_folder_path,
+            self.pins_folder_path,
+            self.locks_folder_path,
+        ):
+            folder_path.mkdir(parents=True, exist_ok=True)
+
+        self.cache_lock_file_path = self.cache_folder_path / "cache.lock"
+        self.host_name = socket.gethostname()
+
+    @staticmethod
+    def _get_entry_name(key: str) -> str:
+        return key.strip("/").replace("/", "__")
+
+    def get_file_path(self, key: str) -> pathlib.Path:
+        return self.files_folder_path / self._get_entry_name(key=key)
+
+    def _is_pin_alive(self, pin_file_path: pathlib.Path) -> bool:
+        try:
+            with open(file=pin_file_path, mode="r") as io:
+                pin = json.load(fp=io)
+        except FileNotFoundError:
+            return False
+        except (OSError, json.JSONDecodeError):  # Possibly still being written
+            return True
+
+        if pin["host_name"] != self.host_name:
+            return True  # The processes of other hosts cannot be checked
+        return _is_process_alive(process_id=pin["process_id"])
+
+    def _is_entry_pinned(self, entry_name: str) -> bool:
+        entry_pins_folder_path = self.pins_folder_path / entry_name
+        if not entry_pins_folder_path.exists():
+            return False
+
+        is_pinned = False
+        for pin_file_path in entry_pins_folder_path.iterdir():
+            if self._is_pin_alive(pin_file_path=pin_file_path):
+                is_pinned = True
+            else:
+                pin_file_path.unlink(missing_ok=True)
+        return is_pinned
+
+    def is_pinned(self, key: str) -> bool:
+        return self._is_entry_pinned(entry_name=self._get_entry_name(key=key))
+
+    @contextmanager
+    def pin(self, keys: Iterable[str]) -> Iterator[None]:
+        """Protect the files of these keys from eviction for the duration of the context, then enforce the budget."""
+        pin_file_paths = list()
+        pin = dict(host_name=self.host_name, process_id=os.getpid(), pinned_at=time.time())
+        try:
+            for key in keys:
+                entry_pins_folder_path = self.pins_folder_path / self._get_entry_name(key=key)
+                entry_pins_folder_path.mkdir(exist_ok=True)
+                pin_file_path = entry_pins_folder_path / f"{uuid.uuid4().hex}.json"
+                with open(file=pin_file_path, mode="w") as io:
+                    json.dump(obj=pin, fp=io)
+                pin_file_paths.append(pin_file_path)
+            yield
+        finally:
+            for pin_file_path in pin_file_paths:
+                pin_file_path.unlink(missing_ok=True)
+            self.evict()
+
+    def _list_entries(self) -> List[Tuple[float, int, pathlib.Path]]:
+        """List the last use time, size, and path of every cached file."""
+        entries = list()
+        for file_path in self.files_folder_path.iterdir():
+            try:
+                file_stat = file_path.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((file_stat.st_mtime, file_stat.st_size, file_path))
+        return entries
+
+    def _list_partial_downloads(self) -> List[Tuple[float, int, str, List[pathlib.Path]]]:
+        """List the last write time, total size, entry name, and files of every partial download."""
+        partial_downloads = dict()
+        for file_path in self.partial_folder_path.iterdir():
+            if _PARTIAL_SUFFIX not in file_path.name:
+                continue
+            try:
+                file_stat = file_path.stat()
+            except FileNotFoundError:
+                continue
+
+            entry_name = file_path.name[: file_path.name.rindex(_PARTIAL_SUFFIX)]
+            last_write_time, size, file_paths = partial_downloads.get(entry_name, (0.0, 0, list()))
+            partial_downloads[entry_name] = (
+                max(last_write_time, file_stat.st_mtime),
+                size + file_stat.st_size,
+                file_paths + [file_path],
+            )
+        return [
+            (last_write_time, size, entry_name, file_paths)
+            for entry_name, (last_write_time, size, file_paths) in partial_downloads.items()
+        ]
+
+    def _evict_partial_download(self, entry_name: str, file_paths: List[pathlib.Path]) -> bool:
+        """Remove the files of a partial download, unless it is still in progress under the lock on its entry."""
+        with try_exclusive_file_lock(file_path=self.locks_folder_path / f"{entry_name}.lock") as is_locked:
+            if not is_locked:
+                return False
+            try:
+                for file_path in file_paths:
+                    file_path.unlink(missing_ok=True)
+            except PermissionError:  # Still open by some process on Windows
+                return False
+        return True
+
+    def get_size(self) -> int:
+        """The number of bytes used by cached files and partial downloads."""
+        partial_size = sum(size for _, size, _, _ in self._list_partial_downloads())
+        return sum(size for _, size, _ in self._list_entries()) + partial_size
+
+    def evict(self, required_size: int = 0) -> List[str]:
+        """
+        Remove the least recently used files that are not pinned until the cache, plus `required_size` bytes, fits
+        within the budget, or nothing more can be removed.
+
+        Partial downloads that are not in progress are candidates as well, by the time they were last written to.
+
+        Returns the names of the removed entries; those of partial downloads end with '.partial'.
+        """
+        evicted_entry_names = list()
+        with exclusive_file_lock(file_path=self.cache_lock_file_path):
+            candidates = [
+                (last_use_time, file_size, file_path.name, [file_path], False)
+                for last_use_time, file_size, file_path in self._list_entries()
+            ]
+            candidates.extend(
+                (last_write_time, size, entry_name, file_paths, True)
+                for last_write_time, size, entry_name, file_paths in self._list_partial_downloads()
+            )
+
+            size = self.get_size()
+            for _, file_size, entry_name, file_paths, is_partial in sorted(candidates, key=lambda entry: entry[0]):
+                if size + required_size <= self.maximum_size:
+                    break
+                if self._is_entry_pinned(entry_name=entry_name):
+                    continue
+
+                if is_partial:
+                    if not self._evict_partial_download(entry_name=entry_name, file_paths=file_paths):
+                        continue
+                    entry_name += _PARTIAL_SUFFIX
+                else:
+                    try:
+                        file_paths[0].unlink(missing_ok=True)
+                    except PermissionError:  # Still open by some process on Windows
+                        continue
+                size -= file_size
+                evicted_entry_names.append(entry_name)
+
+        return evicted_entry_names
+
+    def fetch(
+        self,
+        key: str,
+        download_function: Callable[[pathlib.Path, pathlib.Path], None],
+        expected_size: int = 0,
+    ) -> pathlib.Path:
+        """
+        Return the path of the cached file for the key, downloading it first if it is not cached.
+
+        The `download_function` is called as `download_function(file_path, partial_folder_path)` and must leave the
+        complete file at the `file_path`. Before it is, other files are evicted to make room for the `expected_size`.
+
+        The key should be pinned by the caller for as long as the file is in use.
+        """
+        file_path = self.get_file_path(key=key)
+        with exclusive_file_lock(file_path=self.locks_folder_path / f"{self._get_entry_name(key=key)}.lock"):
+            if not file_path.exists():
+                self.evict(required_size=expected_size)
+                download_function(file_path, self.partial_folder_path)
+                self.evict()
+
+            os.utime(path=file_path)  # The modification time marks the last use
+        return file_path
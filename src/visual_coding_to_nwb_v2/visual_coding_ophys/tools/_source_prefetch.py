@@ -0,0 +1,104 @@
+"""Read the source datasets of a conversion concurrently in the background, while the interfaces are added in turn."""
+
+import contextlib
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Iterable, List
+
+import h5py
+import numpy
+
+from ._memory_mapped_reads import (
+    _MAPPABLE_DRIVERS,
+    _get_dataset_key,
+    _prefetched_arrays,
+    get_memory_map,
+)
+
+# The size of each read when reading a file ahead into the page cache, into a buffer that is reused
+_PAGE_CACHE_READ_SIZE = 8 * 1024 * 1024
+
+
+def _read_into_page_cache(file_path: str, offset: int, number_of_bytes: int) -> None:
+    """Read a range of a file and discard it, so that the pages of a memory map of that range are already cached."""
+    buffer = bytearray(min(_PAGE_CACHE_READ_SIZE, number_of_bytes))
+    with open(file=file_path, mode="rb", buffering=0) as io:
+        io.seek(offset)
+        remaining_bytes = number_of_bytes
+        while remaining_bytes > 0:
+            number_of_bytes_read = io.readinto(memoryview(buffer)[: min(len(buffer), remaining_bytes)])
+            if not number_of_bytes_read:
+                return
+            remaining_bytes -= number_of_bytes_read
+
+
+def _read_dataset_in_process(file_path: str, name: str) -> numpy.ndarray:
+    with h5py.File(name=file_path, mode="r") as file:
+        return file[name][()]
+
+
+@contextlib.contextmanager
+def prefetch_source_datasets(
+    datasets: Iterable[h5py.Dataset], number_of_threads: int = 8, number_of_processes: int = 0
+) -> Iterable[None]:
+    """
+    Read the datasets in the background, in the given order, while the body of the context runs.
+
+    Within the context, `read_source_dataset` takes each prefetched dataset from its prefetch, waiting for it if it is
+    still being read, so that only the reads that were not finished in time are waited on. Each prefetched array is
+    handed over once; those that were never asked for are released when the context exits.
+
+    Datasets that can be memory mapped are read by the threads directly from their files into the page cache of the
+    operating system, without holding the GIL, and are then mapped as usual. Every call into the HDF5 library within a
+    process is serialized by h5py, so other datasets read by the threads only overlap with the work between them; if
+    `number_of_processes` is positive, those of local files are instead read in parallel by that many processes.
+    """
+    datasets: List[h5py.Dataset] = list(datasets)
+    if number_of_threads < 1 or not datasets:
+        yield
+        return
+
+    with contextlib.ExitStack() as exit_stack:
+        thread_pool = exit_stack.enter_context(ThreadPoolExecutor(max_workers=number_of_threads))
+        process_pool = None
+        if number_of_processes > 0:
+            # Spawned rather than forked, so that no process inherits the state of the open HDF5 files
+            process_pool = exit_stack.enter_context(
+                ProcessPoolExecutor(max_workers=number_of_processes, mp_context=multiprocessing.get_context("spawn"))
+            )
+
+        prefetch_keys = list()
+        futures = list()
+        try:
+            for dataset in datasets:
+                memory_map = get_memory_map(dataset=dataset)
+                if memory_map is not None:
+                    futures.append(
+                        thread_pool.submit(
+                            _read_into_page_cache,
+                            file_path=dataset.file.filename,
+                            offset=dataset.id.get_offset(),
+                            number_of_bytes=memory_map.nbytes,
+                        )
+                    )
+                    continue
+
+                key = _get_dataset_key(dataset=dataset)
+                if key in _prefetched_arrays:
+                    continue
+                if process_pool is not None and dataset.file.driver in _MAPPABLE_DRIVERS:
+                    future = process_pool.submit(
+                        _read_dataset_in_process, file_path=dataset.file.filename, name=dataset.name
+                    )
+                else:
+                    future = thread_pool.submit(dataset.__getitem__, ())
+                _prefetched_arrays[key] = future
+                prefetch_keys.append(key)
+                futures.append(future)
+
+            yield
+        finally:
+            for key in prefetch_keys:
+                _prefetched_arrays.pop(key, None)
+            for future in futures:  # Reads that have not started yet are not waited for
+                future.cancel()
@@ -0,0 +1,74 @@
+"""Convert the mostly empty (time, roi) arrays of dF/F events to and from a compressed sparse layout per ROI."""
+
+from typing import Iterable, Union
+
+import numpy
+from pynwb.file import NWBFile
+
+
+def sparsify_events(data: numpy.ndarray) -> dict:
+    """
+    Compress a dense (time, roi) array of events into the frames and amplitudes of the nonzero events of each ROI.
+
+    The events are ordered by ROI, then by frame, with the events of ROI `i` between `index[i - 1]` (or zero) and
+    `index[i]`; that is, the row pointers of a compressed sparse row (CSR) matrix of shape (roi, time) without the
+    leading zero, as in the index of a ragged column of a `DynamicTable`.
+    """
+    data = numpy.asarray(data)
+    number_of_rois = data.shape[1]
+
+    roi_indices, frame_indices = numpy.nonzero(data.T)
+    return dict(
+        frame_indices=frame_indices.astype("uint32"),
+        amplitudes=data[frame_indices, roi_indices],
+        index=numpy.cumsum(numpy.bincount(roi_indices, minlength=number_of_rois)).astype("uint64"),
+    )
+
+
+def densify_events(
+    frame_indices: numpy.ndarray,
+    amplitudes: numpy.ndarray,
+    index: numpy.ndarray,
+    number_of_frames: int,
+) -> numpy.ndarray:
+    """Expand the sparse events of each ROI back into a dense (time, roi) array."""
+    index = numpy.asarray(index, dtype="int64")
+    events_per_roi = numpy.diff(index, prepend=0)
+    roi_indices = numpy.repeat(numpy.arange(index.shape[0]), events_per_roi)
+
+    data = numpy.zeros(shape=(number_of_frames, index.shape[0]), dtype=numpy.asarray(amplitudes).dtype)
+    data[numpy.asarray(frame_indices, dtype="int64"), roi_indices] = amplitudes
+    return data
+
+
+def densify_df_over_f_events(nwbfile: NWBFile, roi_indices: Union[Iterable[int], None] = None) -> numpy.ndarray:
+    """
+    Read the sparse 'DfOverFEvents' table of a processed NWB file as a dense (time, roi) array.
+
+    If `roi_indices` (rows of the `PlaneSegmentation`) are specified, only the events of those ROIs are read, in that
+    order; otherwise the whole table is read at once.
+    """
+    ophys_module = nwbfile.processing["ophys"]
+    event_table = ophys_module["DfOverFEvents"]
+    number_of_frames = ophys_module["Fluorescence"]["Corrected"].data.shape[0]
+
+    index = event_table["frame_indices"].data[:]  # The ragged columns share the same row pointers
+    if roi_indices is None:
+        return densify_events(
+            frame_indices=event_table["frame_indices"].target.data[:],
+            amplitudes=event_table["amplitudes"].target.data[:],
+            index=index,
+            number_of_frames=number_of_frames,
+        )
+
+    roi_indices = list(roi_indices)
+    starts = [int(index[roi_index - 1]) if roi_index > 0 else 0 for roi_index in roi_indices]
+    stops = [int(index[roi_index]) for roi_index in roi_indices]
+    frame_indices = [event_table["frame_indices"].target.data[start:stop] for start, stop in zip(starts, stops)]
+    amplitudes = [event_table["amplitudes"].target.data[start:stop] for start, stop in zip(starts, stops)]
+    return densify_events(
+        frame_indices=numpy.concatenate(frame_indices) if frame_indices else numpy.empty(0, dtype="uint32"),
+        amplitudes=numpy.concatenate(amplitudes) if amplitudes else numpy.empty(0, dtype="float32"),
+        index=numpy.cumsum([stop - start for start, stop in zip(starts, stops)]),
+        number_of_frames=number_of_frames,
+    )
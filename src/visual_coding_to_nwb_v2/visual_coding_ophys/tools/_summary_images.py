@@ -0,0 +1,173 @@
+"""Compute the summary images of a movie, either all at once or incrementally over the buffers as it is written."""
+
+from typing import Dict, Tuple
+
+import numpy
+from hdmf.data_utils import GenericDataChunkIterator
+
+from ._movie_previews import SharedMovieBuffers
+
+# The name and description of each summary image
+SUMMARY_IMAGES = dict(
+    mean_intensity_projection="The mean of each pixel over all frames of the motion corrected movie.",
+    maximum_intensity_projection="The maximum of each pixel over all frames of the motion corrected movie.",
+    standard_deviation_projection="The (population) standard deviation of each pixel over all frames of the movie.",
+    local_correlation=(
+        "The mean correlation over time of each pixel with each of its (up to) eight neighbors; pixels that never "
+        "change have a correlation of zero."
+    ),
+)
+
+# The offsets of half of the eight neighbors of a pixel; the other half are the same pairs seen from the other pixel
+_NEIGHBOR_OFFSETS = ((0, 1), (1, 0), (1, 1), (1, -1))
+
+
+def _get_pair_slices(offset: Tuple[int, int], shape: Tuple[int, int]) -> Tuple[tuple, tuple]:
+    """The slices of the frame selecting every pixel with a neighbor at the offset, and those neighbors."""
+    (row_offset, column_offset), (number_of_rows, number_of_columns) = offset, shape
+    pixel_slices = (
+        slice(0, number_of_rows - row_offset),
+        slice(max(0, -column_offset), number_of_columns - max(0, column_offset)),
+    )
+    neighbor_slices = (
+        slice(row_offset, number_of_rows),
+        slice(max(0, column_offset), number_of_columns + min(0, column_offset)),
+    )
+    return pixel_slices, neighbor_slices
+
+
+def _combine_local_correlation(
+    variances: numpy.ndarray, covariances: Dict[Tuple[int, int], numpy.ndarray]
+) -> numpy.ndarray:
+    """Average the correlations of each pixel with its neighbors, from the variances and neighbor covariances."""
+    sums = numpy.zeros_like(variances)
+    counts = numpy.zeros_like(variances)
+    for offset, covariance in covariances.items():
+        pixel_slices, neighbor_slices = _get_pair_slices(offset=offset, shape=variances.shape)
+        with numpy.errstate(invalid="ignore", divide="ignore"):
+            correlation = covariance / numpy.sqrt(variances[pixel_slices] * variances[neighbor_slices])
+        correlation[~numpy.isfinite(correlation)] = 0.0
+        for slices in (pixel_slices, neighbor_slices):
+            sums[slices] += correlation
+            counts[slices] += 1
+    return sums / numpy.maximum(counts, 1)
+
+
+def compute_summary_images(movie: numpy.ndarray) -> Dict[str, numpy.ndarray]:
+    """Compute the summary images of a whole (frame, row, column) movie at once, as a reference."""
+    frames = numpy.asarray(movie, dtype="float64")
+    centered_frames = frames - frames.mean(axis=0)
+    variances = (centered_frames**2).mean(axis=0)
+
+    covariances = dict()
+    for offset in _NEIGHBOR_OFFSETS:
+        pixel_slices, neighbor_slices = _get_pair_slices(offset=offset, shape=frames.shape[1:])
+        covariances[offset] = (
+            centered_frames[(slice(None), *pixel_slices)] * centered_frames[(slice(None), *neighbor_slices)]
+        ).mean(axis=0)
+
+    return dict(
+        mean_intensity_projection=frames.mean(axis=0).astype("float32"),
+        maximum_intensity_projection=numpy.asarray(movie).max(axis=0),
+        standard_deviation_projection=numpy.sqrt(variances).astype("float32"),
+        local_correlation=_combine_local_correlation(variances=variances, covariances=covariances).astype("float32"),
+    )
+
+
+class StreamingSummaryImages:
+    """
+    Accumulate the summary images of a movie over its frames in any number of batches, with memory bounded by a frame.
+
+    The means, variances, and covariances with the neighbors of each pixel are combined across batches by the parallel
+    form of Welford's algorithm (Chan et al.), which is as stable as a single pass over centered data. Each batch is
+    processed in blocks of `frames_per_block` frames to bound the memory of the conversion to double precision.
+    """
+
+    def __init__(self, frame_shape: Tuple[int, int], dtype: numpy.dtype, frames_per_block: int = 64):
+        self.frame_shape = tuple(frame_shape)
+        self.frames_per_block = frames_per_block
+        self.number_of_frames = 0
+        self.mean = numpy.zeros(shape=self.frame_shape)
+        self.sum_of_squares = numpy.zeros(shape=self.frame_shape)
+        self.comoments = {
+            offset: numpy.zeros(
+                shape=tuple(
+                    axis_slice.stop - axis_slice.start
+                    for axis_slice in _get_pair_slices(offset=offset, shape=self.frame_shape)[0]
+                )
+            )
+            for offset in _NEIGHBOR_OFFSETS
+        }
+        self.maximum = numpy.full(
+            shape=self.frame_shape,
+            fill_value=numpy.iinfo(dtype).min if numpy.issubdtype(dtype, numpy.integer) else -numpy.inf,
+            dtype=dtype,
+        )
+
+    def update(self, frames: numpy.ndarray) -> None:
+        for block_start in range(0, frames.shape[0], self.frames_per_block):
+            self._update_block(frames=frames[block_start : block_start + self.frames_per_block])
+
+    def _update_block(self, frames: numpy.ndarray) -> None:
+        numpy.maximum(self.maximum, frames.max(axis=0), out=self.maximum)
+
+        block_frames = numpy.asarray(frames, dtype="float64")
+        number_of_block_frames = block_frames.shape[0]
+        block_mean = block_frames.mean(axis=0)
+        centered_frames = block_frames - block_mean
+
+        number_of_frames = self.number_of_frames + number_of_block_frames
+        mean_difference = block_mean - self.mean
+        weight = self.number_of_frames * number_of_block_frames / number_of_frames
+
+        self.sum_of_squares += (centered_frames**2).sum(axis=0) + mean_difference**2 * weight
+        for offset, comoment in self.comoments.items():
+            pixel_slices, neighbor_slices = _get_pair_slices(offset=offset, shape=self.frame_shape)
+            comoment += (
+                centered_frames[(slice(None), *pixel_slices)] * centered_frames[(slice(None), *neighbor_slices)]
+            ).sum(axis=0) + mean_difference[pixel_slices] * mean_difference[neighbor_slices] * weight
+        self.mean += mean_difference * number_of_block_frames / number_of_frames
+        self.number_of_frames = number_of_frames
+
+    def get_images(self) -> Dict[str, numpy.ndarray]:
+        assert self.number_of_frames > 0, "No frames have been accumulated."
+
+        variances = self.sum_of_squares / self.number_of_frames
+        covariances = {offset: comoment / self.number_of_frames for offset, comoment in self.comoments.items()}
+        return dict(
+            mean_intensity_projection=self.mean.astype("float32"),
+            maximum_intensity_projection=self.maximum.copy(),
+            standard_deviation_projection=numpy.sqrt(variances).astype("float32"),
+            local_correlation=_combine_local_correlation(variances=variances, covariances=covariances).astype(
+                "float32"
+            ),
+        )
+
+
+class SummaryImageDataChunkIterator(GenericDataChunkIterator):
+    """
+    Write one summary image of a movie once every buffer of the movie has been accumulated.
+
+    The image is written after the movie in the usual order of writing, so that it is only read once; if it is written
+    first, the remaining buffers are read for it, and read again for the movie.
+    """
+
+    def __init__(self, movie_buffers: SharedMovieBuffers, summary_images: StreamingSummaryImages, image_name: str):
+        assert image_name in SUMMARY_IMAGES, f"'{image_name}' is not one of the summary images!"
+
+        self.movie_buffers = movie_buffers
+        self.summary_images = summary_images
+        self.image_name = image_name
+        super().__init__(buffer_shape=summary_images.frame_shape, chunk_shape=summary_images.frame_shape)
+
+    def _get_maxshape(self) -> Tuple[int, ...]:
+        return self.summary_images.frame_shape
+
+    def _get_dtype(self) -> numpy.dtype:
+        if self.image_name == "maximum_intensity_projection":
+            return self.summary_images.maximum.dtype
+        return numpy.dtype("float32")
+
+    def _get_data(self, selection: Tuple[slice]) -> numpy.ndarray:
+        self.movie_buffers.read_all_buffers()
+        return self.summary_images.get_images()[self.image_name][selection]
@@ -0,0 +1,151 @@
+"""Long-lived worker processes that each convert many sessions in sequence."""
+
+import gc
+import multiprocessing
+import os
+import pathlib
+import queue
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from typing import Callable, List, Union
+
+import h5py
+import tqdm
+
+from ._runtime_control import RuntimeControl
+
+
+def get_open_hdf5_file_names() -> List[str]:
+    """List the names of every HDF5 file that is still open anywhere in this process."""
+    gc.collect()  # Objects only held by reference cycles would otherwise appear to be open
+
+    open_file_ids = h5py.h5f.get_obj_ids(h5py.h5f.OBJ_ALL, h5py.h5f.OBJ_FILE)
+    return [file_id.name.decode("utf-8") for file_id in open_file_ids]
+
+
+def assert_no_open_hdf5_files(context: str = "") -> None:
+    """Raise an error if any HDF5 file, whether opened by h5py directly or through an NWB I/O object, is still open."""
+    open_file_names = get_open_hdf5_file_names()
+    if open_file_names:
+        raise RuntimeError(
+            f"Leaked {len(open_file_names)} open HDF5 file handle(s) {context}: {open_file_names}\n"
+            "This worker cannot safely continue to the next session."
+        )
+
+
+def _get_all_nowait(shared_queue: queue.Queue) -> List[str]:
+    """Take every item currently in the queue without waiting for more."""
+    items = list()
+    while True:
+        try:
+            items.append(shared_queue.get_nowait())
+        except queue.Empty:
+            return items
+
+
+def _convert_sessions_in_worker(
+    worker_index: int,
+    session_queue: queue.Queue,
+    completed_session_queue: queue.Queue,
+    session_function: Callable,
+    session_kwargs: dict,
+    control_file_path: Union[pathlib.Path, None],
+) -> None:
+    runtime_control = RuntimeControl(control_file_path=control_file_path)
+
+    while True:
+        # Scaling down or draining only takes effect between sessions
+        settings = runtime_control.read()
+        number_of_workers = settings["number_of_workers"]
+        if settings["drain"] or (number_of_workers is not None and worker_index >= number_of_workers):
+            return
+
+        runtime_control.wait_while_paused()
+        runtime_control.apply_io_priority()
+
+        try:
+            session_id = session_queue.get_nowait()
+        except queue.Empty:
+            return
+
+        session_function(session_id=session_id, **session_kwargs)
+        assert_no_open_hdf5_files(context=f"after converting session {session_id}")
+
+        completed_session_queue.put(session_id)  # Reported as it completes, for the progress of the whole pool
+
+
+def run_worker_pool(
+    session_ids: List[str],
+    session_function: Callable,
+    number_of_workers: int = 1,
+    control_file_path: Union[str, pathlib.Path, None] = None,
+    maximum_number_of_workers: Union[int, None] = None,
+    **session_kwargs,
+) -> List[str]:
+    """
+    Convert sessions across a pool of worker processes, each of which pulls sessions from a shared queue.
+
+    Every worker pays for interpreter startup, imports, and the PyNWB type map initialization only once. Between
+    sessions, each worker checks that no HDF5 file handle survived the previous session and stops with an error if
+    one did, rather than carrying leaked state into the next conversion.
+
+    If a `control_file_path` is specified, the 'number_of_workers' in that file (up to `maximum_number_of_workers`)
+    overrides the initial `number_of_workers` while the batch is running; 'drain' stops workers from starting new
+    sessions, and 'paused' and 'io_priority' are applied by each worker between sessions.
+
+    The `session_function` is called as `session_function(session_id=session_id, **session_kwargs)` and must be
+    importable at the top level of a module so it can be sent to the workers. If it raises an error in any worker, the
+    sessions left in the queue are dropped so that the other workers stop after their current session, and the error
+    is raised again here.
+
+    Returns the session IDs that were converted.
+    """
+    control_file_path = pathlib.Path(control_file_path) if control_file_path is not None else None
+    runtime_control = RuntimeControl(control_file_path=control_file_path)
+    maximum_number_of_workers = maximum_number_of_workers or max(number_of_workers, os.cpu_count() or 1)
+
+    completed_session_ids = list()
+    with multiprocessing.Manager() as manager, tqdm.tqdm(
+        total=len(session_ids), desc="Converting sessions..."
+    ) as progress_bar:
+        session_queue = manager.Queue()
+        completed_session_queue = manager.Queue()
+        for session_id in session_ids:
+            session_queue.put(session_id)
+
+        futures_per_worker = dict()
+        with ProcessPoolExecutor(max_workers=maximum_number_of_workers) as executor:
+            while True:
+                for worker_index, future in list(futures_per_worker.items()):
+                    if future.done():
+                        del futures_per_worker[worker_index]
+                        if future.exception() is not None:
+                            # Stop the other workers after their current session, rather than after the whole queue
+                            _get_all_nowait(shared_queue=session_queue)
+                        future.result()  # Re-raises any error from the worker
+
+                newly_completed_session_ids = _get_all_nowait(shared_queue=completed_session_queue)
+                completed_session_ids.extend(newly_completed_session_ids)
+                progress_bar.update(len(newly_completed_session_ids))
+
+                settings = runtime_control.read()
+                desired_number_of_workers = min(
+                    settings["number_of_workers"] or number_of_workers, maximum_number_of_workers
+                )
+                if not settings["drain"] and not session_queue.empty():
+                    for worker_index in range(desired_number_of_workers):
+                        if worker_index not in futures_per_worker:
+                            futures_per_worker[worker_index] = executor.submit(
+                                _convert_sessions_in_worker,
+                                worker_index=worker_index,
+                                session_queue=session_queue,
+                                completed_session_queue=completed_session_queue,
+                                session_function=session_function,
+                                session_kwargs=session_kwargs,
+                                control_file_path=control_file_path,
+                            )
+
+                if not futures_per_worker:
+                    break
+                wait(fs=futures_per_worker.values(), timeout=runtime_control.poll_interval, return_when=FIRST_COMPLETED)
+
+    return completed_session_ids
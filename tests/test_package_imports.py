@@ -0,0 +1,21 @@
+"""Tests of the lazily loaded entry points of the package."""
+
+import importlib
+import inspect
+
+import pytest
+
+
+@pytest.mark.parametrize(
+    argnames="function_name,module_name",
+    argvalues=[
+        ("convert_processed_session", "_convert_processed_session"),
+        ("safe_download_convert_and_upload_raw_session", "_safe_download_convert_and_upload_raw_session"),
+    ],
+)
+def test_entry_points_are_functions_after_importing_their_submodules(function_name: str, module_name: str):
+    importlib.import_module(name=f"visual_coding_to_nwb_v2.visual_coding_ophys.{module_name}")
+
+    from visual_coding_to_nwb_v2 import visual_coding_ophys
+
+    assert inspect.isfunction(getattr(visual_coding_ophys, function_name))
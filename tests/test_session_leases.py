@@ -0,0 +1,111 @@
+"""Tests of the distribution of sessions across processes through lease files in a shared folder."""
+
+import json
+import multiprocessing
+import os
+import pathlib
+import time
+
+from visual_coding_to_nwb_v2.visual_coding_ophys.tools import (
+    SessionLeaseQueue,
+    run_leased_sessions,
+)
+
+
+def _record_session(session_id: str, record_folder_path: str) -> None:
+    """Record which process converted the session; each record is a new file, so that duplicates are detected."""
+    time.sleep(0.05)
+    record_file_path = pathlib.Path(record_folder_path) / f"{session_id}_{os.getpid()}_{time.monotonic_ns()}.json"
+    with open(file=record_file_path, mode="w") as io:
+        json.dump(obj=dict(session_id=session_id, process_id=os.getpid()), fp=io)
+
+
+def _run_worker(queue_folder_path: str, record_folder_path: str) -> None:
+    session_queue = SessionLeaseQueue(queue_folder_path=queue_folder_path, heartbeat_interval=0.1)
+    run_leased_sessions(
+        session_queue=session_queue, session_function=_record_session, record_folder_path=record_folder_path
+    )
+
+
+def test_each_session_is_converted_once_across_processes(tmp_path):
+    queue_folder_path = tmp_path / "queue"
+    record_folder_path = tmp_path / "records"
+    record_folder_path.mkdir()
+
+    session_ids = [str(session_index) for session_index in range(24)]
+    SessionLeaseQueue(queue_folder_path=queue_folder_path).add_sessions(session_ids=session_ids)
+
+    workers = [
+        multiprocessing.Process(target=_run_worker, args=(str(queue_folder_path), str(record_folder_path)))
+        for _ in range(4)
+    ]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join(timeout=60)
+        assert worker.exitcode == 0
+
+    recorded_session_ids = [record_file_path.name.split("_")[0] for record_file_path in record_folder_path.iterdir()]
+    assert sorted(recorded_session_ids, key=int) == session_ids
+    assert sorted(path.stem for path in (queue_folder_path / "completed").iterdir()) == sorted(session_ids)
+    assert not any((queue_folder_path / "leases").iterdir())
+    assert not any((queue_folder_path / "failed").iterdir())
+
+
+def test_lost_lease_is_neither_completed_nor_failed(tmp_path):
+    session_queue = SessionLeaseQueue(queue_folder_path=tmp_path, lease_timeout=60, heartbeat_interval=0.05)
+    session_queue.add_sessions(session_ids=["1"])
+    other_session_queue = SessionLeaseQueue(queue_folder_path=tmp_path, lease_timeout=60, heartbeat_interval=1)
+
+    def _lose_lease(session_id: str, raise_error: bool) -> None:
+        # Age the lease past the timeout, as if the heartbeats had lapsed, so that another host reclaims it
+        lease_file_path = tmp_path / "leases" / f"{session_id}.json"
+        os.utime(path=lease_file_path, times=(time.time() - 120, time.time() - 120))
+        assert other_session_queue.acquire() == session_id
+        time.sleep(0.2)  # Long enough for a heartbeat to find the lease lost
+        if raise_error:
+            raise ValueError("A permanent error after the lease was lost.")
+
+    for raise_error in (False, True):
+        assert (
+            run_leased_sessions(session_queue=session_queue, session_function=_lose_lease, raise_error=raise_error)
+            == []
+        )
+        assert not session_queue.is_completed(session_id="1")
+        assert not session_queue.is_failed(session_id="1")
+        assert other_session_queue.holds_lease(session_id="1")
+        other_session_queue.release(session_id="1")
+
+
+def test_transient_errors_release_the_lease_and_permanent_errors_fail(tmp_path):
+    session_queue = SessionLeaseQueue(queue_folder_path=tmp_path)
+    session_queue.add_sessions(session_ids=["1", "2"])
+    attempted_session_ids = list()
+
+    def _raise_error(session_id: str) -> None:
+        attempted_session_ids.append(session_id)
+        if session_id == "1":
+            raise ConnectionError("The connection was reset.")
+        raise ValueError("The source data is invalid.")
+
+    assert run_leased_sessions(session_queue=session_queue, session_function=_raise_error) == []
+    assert attempted_session_ids == ["1", "2"]  # Each is attempted once by this host
+    assert not session_queue.is_failed(session_id="1")
+    assert session_queue.is_failed(session_id="2")
+    assert not any((tmp_path / "leases").iterdir())
+    assert session_queue.acquire() == "1"  # Another host, or a later run, picks the released session up again
+
+
+def test_control_file_is_passed_on_to_each_session(tmp_path):
+    session_queue = SessionLeaseQueue(queue_folder_path=tmp_path / "queue")
+    session_queue.add_sessions(session_ids=["1"])
+    control_file_path = tmp_path / "control.json"
+    received_control_file_paths = list()
+
+    def _receive_control_file_path(session_id: str, control_file_path: pathlib.Path) -> None:
+        received_control_file_paths.append(control_file_path)
+
+    run_leased_sessions(
+        session_queue=session_queue, session_function=_receive_control_file_path, control_file_path=control_file_path
+    )
+    assert received_control_file_paths == [control_file_path]
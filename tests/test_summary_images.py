@@ -0,0 +1,46 @@
+"""Tests of the summary images accumulated over the buffers of a movie against those of the whole movie at once."""
+
+import numpy
+import pytest
+
+from visual_coding_to_nwb_v2.visual_coding_ophys.tools import (
+    SUMMARY_IMAGES,
+    StreamingSummaryImages,
+    compute_summary_images,
+)
+
+
+@pytest.mark.parametrize(argnames="frames_per_block", argvalues=[1, 16, 64])
+def test_streaming_summary_images_match_the_batch_computation(frames_per_block: int):
+    random_number_generator = numpy.random.default_rng(seed=0)
+    number_of_frames, frame_shape = 250, (13, 17)
+
+    # A large baseline with correlated neighbors, as in a fluorescence movie, and a pixel that never changes
+    signal = random_number_generator.normal(size=(number_of_frames, 1, 1)) * 40
+    noise = random_number_generator.normal(size=(number_of_frames, *frame_shape)) * 20
+    movie = numpy.clip(30000 + signal + noise, 0, None).astype("uint16")
+    movie[:, 5, 7] = 1234
+
+    # Batches of uneven sizes, as the buffers of a movie are, including a single frame
+    batch_sizes = [1, 37, 50, 2, 110, 50]
+    assert sum(batch_sizes) == number_of_frames
+    summary_images = StreamingSummaryImages(
+        frame_shape=frame_shape, dtype=movie.dtype, frames_per_block=frames_per_block
+    )
+    for batch_start, batch_stop in zip(numpy.cumsum([0] + batch_sizes[:-1]), numpy.cumsum(batch_sizes)):
+        summary_images.update(frames=movie[batch_start:batch_stop])
+
+    streamed_images = summary_images.get_images()
+    batch_images = compute_summary_images(movie=movie)
+    assert set(streamed_images) == set(batch_images) == set(SUMMARY_IMAGES)
+
+    numpy.testing.assert_array_equal(
+        streamed_images["maximum_intensity_projection"], batch_images["maximum_intensity_projection"]
+    )
+    assert streamed_images["maximum_intensity_projection"].dtype == movie.dtype
+    for image_name in ("mean_intensity_projection", "standard_deviation_projection", "local_correlation"):
+        assert streamed_images[image_name].dtype == batch_images[image_name].dtype
+        numpy.testing.assert_allclose(streamed_images[image_name], batch_images[image_name], rtol=1e-5, atol=1e-5)
+
+    assert streamed_images["local_correlation"][5, 7] == 0.0
+    assert streamed_images["local_correlation"].mean() > 0.5  # The shared signal dominates the noise
@@ -0,0 +1,72 @@
+"""Tests of the replacement of nearly regular timestamps with a starting time, a rate, and quantized residuals."""
+
+import numpy
+import pytest
+
+from visual_coding_to_nwb_v2.visual_coding_ophys.interfaces.shared_methods import (
+    analyze_timestamps,
+    reconstruct_timestamps,
+)
+
+_RATE = 30.0
+
+
+def _get_jittered_timestamps(jitter: float, number_of_samples: int = 5000) -> numpy.ndarray:
+    random_number_generator = numpy.random.default_rng(seed=0)
+    return (
+        12.5
+        + numpy.arange(number_of_samples) / _RATE
+        + random_number_generator.uniform(low=-jitter, high=jitter, size=number_of_samples)
+    )
+
+
+def _reconstruct(timing: dict, number_of_samples: int) -> numpy.ndarray:
+    return reconstruct_timestamps(
+        starting_time=timing["starting_time"],
+        rate=timing["rate"],
+        number_of_samples=number_of_samples,
+        residuals=timing["residuals"],
+        residual_conversion=timing["residual_conversion"] or 1.0,
+    )
+
+
+def test_fully_regular_timestamps_need_no_residuals():
+    timestamps = _get_jittered_timestamps(jitter=1e-7)
+    jitter_tolerance = 1e-5
+
+    timing = analyze_timestamps(timestamps=timestamps, jitter_tolerance=jitter_tolerance)
+    assert timing["is_regular"]
+    assert timing["residuals"] is None
+    assert timing["rate"] == pytest.approx(_RATE, rel=1e-6)
+
+    timing_error = numpy.abs(_reconstruct(timing=timing, number_of_samples=timestamps.shape[0]) - timestamps).max()
+    assert timing_error <= timing["max_timing_error"] + 1e-12
+    assert timing["max_timing_error"] <= jitter_tolerance
+
+
+@pytest.mark.parametrize(
+    argnames="jitter,jitter_tolerance,residual_dtype",
+    argvalues=[(5e-4, 1e-5, "int8"), (5e-3, 1e-5, "int16"), (1e-2, 1e-8, "int32")],
+)
+def test_residuals_are_quantized_into_the_smallest_type_and_bounded(
+    jitter: float, jitter_tolerance: float, residual_dtype: str
+):
+    timestamps = _get_jittered_timestamps(jitter=jitter)
+
+    timing = analyze_timestamps(timestamps=timestamps, jitter_tolerance=jitter_tolerance)
+    assert timing["is_regular"]
+    assert timing["residuals"].dtype == numpy.dtype(residual_dtype)
+    assert timing["residual_conversion"] == jitter_tolerance
+
+    timing_error = numpy.abs(_reconstruct(timing=timing, number_of_samples=timestamps.shape[0]) - timestamps).max()
+    assert timing_error == pytest.approx(timing["max_timing_error"], abs=1e-12)
+    assert timing_error <= jitter_tolerance
+
+
+def test_timestamps_with_a_dropped_frame_are_kept_explicitly():
+    timestamps = numpy.delete(_get_jittered_timestamps(jitter=1e-4), 2500)  # A gap of two periods
+    assert numpy.abs(numpy.diff(timestamps)).max() > 1.5 / _RATE
+
+    timing = analyze_timestamps(timestamps=timestamps, jitter_tolerance=1e-5)
+    assert not timing["is_regular"]
+    numpy.testing.assert_array_equal(timing["timestamps"], timestamps)
@@ -0,0 +1,35 @@
+"""Tests of the conversion of sessions across a pool of long-lived worker processes."""
+
+import pathlib
+import time
+
+import pytest
+
+from visual_coding_to_nwb_v2.visual_coding_ophys.tools import run_worker_pool
+
+
+def _record_session(session_id: str, record_folder_path: str) -> None:
+    if session_id == "failing":
+        raise ValueError("The source data is invalid.")
+    time.sleep(0.1)
+    (pathlib.Path(record_folder_path) / session_id).touch()
+
+
+def test_every_session_is_converted(tmp_path):
+    session_ids = [str(session_index) for session_index in range(12)]
+
+    completed_session_ids = run_worker_pool(
+        session_ids=session_ids, session_function=_record_session, number_of_workers=3, record_folder_path=tmp_path
+    )
+    assert sorted(completed_session_ids, key=int) == session_ids
+    assert sorted((path.name for path in tmp_path.iterdir()), key=int) == session_ids
+
+
+def test_an_error_stops_the_pool_before_the_queue_is_drained(tmp_path):
+    session_ids = ["failing"] + [str(session_index) for session_index in range(100)]
+
+    with pytest.raises(ValueError, match="The source data is invalid."):
+        run_worker_pool(
+            session_ids=session_ids, session_function=_record_session, number_of_workers=2, record_folder_path=tmp_path
+        )
+    assert len(list(tmp_path.iterdir())) < 20  # Only the sessions in progress when the error was found